@@ -8,30 +8,20 @@ import json
 
 from keyboards.main import admin_panel_keyboard, back_button
 from core.bot import logger
+from core.callbacks import callbacks
+from filters import IsAdmin
+from keyboards.callback_data import (
+    pack, TransactionRef, TX_APPROVE, TX_REJECT, TX_REVERIFY, PENDING_NEXT, PENDING_PREV
+)
 from database.models import User, Transaction, SyriatelCode, IchancyAccount, Referral
 from config import ADMIN_ID
 
 router = Router()
+# الـ router للأدمن فقط: يتم تخطيه كاملاً لغيره
+router.message.filter(IsAdmin())
+router.callback_query.filter(IsAdmin())
 
-def admin_required(func):
-    """مصادقة أن المستخدم هو أدمن"""
-    async def wrapper(*args, **kwargs):
-        callback_or_message = args[0]
-        user_id = callback_or_message.from_user.id
-        
-        if user_id != ADMIN_ID:
-            if isinstance(callback_or_message, CallbackQuery):
-                await callback_or_message.answer("⛔ صلاحيات غير كافية", show_alert=True)
-            else:
-                await callback_or_message.answer("⛔ هذا الأمر للإدمن فقط.")
-            return
-        
-        return await func(*args, **kwargs)
-    
-    return wrapper
-
-@router.callback_query(F.data == "admin_panel")
-@admin_required
+@callbacks.exact("admin_panel", admin=True)
 async def admin_dashboard(callback: CallbackQuery, session: AsyncSession):
     """لوحة التحكم الرئيسية"""
     # جلب الإحصائيات السريعة
@@ -128,8 +118,7 @@ async def get_quick_stats(session: AsyncSession) -> dict:
         "today_transactions": today_transactions
     }
 
-@router.callback_query(F.data == "admin_stats")
-@admin_required
+@callbacks.exact("admin_stats", admin=True)
 async def detailed_stats(callback: CallbackQuery, session: AsyncSession):
     """إحصائيات مفصلة"""
     # إحصائيات المستخدمين
@@ -223,8 +212,9 @@ async def detailed_stats(callback: CallbackQuery, session: AsyncSession):
     builder = InlineKeyboardBuilder()
     builder.button(text="🔄 تحديث", callback_data="admin_stats")
     builder.button(text="📤 تصدير كـ JSON", callback_data="export_stats_json")
+    builder.button(text="⏱️ زمن المعالجة", callback_data="admin_sla")
     builder.button(text="⬅️ رجوع", callback_data="admin_panel")
-    builder.adjust(2, 1)
+    builder.adjust(2, 1, 1)
     
     await callback.message.edit_text(
         stats_text,
@@ -234,8 +224,63 @@ async def detailed_stats(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer()
 
-@router.callback_query(F.data == "export_stats_json")
-@admin_required
+def format_duration(seconds) -> str:
+    """مدة مقروءة: ث / د / س"""
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.0f} ث"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} د"
+    return f"{seconds / 3600:.1f} س"
+
+@callbacks.exact("admin_sla", admin=True)
+async def approval_sla(callback: CallbackQuery, session: AsyncSession):
+    """زمن الموافقة والإكمال لكل طريقة دفع (آخر 7 أيام)"""
+    from database.crud.transactions import TransactionCRUD
+    from aiogram.utils.keyboard import InlineKeyboardBuilder
+    
+    rows = await TransactionCRUD(session).get_approval_sla(days=7)
+    
+    sla_text = "<b>⏱️ زمن المعالجة (آخر 7 أيام)</b>\n<i>الوسيط / p90</i>\n"
+    
+    if not rows:
+        sla_text += "\nلا توجد معاملات موافق عليها في هذه الفترة."
+    
+    for row in rows:
+        arabic_type = {
+            "charge": "الشحن",
+            "withdraw": "السحب"
+        }.get(row["type"], row["type"])
+        mode = "🤖 تلقائي" if row["verified_auto"] else "👤 يدوي"
+        
+        sla_text += (
+            f"\n<b>{arabic_type} - {row['payment_method'] or 'غير محدد'}</b> ({mode})\n"
+            f"• الموافقة: {format_duration(row['approval_p50'])} / {format_duration(row['approval_p90'])} "
+            f"({row['approved']:,} معاملة)\n"
+        )
+        if row["completed"]:
+            sla_text += (
+                f"• الإكمال: {format_duration(row['completion_p50'])} / {format_duration(row['completion_p90'])} "
+                f"({row['completed']:,} معاملة)\n"
+            )
+    
+    sla_text += "\n<b>🔄 آخر تحديث:</b> " + datetime.now().strftime("%Y-%m-%d %H:%M")
+    
+    builder = InlineKeyboardBuilder()
+    builder.button(text="🔄 تحديث", callback_data="admin_sla")
+    builder.button(text="⬅️ رجوع", callback_data="admin_stats")
+    builder.adjust(2)
+    
+    await callback.message.edit_text(
+        sla_text,
+        reply_markup=builder.as_markup(),
+        parse_mode="HTML"
+    )
+    
+    await callback.answer()
+
+@callbacks.exact("export_stats_json", admin=True)
 async def export_stats_json(callback: CallbackQuery, session: AsyncSession):
     """تصدير الإحصائيات كـ JSON"""
     stats = await get_quick_stats(session)
@@ -259,8 +304,7 @@ async def export_stats_json(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer("✅ تم إرسال الإحصائيات")
 
-@router.callback_query(F.data == "admin_users")
-@admin_required
+@callbacks.exact("admin_users", admin=True)
 async def admin_users_menu(callback: CallbackQuery):
     """قائمة إدارة المستخدمين"""
     from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -288,8 +332,7 @@ async def admin_users_menu(callback: CallbackQuery):
     
     await callback.answer()
 
-@router.callback_query(F.data == "admin_payments")
-@admin_required
+@callbacks.exact("admin_payments", admin=True)
 async def admin_payments_menu(callback: CallbackQuery, session: AsyncSession):
     """قائمة إدارة الدفع"""
     from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -343,12 +386,10 @@ async def admin_payments_menu(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer()
 
-@router.callback_query(F.data == "admin_pending_charges")
-@admin_required
+@callbacks.exact("admin_pending_charges", admin=True)
 async def admin_pending_charges(callback: CallbackQuery, session: AsyncSession):
     """عرض طلبات الشحن المعلقة"""
     from database.crud.transactions import TransactionCRUD
-    from keyboards.main import admin_transaction_buttons
     
     tx_crud = TransactionCRUD(session)
     pending_txs = await tx_crud.get_pending_transactions(type_="charge", limit=20)
@@ -362,53 +403,20 @@ async def admin_pending_charges(callback: CallbackQuery, session: AsyncSession):
         return
     
     # عرض أول طلب مع أزرار التحكم
-    first_tx = pending_txs[0]
-    
-    tx_text = f"""
-<b>📥 طلبات الشحن المعلقة ({len(pending_txs)})</b>
+    await show_pending_charge(callback, pending_txs, 0)
 
-<b>الطلب الحالي ({1}/{len(pending_txs)}):</b>
-🔢 <b>رقم المعاملة:</b> {first_tx.id}
-💰 <b>المبلغ:</b> {first_tx.amount:,} ليرة
-💳 <b>الطريقة:</b> {first_tx.payment_method}
-🔑 <b>رقم العملية:</b> {first_tx.transaction_id}
-👤 <b>المستخدم:</b> {first_tx.user_id}
-🕒 <b>الوقت:</b> {first_tx.created_at.strftime('%Y-%m-%d %H:%M')}
-📝 <b>الحالة:</b> {first_tx.status}
-"""
-    
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    
-    builder = InlineKeyboardBuilder()
-    
-    # أزرار التحكم بالمعاملة الحالية
-    builder.button(text="✅ قبول", callback_data=f"approve_{first_tx.id}")
-    builder.button(text="❌ رفض", callback_data=f"reject_{first_tx.id}")
-    builder.button(text="🔁 إعادة التحقق", callback_data=f"reverify_{first_tx.id}")
-    
-    # أزرار التنقل
-    if len(pending_txs) > 1:
-        builder.button(text="➡️ التالي", callback_data=f"admin_pending_next_{first_tx.id}")
-    
-    builder.button(text="🔄 تحديث", callback_data="admin_pending_charges")
-    builder.button(text="⬅️ رجوع", callback_data="admin_payments")
-    
-    builder.adjust(3, 1, 1, 1)
-    
-    await callback.message.edit_text(
-        tx_text,
-        reply_markup=builder.as_markup(),
-        parse_mode="HTML"
-    )
-    
-    await callback.answer()
-
-@router.callback_query(F.data.startswith("admin_pending_next_"))
-@admin_required
-async def admin_pending_next(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(PENDING_NEXT, TransactionRef, admin=True, legacy="admin_pending_next_")
+async def admin_pending_next(callback: CallbackQuery, payload: TransactionRef, session: AsyncSession):
     """الانتقال للطلب التالي"""
-    current_id = int(callback.data.split("_")[3])
-    
+    await move_pending_charge(callback, session, payload.transaction_id, 1)
+
+@callbacks.compact(PENDING_PREV, TransactionRef, admin=True, legacy="admin_pending_prev_")
+async def admin_pending_prev(callback: CallbackQuery, payload: TransactionRef, session: AsyncSession):
+    """الرجوع للطلب السابق"""
+    await move_pending_charge(callback, session, payload.transaction_id, -1)
+
+async def move_pending_charge(callback: CallbackQuery, session: AsyncSession, current_id: int, step: int):
+    """التنقل بين طلبات الشحن المعلقة انطلاقاً من الطلب الحالي"""
     from database.crud.transactions import TransactionCRUD
     
     tx_crud = TransactionCRUD(session)
@@ -420,46 +428,57 @@ async def admin_pending_next(callback: CallbackQuery, session: AsyncSession):
     
     # البحث عن الموضع الحالي
     current_index = next((i for i, tx in enumerate(pending_txs) if tx.id == current_id), -1)
+    target_index = current_index + step
     
-    if current_index == -1 or current_index + 1 >= len(pending_txs):
-        await callback.answer("❌ لا يوجد طلب تالي", show_alert=True)
+    if current_index == -1 or not 0 <= target_index < len(pending_txs):
+        await callback.answer(
+            "❌ لا يوجد طلب تالي" if step > 0 else "❌ لا يوجد طلب سابق",
+            show_alert=True
+        )
         return
     
-    # الطلب التالي
-    next_tx = pending_txs[current_index + 1]
+    await show_pending_charge(callback, pending_txs, target_index)
+
+async def show_pending_charge(callback: CallbackQuery, pending_txs: list, index: int):
+    """عرض طلب شحن معلق مع أزرار التحكم والتنقل (وظيفة مساعدة)"""
+    tx = pending_txs[index]
     
     tx_text = f"""
 <b>📥 طلبات الشحن المعلقة ({len(pending_txs)})</b>
 
-<b>الطلب الحالي ({current_index + 2}/{len(pending_txs)}):</b>
-🔢 <b>رقم المعاملة:</b> {next_tx.id}
-💰 <b>المبلغ:</b> {next_tx.amount:,} ليرة
-💳 <b>الطريقة:</b> {next_tx.payment_method}
-🔑 <b>رقم العملية:</b> {next_tx.transaction_id}
-👤 <b>المستخدم:</b> {next_tx.user_id}
-🕒 <b>الوقت:</b> {next_tx.created_at.strftime('%Y-%m-%d %H:%M')}
-📝 <b>الحالة:</b> {next_tx.status}
+<b>الطلب الحالي ({index + 1}/{len(pending_txs)}):</b>
+🔢 <b>رقم المعاملة:</b> {tx.id}
+💰 <b>المبلغ:</b> {tx.amount:,} ليرة
+💳 <b>الطريقة:</b> {tx.payment_method}
+🔑 <b>رقم العملية:</b> {tx.transaction_id}
+👤 <b>المستخدم:</b> {tx.user_id}
+🕒 <b>الوقت:</b> {tx.created_at.strftime('%Y-%m-%d %H:%M')}
+📝 <b>الحالة:</b> {tx.status}
 """
     
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     
     builder = InlineKeyboardBuilder()
     
-    # أزرار التحكم
-    builder.button(text="✅ قبول", callback_data=f"approve_{next_tx.id}")
-    builder.button(text="❌ رفض", callback_data=f"reject_{next_tx.id}")
-    builder.button(text="🔁 إعادة التحقق", callback_data=f"reverify_{next_tx.id}")
+    # أزرار التحكم بالمعاملة الحالية
+    builder.button(text="✅ قبول", callback_data=pack(TX_APPROVE, tx.id))
+    builder.button(text="❌ رفض", callback_data=pack(TX_REJECT, tx.id))
+    builder.button(text="🔁 إعادة التحقق", callback_data=pack(TX_REVERIFY, tx.id))
     
     # أزرار التنقل
-    builder.button(text="⬅️ السابق", callback_data=f"admin_pending_prev_{next_tx.id}")
+    navigation = 0
+    if index > 0:
+        builder.button(text="⬅️ السابق", callback_data=pack(PENDING_PREV, tx.id))
+        navigation += 1
     
-    if current_index + 2 < len(pending_txs):
-        builder.button(text="➡️ التالي", callback_data=f"admin_pending_next_{next_tx.id}")
+    if index + 1 < len(pending_txs):
+        builder.button(text="➡️ التالي", callback_data=pack(PENDING_NEXT, tx.id))
+        navigation += 1
     
     builder.button(text="🔄 تحديث", callback_data="admin_pending_charges")
     builder.button(text="⬅️ رجوع", callback_data="admin_payments")
     
-    builder.adjust(3, 2, 1, 1)
+    builder.adjust(3, *((navigation,) if navigation else ()), 1, 1)
     
     await callback.message.edit_text(
         tx_text,
@@ -12,12 +12,24 @@ import io
 
 from keyboards.main import back_button, confirmation_buttons, admin_transaction_buttons
 from core.bot import logger
+from core.callbacks import callbacks
+from core.charge_txids import charge_txids
+from filters import IsAdmin
+from keyboards.callback_data import (
+    pack, TransactionRef, UserTransactionRef, ExportRef,
+    TX_APPROVE, TX_REJECT, TX_REVERIFY, TX_DELIVER, TX_RESET_USER, TX_CONFIRM_RESET, TX_EXPORT_CSV
+)
 from database.models import Transaction, User
 from database.crud.transactions import TransactionCRUD
 from database.crud.users import UserCRUD
+from core.unmatched_sms import unmatched_sms
+from utils.sms_parser import SMSParser
 from config import ADMIN_ID, CHANNEL_ADMIN_LOGS
 
 router = Router()
+# الـ router للأدمن فقط: يتم تخطيه كاملاً لغيره
+router.message.filter(IsAdmin())
+router.callback_query.filter(IsAdmin())
 
 class TransactionAdminStates(StatesGroup):
     """حالات إدارة المعاملات"""
@@ -140,6 +152,10 @@ async def process_transaction_approval(
                 notes=f"تم الرفض بواسطة {admin_id}"
             )
             
+            # رقم العملية المرفوض يمكن إعادة إرساله (حدث NOTIFY يكرر ذلك في باقي العمال)
+            if transaction.type == "charge" and transaction.transaction_id:
+                await charge_txids.remove(transaction.payment_method, transaction.transaction_id)
+            
             # إرسال إشعار للمستخدم
             await notify_user(
                 transaction.user_id,
@@ -202,7 +218,7 @@ async def notify_user(user_id: int, message: str):
     """إرسال إشعار للمستخدم"""
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         await bot.send_message(user_id, message, parse_mode="HTML")
     except Exception as e:
         logger.warning(f"Could not notify user {user_id}: {e}")
@@ -211,7 +227,7 @@ async def update_channel_message(callback: CallbackQuery, transaction: Transacti
     """تحديث رسالة القناة"""
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         # الحصول على النص الأصلي
         original_text = callback.message.text or callback.message.caption or ""
@@ -232,10 +248,10 @@ async def update_channel_message(callback: CallbackQuery, transaction: Transacti
 
 # ==================== معالجات أزرار المعاملات ====================
 
-@router.callback_query(F.data.startswith("approve_"))
-async def approve_transaction(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(TX_APPROVE, TransactionRef, admin=True, legacy="approve_", long_running="⏳ جاري المعالجة...")
+async def approve_transaction(callback: CallbackQuery, payload: TransactionRef, session: AsyncSession):
     """معالجة زر الموافقة"""
-    transaction_id = int(callback.data.split("_")[1])
+    transaction_id = payload.transaction_id
     
     success = await process_transaction_approval(
         callback, session, transaction_id, "approve", callback.from_user.id
@@ -246,10 +262,10 @@ async def approve_transaction(callback: CallbackQuery, session: AsyncSession):
     else:
         await callback.answer()
 
-@router.callback_query(F.data.startswith("reject_"))
-async def reject_transaction(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(TX_REJECT, TransactionRef, admin=True, legacy="reject_", long_running="⏳ جاري المعالجة...")
+async def reject_transaction(callback: CallbackQuery, payload: TransactionRef, session: AsyncSession):
     """معالجة زر الرفض"""
-    transaction_id = int(callback.data.split("_")[1])
+    transaction_id = payload.transaction_id
     
     success = await process_transaction_approval(
         callback, session, transaction_id, "reject", callback.from_user.id
@@ -260,10 +276,48 @@ async def reject_transaction(callback: CallbackQuery, session: AsyncSession):
     else:
         await callback.answer()
 
-@router.callback_query(F.data.startswith("deliver_"))
-async def deliver_transaction(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(TX_REVERIFY, TransactionRef, admin=True, legacy="reverify_", long_running="⏳ جاري التحقق...")
+async def reverify_transaction(callback: CallbackQuery, payload: TransactionRef, session: AsyncSession):
+    """معالجة زر إعادة التحقق: مطابقة طلب الشحن مع رسائل SMS التي وصلت دون طلب"""
+    transaction_id = payload.transaction_id
+    
+    tx_crud = TransactionCRUD(session)
+    transaction = await tx_crud.get_transaction(transaction_id)
+    
+    if not transaction:
+        await callback.answer("❌ المعاملة غير موجودة", show_alert=True)
+        return
+    
+    if transaction.type != "charge" or transaction.status != "pending":
+        await callback.answer(f"⚠️ لا يمكن إعادة التحقق ({transaction.type}/{transaction.status})", show_alert=True)
+        return
+    
+    sms = await unmatched_sms.claim(transaction.transaction_id, transaction.amount)
+    if sms is None:
+        await callback.answer("🔍 لم تصل رسالة SMS مطابقة لرقم العملية والمبلغ", show_alert=True)
+        return
+    
+    approved = await SMSParser(session).auto_approve_batch([(sms, transaction_id)])
+    if not approved:
+        # عولجت بالتوازي: نعيد الرسالة للفهرس كي لا تضيع
+        await unmatched_sms.remember([sms])
+        await callback.answer("⚠️ تمت معالجتها مسبقاً", show_alert=True)
+        return
+    
+    await update_channel_message(
+        callback,
+        transaction,
+        f"\n\n✅ <b>تمت الموافقة بعد إعادة التحقق</b>\n"
+        f"📱 <b>من الرقم:</b> {sms.from_number or '-'}"
+    )
+    
+    logger.info(f"Transaction {transaction_id} approved on reverify by {callback.from_user.id}")
+    await callback.answer("✅ تم العثور على الرسالة والموافقة")
+
+@callbacks.compact(TX_DELIVER, TransactionRef, admin=True, legacy="deliver_", long_running="⏳ جاري المعالجة...")
+async def deliver_transaction(callback: CallbackQuery, payload: TransactionRef, session: AsyncSession):
     """معالجة زر تم التسليم"""
-    transaction_id = int(callback.data.split("_")[1])
+    transaction_id = payload.transaction_id
     
     success = await process_transaction_approval(
         callback, session, transaction_id, "deliver", callback.from_user.id
@@ -274,10 +328,10 @@ async def deliver_transaction(callback: CallbackQuery, session: AsyncSession):
     else:
         await callback.answer()
 
-@router.callback_query(F.data.startswith("reset_user_"))
-async def reset_user_balance(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(TX_RESET_USER, TransactionRef, admin=True, legacy="reset_user_")
+async def reset_user_balance(callback: CallbackQuery, payload: TransactionRef, session: AsyncSession):
     """زر تصفير حساب المستخدم"""
-    transaction_id = int(callback.data.split("_")[2])
+    transaction_id = payload.transaction_id
     
     # جلب المعاملة والمستخدم
     tx_crud = TransactionCRUD(session)
@@ -298,7 +352,7 @@ async def reset_user_balance(callback: CallbackQuery, session: AsyncSession):
         f"<b>هل تريد تصفير رصيد هذا المستخدم؟</b>\n"
         f"سيتم وضع رصيده على 0.",
         reply_markup=confirmation_buttons(
-            f"confirm_reset_{user_id}_{transaction_id}",
+            pack(TX_CONFIRM_RESET, user_id, transaction_id),
             f"cancel_reset_{transaction_id}"
         ),
         parse_mode="HTML"
@@ -306,25 +360,21 @@ async def reset_user_balance(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer()
 
-@router.callback_query(F.data.startswith("confirm_reset_"))
-async def confirm_reset_user_balance(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(TX_CONFIRM_RESET, UserTransactionRef, admin=True, legacy="confirm_reset_", long_running="⏳ جاري المعالجة...")
+async def confirm_reset_user_balance(callback: CallbackQuery, payload: UserTransactionRef, session: AsyncSession):
     """تأكيد تصفير حساب المستخدم"""
-    parts = callback.data.split("_")
-    user_id = int(parts[2])
-    transaction_id = int(parts[3])
+    user_id, transaction_id = payload
     
     user_crud = UserCRUD(session)
     
-    # جلب الرصيد الحالي
-    user = await user_crud.get_user(user_id)
+    # التحقق من وجود المستخدم مع قفل الصف (بدون كاش)
+    user = await user_crud.get_user_for_update(user_id)
     if not user:
         await callback.answer("❌ المستخدم غير موجود", show_alert=True)
         return
     
-    old_balance = user.balance
-    
-    # تصفير الرصيد
-    await user_crud.update_balance(user_id, 0, operation="set")
+    # تصفير الرصيد؛ الرصيد السابق من نفس القراءة المقفلة وليس من الكاش
+    old_balance, _ = await user_crud.update_balance(user_id, 0, operation="set")
     
     # تسجيل المعاملة الإدارية
     tx_crud = TransactionCRUD(session)
@@ -339,7 +389,7 @@ async def confirm_reset_user_balance(callback: CallbackQuery, session: AsyncSess
     
     # تحديث رسالة القناة
     from core.bot import bot_manager
-    bot = await bot_manager.bot
+    bot = bot_manager.bot
     
     original_text = callback.message.text or ""
     new_text = original_text + f"\n\n🔄 <b>تم تصفير الحساب</b>\n💰 <b>الرصيد السابق:</b> {old_balance:,} ليرة"
@@ -370,13 +420,12 @@ async def confirm_reset_user_balance(callback: CallbackQuery, session: AsyncSess
 
 # ==================== إدارة المعاملات من لوحة التحكم ====================
 
-@router.callback_query(F.data == "admin_all_charges")
-@admin_required
+@callbacks.exact("admin_all_charges", admin=True)
 async def show_all_charges(callback: CallbackQuery, session: AsyncSession):
     """عرض جميع طلبات الشحن"""
     await show_filtered_transactions(callback, session, "charge")
 
-@router.callback_query(F.data == "admin_all_withdraws")
+@callbacks.exact("admin_all_withdraws", admin=True)
 async def show_all_withdraws(callback: CallbackQuery, session: AsyncSession):
     """عرض جميع طلبات السحب"""
     await show_filtered_transactions(callback, session, "withdraw")
@@ -438,7 +487,7 @@ async def show_filtered_transactions(callback: CallbackQuery, session: AsyncSess
     
     builder = InlineKeyboardBuilder()
     
-    builder.button(text="📤 تصدير كـ CSV", callback_data=f"export_{tx_type or 'all'}_csv")
+    builder.button(text="📤 تصدير كـ CSV", callback_data=pack(TX_EXPORT_CSV, tx_type or "all"))
     builder.button(text="🔍 بحث متقدم", callback_data=f"search_{tx_type or 'all'}")
     
     if tx_type == "charge":
@@ -460,11 +509,10 @@ async def show_filtered_transactions(callback: CallbackQuery, session: AsyncSess
     
     await callback.answer()
 
-@router.callback_query(F.data.startswith("export_") and F.data.endswith("_csv"))
-@admin_required
-async def export_transactions_csv(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(TX_EXPORT_CSV, ExportRef, admin=True)
+async def export_transactions_csv(callback: CallbackQuery, payload: ExportRef, session: AsyncSession):
     """تصدير المعاملات كملف CSV"""
-    tx_type = callback.data.split("_")[1]  # charge, withdraw, all
+    tx_type = payload.tx_type  # charge, withdraw, all
     
     if tx_type == "all":
         tx_type = None
@@ -517,7 +565,7 @@ async def export_transactions_csv(callback: CallbackQuery, session: AsyncSession
     # إرسال الملف
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         # حفظ في ملف مؤقت
         filename = f"transactions_{tx_type or 'all'}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -555,21 +603,4 @@ async def export_transactions_csv(callback: CallbackQuery, session: AsyncSession
             parse_mode="HTML"
         )
     
-    await callback.answer()
-
-def admin_required(func):
-    """مصادقة الأدمن"""
-    async def wrapper(*args, **kwargs):
-        callback_or_message = args[0]
-        user_id = callback_or_message.from_user.id
-        
-        if user_id != ADMIN_ID:
-            if isinstance(callback_or_message, CallbackQuery):
-                await callback_or_message.answer("⛔ صلاحيات غير كافية", show_alert=True)
-            else:
-                await callback_or_message.answer("⛔ هذا الأمر للإدمن فقط.")
-            return
-        
-        return await func(*args, **kwargs)
-    
-    return wrapper
\ No newline at end of file
+    await callback.answer()
\ No newline at end of file
@@ -1,4 +1,4 @@
- from aiogram import Router, F
+from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, FSInputFile
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -9,9 +9,17 @@ import datetime
 import json
 import os
 
-from keyboards.main import back_button, confirmation_buttons, numeric_keyboard
+from keyboards.main import back_button, confirmation_buttons, numeric_keyboard, user_details_back_button
 from core.bot import logger
 from core.redis_cache import cache
+from core.ban_list import ban_list
+from core.callbacks import callbacks
+from filters import IsAdmin
+from keyboards.callback_data import (
+    pack, UserRef, MessageRef, BROADCAST_CONFIRM,
+    USER_VIEW, USER_EDIT_BALANCE, USER_ADD_BALANCE, USER_SUBTRACT_BALANCE, USER_BAN, USER_UNBAN,
+    USER_SEND_MESSAGE, USER_EXPORT, USER_DELETE, USER_CONFIRM_DELETE
+)
 from database.models import User, Transaction, IchancyAccount, Referral
 from database.crud.users import UserCRUD
 from database.crud.transactions import TransactionCRUD
@@ -19,6 +27,9 @@ from config import ADMIN_ID
 from utils.generators import generate_password
 
 router = Router()
+# الـ router للأدمن فقط: يتم تخطيه كاملاً لغيره
+router.message.filter(IsAdmin())
+router.callback_query.filter(IsAdmin())
 
 class UserAdminStates(StatesGroup):
     """حالات إدارة المستخدمين"""
@@ -113,8 +124,7 @@ async def export_user_data(session: AsyncSession, user_id: int) -> Optional[str]
 
 # ==================== معالجات القائمة ====================
 
-@router.callback_query(F.data == "admin_search_user")
-@admin_required
+@callbacks.exact("admin_search_user", admin=True)
 async def search_user_start(callback: CallbackQuery, state: FSMContext):
     """بدء البحث عن مستخدم"""
     await state.set_state(UserAdminStates.search_user)
@@ -181,7 +191,7 @@ async def search_user_process(message: Message, state: FSMContext, session: Asyn
                 for account in accounts[:5]:  # أول 5 نتائج
                     builder.button(
                         text=f"👤 {account.username}",
-                        callback_data=f"admin_view_user_{account.user_id}"
+                        callback_data=pack(USER_VIEW, account.user_id)
                     )
                 
                 builder.button(text="⬅️ رجوع", callback_data="admin_search_user")
@@ -204,11 +214,13 @@ async def search_user_process(message: Message, state: FSMContext, session: Asyn
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("admin_view_user_"))
-@admin_required
-async def view_user_details(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(USER_VIEW, UserRef, admin=True, legacy="admin_view_user_")
+async def view_user_details(callback: CallbackQuery, payload: UserRef, session: AsyncSession, state: FSMContext):
     """عرض تفاصيل مستخدم"""
-    user_id = int(callback.data.split("_")[3])
+    user_id = payload.user_id
+    
+    # زر الرجوع من شاشات الإدخال يلغي الحالة المفتوحة
+    await state.clear()
     
     user_crud = UserCRUD(session)
     user = await user_crud.get_user_with_details(user_id)
@@ -285,18 +297,18 @@ async def show_user_details(message_or_callback, session: AsyncSession, user):
     
     builder = InlineKeyboardBuilder()
     
-    builder.button(text="💰 تعديل الرصيد", callback_data=f"admin_edit_user_balance_{user.user_id}")
-    builder.button(text="📤 سحب رصيد", callback_data=f"admin_subtract_balance_{user.user_id}")
-    builder.button(text="📥 إضافة رصيد", callback_data=f"admin_add_balance_{user.user_id}")
+    builder.button(text="💰 تعديل الرصيد", callback_data=pack(USER_EDIT_BALANCE, user.user_id))
+    builder.button(text="📤 سحب رصيد", callback_data=pack(USER_SUBTRACT_BALANCE, user.user_id))
+    builder.button(text="📥 إضافة رصيد", callback_data=pack(USER_ADD_BALANCE, user.user_id))
     
     if details['is_banned']:
-        builder.button(text="✅ فك الحظر", callback_data=f"admin_unban_user_{user.user_id}")
+        builder.button(text="✅ فك الحظر", callback_data=pack(USER_UNBAN, user.user_id))
     else:
-        builder.button(text="🚫 حظر", callback_data=f"admin_ban_user_{user.user_id}")
+        builder.button(text="🚫 حظر", callback_data=pack(USER_BAN, user.user_id))
     
-    builder.button(text="📨 إرسال رسالة", callback_data=f"admin_send_message_{user.user_id}")
-    builder.button(text="📤 تصدير البيانات", callback_data=f"admin_export_user_{user.user_id}")
-    builder.button(text="🗑️ حذف الحساب", callback_data=f"admin_delete_user_{user.user_id}")
+    builder.button(text="📨 إرسال رسالة", callback_data=pack(USER_SEND_MESSAGE, user.user_id))
+    builder.button(text="📤 تصدير البيانات", callback_data=pack(USER_EXPORT, user.user_id))
+    builder.button(text="🗑️ حذف الحساب", callback_data=pack(USER_DELETE, user.user_id))
     builder.button(text="⬅️ رجوع", callback_data="admin_users")
     
     builder.adjust(2, 2, 2, 2, 1)
@@ -314,11 +326,10 @@ async def show_user_details(message_or_callback, session: AsyncSession, user):
             parse_mode="HTML"
         )
 
-@router.callback_query(F.data.startswith("admin_edit_user_balance_"))
-@admin_required
-async def edit_user_balance_start(callback: CallbackQuery, state: FSMContext):
+@callbacks.compact(USER_EDIT_BALANCE, UserRef, admin=True, legacy="admin_edit_user_balance_")
+async def edit_user_balance_start(callback: CallbackQuery, payload: UserRef, state: FSMContext):
     """بدء تعديل رصيد مستخدم"""
-    user_id = int(callback.data.split("_")[4])
+    user_id = payload.user_id
     
     await state.set_state(UserAdminStates.edit_balance)
     await state.update_data(target_user_id=user_id)
@@ -330,7 +341,7 @@ async def edit_user_balance_start(callback: CallbackQuery, state: FSMContext):
         f"• أدخل الرقم فقط\n"
         f"• مثال: 50000\n\n"
         f"أو أرسل ❌ للإلغاء.",
-        reply_markup=back_button(f"admin_view_user_{user_id}")
+        reply_markup=user_details_back_button(user_id)
     )
     
     await callback.answer()
@@ -391,7 +402,7 @@ async def edit_user_balance_process(message: Message, state: FSMContext, session
     # إرسال إشعار للمستخدم
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         await bot.send_message(
             user_id,
@@ -422,7 +433,7 @@ async def edit_user_balance_process(message: Message, state: FSMContext, session
     
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         await bot.send_message(
             CHANNEL_ADMIN_LOGS,
@@ -448,11 +459,10 @@ async def view_user_details_by_id(message, session, user_id):
     else:
         await message.answer("❌ المستخدم غير موجود")
 
-@router.callback_query(F.data.startswith("admin_add_balance_"))
-@admin_required
-async def add_balance_start(callback: CallbackQuery, state: FSMContext):
+@callbacks.compact(USER_ADD_BALANCE, UserRef, admin=True, legacy="admin_add_balance_")
+async def add_balance_start(callback: CallbackQuery, payload: UserRef, state: FSMContext):
     """بدء إضافة رصيد لمستخدم"""
-    user_id = int(callback.data.split("_")[3])
+    user_id = payload.user_id
     
     await state.set_state(UserAdminStates.add_balance)
     await state.update_data(target_user_id=user_id)
@@ -464,7 +474,7 @@ async def add_balance_start(callback: CallbackQuery, state: FSMContext):
         f"• أدخل الرقم فقط\n"
         f"• مثال: 5000\n\n"
         f"أو أرسل ❌ للإلغاء.",
-        reply_markup=back_button(f"admin_view_user_{user_id}")
+        reply_markup=user_details_back_button(user_id)
     )
     
     await callback.answer()
@@ -525,7 +535,7 @@ async def add_balance_process(message: Message, state: FSMContext, session: Asyn
     # إرسال إشعار للمستخدم
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         await bot.send_message(
             user_id,
@@ -551,8 +561,193 @@ async def add_balance_process(message: Message, state: FSMContext, session: Asyn
     
     await state.clear()
 
-@router.callback_query(F.data == "admin_top_balance")
-@admin_required
+@callbacks.compact(USER_SUBTRACT_BALANCE, UserRef, admin=True, legacy="admin_subtract_balance_")
+async def subtract_balance_start(callback: CallbackQuery, payload: UserRef, state: FSMContext):
+    """بدء سحب رصيد من مستخدم"""
+    user_id = payload.user_id
+    
+    await state.set_state(UserAdminStates.subtract_balance)
+    await state.update_data(target_user_id=user_id)
+    
+    await callback.message.edit_text(
+        f"📤 <b>سحب رصيد من المستخدم</b>\n\n"
+        f"المستخدم: <code>{user_id}</code>\n\n"
+        f"⬇️ <b>أدخل المبلغ للسحب:</b>\n"
+        f"• أدخل الرقم فقط\n"
+        f"• مثال: 5000\n\n"
+        f"أو أرسل ❌ للإلغاء.",
+        reply_markup=user_details_back_button(user_id)
+    )
+    
+    await callback.answer()
+
+@router.message(UserAdminStates.subtract_balance)
+async def subtract_balance_process(message: Message, state: FSMContext, session: AsyncSession):
+    """معالجة سحب الرصيد"""
+    data = await state.get_data()
+    user_id = data.get("target_user_id")
+    
+    if not user_id:
+        await message.answer("❌ جلسة منتهية")
+        await state.clear()
+        return
+    
+    amount_text = message.text.strip()
+    
+    if amount_text == "❌":
+        await state.clear()
+        await view_user_details_by_id(message, session, user_id)
+        return
+    
+    if not amount_text.isdigit():
+        await message.answer(
+            "❌ <b>قيمة غير صالحة!</b>\n"
+            "يجب إدخال أرقام فقط.\n"
+            "⬇️ أعد إدخال المبلغ:",
+            parse_mode="HTML"
+        )
+        return
+    
+    amount = int(amount_text)
+    
+    if amount <= 0:
+        await message.answer(
+            "❌ <b>القيمة غير صالحة!</b>\n"
+            "يجب أن يكون المبلغ موجبًا.\n"
+            "⬇️ أعد إدخال المبلغ:",
+            parse_mode="HTML"
+        )
+        return
+    
+    user_crud = UserCRUD(session)
+    # الرصيد من قاعدة البيانات مع قفل الصف (الكاش قد يكون قديماً) حتى الخصم
+    user = await user_crud.get_user_for_update(user_id)
+    
+    if not user:
+        await message.answer("❌ المستخدم غير موجود")
+        await state.clear()
+        return
+    
+    balance = user.balance
+    if amount > balance:
+        # تحرير القفل قبل الرد
+        await session.rollback()
+        await message.answer(
+            f"❌ <b>المبلغ أكبر من الرصيد!</b>\n"
+            f"💰 <b>رصيد المستخدم:</b> {balance:,} ليرة\n"
+            f"⬇️ أعد إدخال المبلغ:",
+            parse_mode="HTML"
+        )
+        return
+    
+    # سحب الرصيد
+    old_balance, new_balance = await user_crud.update_balance(user_id, amount, operation="subtract")
+    
+    # تسجيل المعاملة
+    tx_crud = TransactionCRUD(session)
+    await tx_crud.create_transaction(
+        user_id=user_id,
+        type_="admin_withdraw",
+        amount=old_balance - new_balance,
+        payment_method="admin",
+        transaction_id=f"SUB_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}",
+        notes=f"سحب إداري بواسطة {message.from_user.id}"
+    )
+    
+    # إرسال إشعار للمستخدم
+    try:
+        from core.bot import bot_manager
+        bot = bot_manager.bot
+        
+        await bot.send_message(
+            user_id,
+            f"🔔 <b>سحب رصيد</b>\n\n"
+            f"تم سحب رصيد من حسابك من قبل الإدمن:\n"
+            f"💰 <b>المبلغ المسحوب:</b> {old_balance - new_balance:,} ليرة\n"
+            f"💰 <b>الرصيد السابق:</b> {old_balance:,} ليرة\n"
+            f"💰 <b>الرصيد الجديد:</b> {new_balance:,} ليرة\n\n"
+            f"🕒 <b>الوقت:</b> {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}",
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logger.warning(f"Could not notify user {user_id}: {e}")
+    
+    await message.answer(
+        f"✅ <b>تم سحب الرصيد بنجاح!</b>\n\n"
+        f"المستخدم: <code>{user_id}</code>\n"
+        f"💰 <b>المبلغ المسحوب:</b> {old_balance - new_balance:,} ليرة\n"
+        f"💰 <b>الرصيد السابق:</b> {old_balance:,} ليرة\n"
+        f"💰 <b>الرصيد الجديد:</b> {new_balance:,} ليرة",
+        parse_mode="HTML"
+    )
+    
+    await state.clear()
+
+@callbacks.compact(USER_SEND_MESSAGE, UserRef, admin=True, legacy="admin_send_message_")
+async def send_message_start(callback: CallbackQuery, payload: UserRef, state: FSMContext):
+    """بدء إرسال رسالة لمستخدم"""
+    user_id = payload.user_id
+    
+    await state.set_state(UserAdminStates.send_message)
+    await state.update_data(target_user_id=user_id)
+    
+    await callback.message.edit_text(
+        f"📨 <b>إرسال رسالة للمستخدم</b>\n\n"
+        f"المستخدم: <code>{user_id}</code>\n\n"
+        f"⬇️ <b>أرسل نص الرسالة:</b>\n"
+        f"• يدعم تنسيق HTML\n\n"
+        f"أو أرسل ❌ للإلغاء.",
+        reply_markup=user_details_back_button(user_id)
+    )
+    
+    await callback.answer()
+
+@router.message(UserAdminStates.send_message)
+async def send_message_process(message: Message, state: FSMContext, session: AsyncSession):
+    """معالجة إرسال الرسالة للمستخدم"""
+    data = await state.get_data()
+    user_id = data.get("target_user_id")
+    
+    if not user_id:
+        await message.answer("❌ جلسة منتهية")
+        await state.clear()
+        return
+    
+    text = (message.html_text or "").strip()
+    
+    if text == "❌":
+        await state.clear()
+        await view_user_details_by_id(message, session, user_id)
+        return
+    
+    if not text:
+        await message.answer("❌ أرسل رسالة نصية:")
+        return
+    
+    try:
+        from core.bot import bot_manager
+        bot = bot_manager.bot
+        
+        await bot.send_message(
+            user_id,
+            f"📨 <b>رسالة من الإدارة</b>\n\n{text}",
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logger.warning(f"Could not send admin message to {user_id}: {e}")
+        await message.answer(f"❌ تعذر إرسال الرسالة: {e}")
+        await state.clear()
+        return
+    
+    await message.answer(
+        f"✅ <b>تم إرسال الرسالة</b>\n\n"
+        f"المستخدم: <code>{user_id}</code>",
+        parse_mode="HTML"
+    )
+    
+    await state.clear()
+
+@callbacks.exact("admin_top_balance", admin=True)
 async def show_top_balances(callback: CallbackQuery, session: AsyncSession):
     """عرض أعلى الأرصدة"""
     user_crud = UserCRUD(session)
@@ -593,8 +788,7 @@ async def show_top_balances(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer()
 
-@router.callback_query(F.data == "admin_broadcast")
-@admin_required
+@callbacks.exact("admin_broadcast", admin=True)
 async def broadcast_message_start(callback: CallbackQuery, state: FSMContext):
     """بدء إرسال رسالة جماعية"""
     await state.set_state(UserAdminStates.broadcast_message)
@@ -625,7 +819,7 @@ async def broadcast_message_process(message: Message, state: FSMContext, session
     from keyboards.main import confirmation_buttons
     
     confirm_kb = confirmation_buttons(
-        confirm_data=f"confirm_broadcast:{message.message_id}",
+        confirm_data=pack(BROADCAST_CONFIRM, message.message_id),
         cancel_data="cancel_broadcast"
     )
     
@@ -638,15 +832,14 @@ async def broadcast_message_process(message: Message, state: FSMContext, session
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("confirm_broadcast:"))
-@admin_required
-async def confirm_broadcast(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(BROADCAST_CONFIRM, MessageRef, admin=True)
+async def confirm_broadcast(callback: CallbackQuery, payload: MessageRef, session: AsyncSession):
     """تأكيد وإرسال الرسالة الجماعية"""
-    message_id = int(callback.data.split(":")[1])
+    message_id = payload.message_id
     
     # جلب الرسالة الأصلية
     from core.bot import bot_manager
-    bot = await bot_manager.bot
+    bot = bot_manager.bot
     
     try:
         original_message = await bot.forward_message(
@@ -738,30 +931,12 @@ async def confirm_broadcast(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer()
 
-def admin_required(func):
-    """مصادقة الأدمن"""
-    async def wrapper(*args, **kwargs):
-        callback_or_message = args[0]
-        user_id = callback_or_message.from_user.id
-        
-        if user_id != ADMIN_ID:
-            if isinstance(callback_or_message, CallbackQuery):
-                await callback_or_message.answer("⛔ صلاحيات غير كافية", show_alert=True)
-            else:
-                await callback_or_message.answer("⛔ هذا الأمر للإدمن فقط.")
-            return
-        
-        return await func(*args, **kwargs)
-    
-    return wrapper
-
 # ==================== الحظر وفك الحظر ====================
 
-@router.callback_query(F.data.startswith("admin_ban_user_"))
-@admin_required
-async def ban_user_start(callback: CallbackQuery, state: FSMContext):
+@callbacks.compact(USER_BAN, UserRef, admin=True, legacy="admin_ban_user_")
+async def ban_user_start(callback: CallbackQuery, payload: UserRef, state: FSMContext):
     """بدء حظر مستخدم"""
-    user_id = int(callback.data.split("_")[3])
+    user_id = payload.user_id
     
     await state.set_state(UserAdminStates.ban_user)
     await state.update_data(target_user_id=user_id)
@@ -773,7 +948,7 @@ async def ban_user_start(callback: CallbackQuery, state: FSMContext):
         f"• سيتم إرساله للمستخدم\n"
         f"• اتركه فارغًا إذا لم يكن هناك سبب\n\n"
         f"أو أرسل ❌ للإلغاء.",
-        reply_markup=back_button(f"admin_view_user_{user_id}")
+        reply_markup=user_details_back_button(user_id)
     )
     
     await callback.answer()
@@ -802,11 +977,15 @@ async def ban_user_process(message: Message, state: FSMContext, session: AsyncSe
     stmt = update(User).where(User.user_id == user_id).values(is_banned=True)
     await session.execute(stmt)
     await session.commit()
+    await cache.delete(f"user:{user_id}")
+    
+    # تحديث مجموعة الحظر ليُسقط البوابة تحديثاته فوراً
+    await ban_list.ban(user_id)
     
     # إرسال إشعار للمستخدم
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         ban_message = f"🚫 <b>تم حظر حسابك</b>\n\n"
         if reason:
@@ -831,7 +1010,7 @@ async def ban_user_process(message: Message, state: FSMContext, session: AsyncSe
     
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         await bot.send_message(
             CHANNEL_ADMIN_LOGS,
@@ -847,11 +1026,10 @@ async def ban_user_process(message: Message, state: FSMContext, session: AsyncSe
     
     await state.clear()
 
-@router.callback_query(F.data.startswith("admin_unban_user_"))
-@admin_required
-async def unban_user(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(USER_UNBAN, UserRef, admin=True, legacy="admin_unban_user_")
+async def unban_user(callback: CallbackQuery, payload: UserRef, session: AsyncSession):
     """فك حظر مستخدم"""
-    user_id = int(callback.data.split("_")[3])
+    user_id = payload.user_id
     
     # التحقق أن المستخدم محظور
     from sqlalchemy import select
@@ -874,11 +1052,13 @@ async def unban_user(callback: CallbackQuery, session: AsyncSession):
     stmt = update(User).where(User.user_id == user_id).values(is_banned=False)
     await session.execute(stmt)
     await session.commit()
+    await cache.delete(f"user:{user_id}")
+    await ban_list.unban(user_id)
     
     # إرسال إشعار للمستخدم
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         await bot.send_message(
             user_id,
@@ -902,7 +1082,7 @@ async def unban_user(callback: CallbackQuery, session: AsyncSession):
     
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         await bot.send_message(
             CHANNEL_ADMIN_LOGS,
@@ -919,11 +1099,10 @@ async def unban_user(callback: CallbackQuery, session: AsyncSession):
 
 # ==================== التصدير والحذف ====================
 
-@router.callback_query(F.data.startswith("admin_export_user_"))
-@admin_required
-async def export_user_data_handler(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(USER_EXPORT, UserRef, admin=True, legacy="admin_export_user_")
+async def export_user_data_handler(callback: CallbackQuery, payload: UserRef, session: AsyncSession):
     """تصدير بيانات مستخدم"""
-    user_id = int(callback.data.split("_")[3])
+    user_id = payload.user_id
     
     await callback.message.edit_text(
         "⏳ <b>جاري تجهيز بيانات التصدير...</b>",
@@ -942,7 +1121,7 @@ async def export_user_data_handler(callback: CallbackQuery, session: AsyncSessio
     # إرسال الملف
     try:
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         file = FSInputFile(filepath)
         await bot.send_document(
@@ -967,11 +1146,10 @@ async def export_user_data_handler(callback: CallbackQuery, session: AsyncSessio
     
     await callback.answer()
 
-@router.callback_query(F.data.startswith("admin_delete_user_"))
-@admin_required
-async def delete_user_confirmation(callback: CallbackQuery):
+@callbacks.compact(USER_DELETE, UserRef, admin=True, legacy="admin_delete_user_")
+async def delete_user_confirmation(callback: CallbackQuery, payload: UserRef):
     """تأكيد حذف مستخدم"""
-    user_id = int(callback.data.split("_")[3])
+    user_id = payload.user_id
     
     await callback.message.edit_text(
         f"⚠️ <b>حذف حساب مستخدم</b>\n\n"
@@ -983,19 +1161,18 @@ async def delete_user_confirmation(callback: CallbackQuery):
         f"• لا يمكن التراجع عنه\n\n"
         f"<b>هل أنت متأكد تمامًا؟</b>",
         reply_markup=confirmation_buttons(
-            f"confirm_delete_user_{user_id}",
-            f"admin_view_user_{user_id}"
+            pack(USER_CONFIRM_DELETE, user_id),
+            pack(USER_VIEW, user_id)
         ),
         parse_mode="HTML"
     )
     
     await callback.answer()
 
-@router.callback_query(F.data.startswith("confirm_delete_user_"))
-@admin_required
-async def delete_user_execute(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(USER_CONFIRM_DELETE, UserRef, admin=True, legacy="confirm_delete_user_")
+async def delete_user_execute(callback: CallbackQuery, payload: UserRef, session: AsyncSession):
     """تنفيذ حذف المستخدم"""
-    user_id = int(callback.data.split("_")[3])
+    user_id = payload.user_id
     
     try:
         # بداية معاملة
@@ -1029,7 +1206,7 @@ async def delete_user_execute(callback: CallbackQuery, session: AsyncSession):
         
         try:
             from core.bot import bot_manager
-            bot = await bot_manager.bot
+            bot = bot_manager.bot
             
             await bot.send_message(
                 CHANNEL_ADMIN_LOGS,
@@ -1054,8 +1231,7 @@ async def delete_user_execute(callback: CallbackQuery, session: AsyncSession):
 
 # ==================== التصفير الجماعي ====================
 
-@router.callback_query(F.data == "admin_reset_all_balances")
-@admin_required
+@callbacks.exact("admin_reset_all_balances", admin=True)
 async def reset_all_balances_confirmation(callback: CallbackQuery):
     """تأكيد تصفير جميع الأرصدة"""
     await callback.message.edit_text(
@@ -1076,8 +1252,7 @@ async def reset_all_balances_confirmation(callback: CallbackQuery):
     
     await callback.answer()
 
-@router.callback_query(F.data == "confirm_reset_all_balances")
-@admin_required
+@callbacks.exact("confirm_reset_all_balances", admin=True)
 async def reset_all_balances_execute(callback: CallbackQuery, session: AsyncSession):
     """تنفيذ تصفير جميع الأرصدة"""
     await callback.message.edit_text(
@@ -1130,7 +1305,7 @@ async def reset_all_balances_execute(callback: CallbackQuery, session: AsyncSess
         
         try:
             from core.bot import bot_manager
-            bot = await bot_manager.bot
+            bot = bot_manager.bot
             
             await bot.send_message(
                 CHANNEL_ADMIN_LOGS,
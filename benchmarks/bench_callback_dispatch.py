@@ -0,0 +1,167 @@
+"""
+قياس تكلفة توجيه الـ callback لكل تحديث: سلاسل فلاتر F.data عبر الـ routers (قبل)
+مقابل جدول الهاش مع البيانات المضغوطة (بعد)، والأزرار القديمة عبر مسارات legacy.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_callback_dispatch
+"""
+import asyncio
+import os
+import time
+
+# core.database ينشئ المحرك عند الاستيراد؛ القياس لا يتصل بقاعدة البيانات
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+
+from aiogram import Bot, Dispatcher, Router, F
+from aiogram.types import Update, CallbackQuery, User
+
+from core.callbacks import CallbackRegistry
+from keyboards.callback_data import (
+    pack, BackTarget, TransactionRef, UserRef, CodeRef,
+    BACK, TX_APPROVE, TX_REJECT, USER_VIEW, USER_BAN, CODE_VIEW, PENDING_NEXT
+)
+from middlewares.callback_routing import CallbackRoutingMiddleware
+
+UPDATES = 20000
+ADMIN = 1
+USER = 2
+
+
+async def noop(callback: CallbackQuery):
+    return True
+
+
+async def noop_split(callback: CallbackQuery):
+    # المعالجات القديمة كانت تعيد تحليل المعرف من النص
+    return int(callback.data.rsplit("_", 1)[1])
+
+
+# ==================== قبل: فلاتر F.data على تسعة routers ====================
+
+OLD_ROUTERS = [
+    ("start", [F.data == "back_main", F.data == "cancel", F.data.startswith("back_")]),
+    ("charge", [F.data == "charge_main", F.data.in_(["pay_syr", "pay_sch", "pay_sch_usd"]), F.data == "confirm_charge"]),
+    ("syriatel", [
+        F.data == "syriatel_info", F.data == "admin_syriatel_codes", F.data == "syriatel_add_code",
+        F.data.startswith("syriatel_activate_"), F.data == "syriatel_list_codes", F.data.startswith("syriatel_code_"),
+        F.data == "syriatel_reset_codes", F.data == "confirm_syriatel_reset"
+    ]),
+    ("withdraw", [F.data == "withdraw_main", F.data.in_(["withdraw_syr", "withdraw_sch", "withdraw_sch_usd"]), F.data == "confirm_withdraw"]),
+    ("ichancy", []),
+    ("dashboard", [
+        F.data == "admin_panel", F.data == "admin_stats", F.data == "export_stats_json", F.data == "admin_users",
+        F.data == "admin_payments", F.data == "admin_pending_charges", F.data.startswith("admin_pending_next_")
+    ]),
+    ("users", [
+        F.data == "admin_search_user", F.data.startswith("admin_view_user_"), F.data.startswith("admin_edit_user_balance_"),
+        F.data.startswith("admin_add_balance_"), F.data == "admin_top_balance", F.data == "admin_broadcast",
+        F.data.startswith("confirm_broadcast:"), F.data.startswith("admin_ban_user_"), F.data.startswith("admin_unban_user_"),
+        F.data.startswith("admin_export_user_"), F.data.startswith("admin_delete_user_"), F.data.startswith("confirm_delete_user_"),
+        F.data == "admin_reset_all_balances", F.data == "confirm_reset_all_balances"
+    ]),
+    ("transactions", [
+        F.data.startswith("approve_"), F.data.startswith("reject_"), F.data.startswith("deliver_"),
+        F.data.startswith("reset_user_"), F.data.startswith("confirm_reset_"), F.data == "admin_all_charges",
+        F.data == "admin_all_withdraws", F.data.endswith("_csv")
+    ]),
+    ("sms", []),
+]
+
+OLD_MIX = [
+    (USER, "back_main"), (USER, "charge_main"), (USER, "pay_syr"), (USER, "confirm_charge"),
+    (USER, "back_withdraw_main"), (USER, "withdraw_sch"), (USER, "confirm_withdraw"),
+    (ADMIN, "approve_1542"), (ADMIN, "reject_1542"), (ADMIN, "admin_view_user_123456789"),
+    (ADMIN, "admin_ban_user_123456789"), (ADMIN, "syriatel_code_17"), (ADMIN, "admin_pending_next_1542"),
+    (ADMIN, "admin_pending_charges"),
+]
+
+
+def build_before() -> Dispatcher:
+    dp = Dispatcher()
+    for name, filters in OLD_ROUTERS:
+        router = Router(name=name)
+        for flt in filters:
+            router.callback_query.register(noop_split if "startswith" in repr(flt) else noop, flt)
+        dp.include_router(router)
+    return dp
+
+
+# ==================== بعد: جدول هاش وبيانات مضغوطة ====================
+
+NEW_MIX = [
+    (USER, "back_main"), (USER, "charge_main"), (USER, "pay_syr"), (USER, "confirm_charge"),
+    (USER, pack(BACK, "withdraw_main")), (USER, "withdraw_sch"), (USER, "confirm_withdraw"),
+    (ADMIN, pack(TX_APPROVE, 1542)), (ADMIN, pack(TX_REJECT, 1542)), (ADMIN, pack(USER_VIEW, 123456789)),
+    (ADMIN, pack(USER_BAN, 123456789)), (ADMIN, pack(CODE_VIEW, 17)), (ADMIN, pack(PENDING_NEXT, 1542)),
+    (ADMIN, "admin_pending_charges"),
+]
+
+
+def build_after() -> Dispatcher:
+    registry = CallbackRegistry()
+
+    registry.exact("back_main", "cancel", "charge_main", "pay_syr", "pay_sch", "pay_sch_usd", "confirm_charge",
+                   "withdraw_main", "withdraw_syr", "withdraw_sch", "withdraw_sch_usd", "confirm_withdraw",
+                   "syriatel_info")(noop)
+    registry.exact("admin_panel", "admin_stats", "admin_users", "admin_payments", "admin_pending_charges",
+                   "admin_syriatel_codes", admin=True)(noop)
+    registry.compact(BACK, BackTarget)(noop)
+    for code, legacy in ((TX_APPROVE, "approve_"), (TX_REJECT, "reject_"), (PENDING_NEXT, "admin_pending_next_")):
+        registry.compact(code, TransactionRef, admin=True, legacy=legacy)(noop)
+    for code, legacy in ((USER_VIEW, "admin_view_user_"), (USER_BAN, "admin_ban_user_")):
+        registry.compact(code, UserRef, admin=True, legacy=legacy)(noop)
+    registry.compact(CODE_VIEW, CodeRef, admin=True, legacy="syriatel_code_")(noop)
+
+    dp = Dispatcher()
+    for name, _ in OLD_ROUTERS:
+        dp.include_router(Router(name=name))
+    dp.callback_query.outer_middleware(CallbackRoutingMiddleware(dp.callback_query.middleware, registry))
+    return dp
+
+
+def make_updates(mix):
+    updates = []
+    for i in range(UPDATES):
+        user_id, data = mix[i % len(mix)]
+        updates.append(Update(
+            update_id=i,
+            callback_query=CallbackQuery(
+                id=str(i),
+                from_user=User(id=user_id, is_bot=False, first_name="bench"),
+                chat_instance="bench",
+                data=data
+            )
+        ))
+    return updates
+
+
+async def measure(name: str, dp: Dispatcher, updates, bot: Bot):
+    for update in updates[:100]:  # إحماء
+        await dp.feed_update(bot, update)
+
+    start = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<8} {elapsed / len(updates) * 1e6:8.1f} µs/callback")
+
+
+async def main():
+    import middlewares.callback_routing as routing
+
+    # الأدمن في هذا القياس هو المستخدم 1
+    routing.ADMIN_ID = ADMIN
+
+    bot = Bot(token="42:BENCHMARK")
+    try:
+        await measure("before", build_before(), make_updates(OLD_MIX), bot)
+        await measure("after", build_after(), make_updates(NEW_MIX), bot)
+        # أزرار الرسائل المنشورة قبل الرموز المضغوطة
+        await measure("legacy", build_after(), make_updates(OLD_MIX), bot)
+    finally:
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""
+قياس تكلفة بناء اللوحات لكل تحديث: البناء عند كل طلب مقابل النسخ المشتركة من السجل.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_keyboards
+"""
+import time
+import tracemalloc
+
+from keyboards.main import (
+    _build_main_menu, _build_payment_methods_keyboard, _build_cancel_button, _build_admin_panel_keyboard,
+    main_menu, payment_methods_keyboard, cancel_button, admin_panel_keyboard
+)
+from keyboards.registry import keyboards
+
+UPDATES = 5000
+USER_ID = 123456789
+
+
+def before():
+    """السلوك القديم: بناء اللوحة في كل تحديث"""
+    _build_main_menu(is_admin=False)
+    _build_payment_methods_keyboard("charge")
+    _build_cancel_button()
+    _build_admin_panel_keyboard()
+
+
+def after():
+    """السلوك الجديد: نسخ مشتركة من السجل"""
+    main_menu(USER_ID)
+    payment_methods_keyboard("charge")
+    cancel_button()
+    admin_panel_keyboard()
+
+
+def measure(name, func):
+    func()  # إحماء
+
+    start = time.perf_counter()
+    for _ in range(UPDATES):
+        func()
+    elapsed = time.perf_counter() - start
+
+    # الذروة لتحديث واحد تشمل الكائنات المؤقتة التي يحررها GC لاحقاً
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<8} {elapsed / UPDATES * 1e6:8.1f} µs/update  peak {peak:8,} bytes/update")
+
+
+if __name__ == "__main__":
+    print(f"Prebuilt {keyboards.build_all()} keyboards/screens\n")
+    measure("before", before)
+    measure("after", after)
@@ -0,0 +1,88 @@
+"""
+قياس محلل رسائل سيرياتيل كاش: حلقة re.search على الأنماط النصية لكل رسالة (قبل)
+مقابل الأنماط المترجمة مسبقاً مع الفلترة بالكلمات المميزة (بعد).
+يقيس عدد الرسائل في الثانية والدقة على عينة موسومة من benchmarks/data/syriatel_sms.json.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_sms_matcher
+"""
+import json
+import os
+import re
+import time
+from typing import Optional, Dict, Any
+
+from utils.sms_matcher import match_syriatel_sms
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "syriatel_sms.json")
+ROUNDS = 2000
+
+# نسخة من الحلقة القديمة في SMSParser.parse_syriatel_sms
+OLD_PATTERNS = [
+    r'تم استلام مبلغ (\d+(?:,\d+)*) ليرة من (\d+).*?رقم العملية[:\s]*(\d+).*?الرصيد الجديد[:\s]*(\d+(?:,\d+)*)',
+    r'تم تحويل مبلغ (\d+(?:,\d+)*) ليرة إلى حسابك.*?رقم العملية[:\s]*(\d+)',
+    r'received (\d+(?:,\d+)*) SP from (\d+).*?Transaction ID[:\s]*(\d+).*?New balance[:\s]*(\d+(?:,\d+)*)',
+    r'عملية إيداع[:\s]*(\d+(?:,\d+)*) ليرة.*?رقم العملية[:\s]*(\d+)',
+    r'تم إيداع (\d+(?:,\d+)*) ليرة.*?رقم العملية[:\s]*(\d+).*?الرصيد[:\s]*(\d+(?:,\d+)*)',
+]
+
+
+def before(text: str, sender: str) -> Optional[Dict[str, Any]]:
+    text = text.strip()
+    for pattern in OLD_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        if match:
+            groups = match.groups()
+            if len(groups) == 4:
+                amount, from_number, txid, balance = groups
+            elif len(groups) == 3:
+                amount, txid, balance = groups
+                from_number = sender
+            else:
+                amount, txid = groups
+                from_number, balance = sender, None
+            return {
+                "transaction_id": txid,
+                "amount": int(amount.replace(",", "")),
+                "from_number": from_number,
+                "balance": int(balance.replace(",", "")) if balance else None
+            }
+    return None
+
+
+def after(text: str, sender: str) -> Optional[Dict[str, Any]]:
+    parsed = match_syriatel_sms(text.strip(), sender)
+    if parsed is None:
+        return None
+    return {
+        "transaction_id": parsed.transaction_id,
+        "amount": parsed.amount,
+        "from_number": parsed.from_number,
+        "balance": parsed.balance
+    }
+
+
+def measure(name: str, parse, corpus):
+    correct = sum(parse(s["text"], s["sender"]) == s["expected"] for s in corpus)
+
+    # الرسائل غير المالية هي الأغلب من بوابة SMS، نقيس على العينة كما هي
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for sample in corpus:
+            parse(sample["text"], sample["sender"])
+    elapsed = time.perf_counter() - start
+
+    rate = ROUNDS * len(corpus) / elapsed
+    print(f"{name:<8} {rate:>10,.0f} SMS/s  accuracy {correct}/{len(corpus)}")
+
+
+def main():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    measure("before", before, corpus)
+    measure("after", after, corpus)
+
+
+if __name__ == "__main__":
+    main()
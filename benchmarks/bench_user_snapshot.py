@@ -0,0 +1,75 @@
+"""
+قياس تكلفة كل إصابة في كاش المستخدم: بناء كائن ORM من القاموس (قبل)
+مقابل UserSnapshot بـ __slots__ (بعد).
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_user_snapshot
+"""
+import datetime
+import os
+import time
+import tracemalloc
+
+# core.database ينشئ المحرك عند الاستيراد؛ القياس لا يتصل بقاعدة البيانات
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+
+from sqlalchemy.orm import configure_mappers
+
+from database.models import User
+from database.snapshots import UserSnapshot
+
+HITS = 20000
+KEEP = 1000
+
+OLD_PAYLOAD = {
+    "user_id": 123456789,
+    "balance": 250000,
+    "is_banned": False,
+    "referrals_count": 4,
+    "active_referrals": 2
+}
+
+NEW_PAYLOAD = UserSnapshot(
+    123456789, 250000, 4, 2, 15000, False, datetime.datetime(2026, 1, 1, 12, 0)
+).to_cache()
+
+
+def before():
+    return User(**OLD_PAYLOAD)
+
+
+def after():
+    return UserSnapshot.from_cache(NEW_PAYLOAD)
+
+
+def cpu(func) -> float:
+    for _ in range(500):  # إحماء
+        func()
+
+    start = time.perf_counter()
+    for _ in range(HITS):
+        func()
+    return (time.perf_counter() - start) / HITS
+
+
+def memory(func) -> float:
+    """متوسط الذاكرة المحجوزة لكل كائن محتفظ به"""
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+    kept = [func() for _ in range(KEEP)]
+    allocated = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(snapshot, "filename"))
+    tracemalloc.stop()
+    del kept
+    return allocated / KEEP
+
+
+def main():
+    # تهيئة الـ mappers مسبقاً حتى لا تُحسب ضمن القياس
+    configure_mappers()
+
+    for name, func in (("before", before), ("after", after)):
+        print(f"{name:<8} {cpu(func) * 1e6:8.2f} µs/hit  {memory(func):8.0f} bytes/object")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from .settings import (
     BOT_TOKEN, ADMIN_ID, DATABASE_URL, REDIS_URL,
+    REDIS_HOST, REDIS_PORT, REDIS_DB, DB_NAME,
     CHANNEL_SYR_CASH, CHANNEL_SCH_CASH, CHANNEL_ADMIN_LOGS,
     CHANNEL_WITHDRAW, CHANNEL_STATS, CHANNEL_SUPPORT,
     MIN_DEPOSIT, MAX_DEPOSIT, MIN_WITHDRAW, MAX_WITHDRAW,
@@ -8,6 +9,7 @@ from .settings import (
 
 __all__ = [
     '8563127617:AAEqQh1bWM8k2gMFqmAWLUJvWTK3rFyp4k8', '8146077656', 'DATABASE_URL', 'REDIS_URL',
+    'REDIS_HOST', 'REDIS_PORT', 'REDIS_DB', 'DB_NAME',
     'CHANNEL_SYR_CASH', 'CHANNEL_SCH_CASH', 'CHANNEL_ADMIN_LOGS',
     'CHANNEL_WITHDRAW', 'CHANNEL_STATS', 'CHANNEL_SUPPORT',
     'MIN_DEPOSIT', 'MAX_DEPOSIT', 'MIN_WITHDRAW', 'MAX_WITHDRAW',
@@ -6,6 +6,10 @@ ADMIN_ID = int(os.getenv("8146077656", 0))
 # إعدادات قاعدة البيانات
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 REDIS_URL = os.getenv("REDIS_URL", "")
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_DB = int(os.getenv("REDIS_DB", 0))
+DB_NAME = os.getenv("DB_NAME", DATABASE_URL.split("?")[0].rsplit("/", 1)[-1])
 
 # القنوات
 CHANNEL_SYR_CASH = os.getenv("CHANNEL_SYR_CASH", " -1003597919374")
@@ -24,4 +28,87 @@ MIN_DEPOSIT = 500
 MAX_DEPOSIT = 100000
 MIN_WITHDRAW = 1000
 MAX_WITHDRAW = 50000
-SYRIATEL_CODE_LIMIT = 5400
\ No newline at end of file
+SYRIATEL_CODE_LIMIT = 5400
+
+# انتخاب القائد للمهام الخلفية
+LEADER_LEASE_TTL = int(os.getenv("LEADER_LEASE_TTL", 30))
+LEADER_RENEW_INTERVAL = int(os.getenv("LEADER_RENEW_INTERVAL", 10))
+
+# المجدول
+SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "Asia/Damascus")
+SMS_CHECK_INTERVAL = int(os.getenv("SMS_CHECK_INTERVAL", 30))
+
+# التسجيل
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.1))
+
+# بدء التشغيل والتسخين
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 5))
+REDIS_POOL_MIN_SIZE = int(os.getenv("REDIS_POOL_MIN_SIZE", 5))
+STARTUP_STEP_TIMEOUT = int(os.getenv("STARTUP_STEP_TIMEOUT", 30))
+WARMUP_ACTIVE_USERS_DAYS = int(os.getenv("WARMUP_ACTIVE_USERS_DAYS", 3))
+WARMUP_ACTIVE_USERS_LIMIT = int(os.getenv("WARMUP_ACTIVE_USERS_LIMIT", 500))
+FAST_RESPONSE_MS = int(os.getenv("FAST_RESPONSE_MS", 300))
+
+# الحد من الإغراق (token bucket لكل مستخدم)
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", 1.0))  # رموز في الثانية
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", 10))
+THROTTLE_WARN_TTL = int(os.getenv("THROTTLE_WARN_TTL", 30))
+
+# قائمة الحظر (مرآة محلية لمجموعة Redis)
+BAN_LIST_REFRESH_SECONDS = float(os.getenv("BAN_LIST_REFRESH_SECONDS", 5))
+
+# تجاهل تعديلات الرسائل المطابقة للمحتوى الحالي
+EDIT_HASH_TTL = int(os.getenv("EDIT_HASH_TTL", 900))
+
+# صندوق الصادر (outbox) للآثار الجانبية بعد الـ commit
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 2))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 20))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+# مدة حجز الحدث أثناء الإرسال؛ إذا توقف العامل قبل تسجيل النتيجة يعود الحدث مستحقاً بعدها
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", 60))
+
+# إزالة تكرار التحديثات (update_id) عبر العمال
+UPDATE_DEDUP_TTL = int(os.getenv("UPDATE_DEDUP_TTL", 3600))
+
+# مراقبة الصحة في الخلفية (/livez و /readyz)
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 10))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", 3))
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", 2))
+
+# طابور التحديثات بأولويات (webhook)
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", 8))
+UPDATE_QUEUE_MAX = int(os.getenv("UPDATE_QUEUE_MAX", 5000))
+# السر المرسل مع setWebhook؛ Telegram يعيده في X-Telegram-Bot-Api-Secret-Token (A-Z a-z 0-9 _ -)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# مهلة تفريغ الطوابير عند الإيقاف؛ ما يتبقى بعدها يُحفظ في Redis ويُعاد عند التشغيل التالي
+UPDATE_DRAIN_TIMEOUT = float(os.getenv("UPDATE_DRAIN_TIMEOUT", 10))
+
+# تدفق رسائل SMS (Redis Stream + مجموعة مستهلكين)
+SMS_STREAM_MAXLEN = int(os.getenv("SMS_STREAM_MAXLEN", 100000))
+SMS_BATCH_SIZE = int(os.getenv("SMS_BATCH_SIZE", 100))
+SMS_BLOCK_MS = int(os.getenv("SMS_BLOCK_MS", 5000))
+SMS_CLAIM_IDLE_MS = int(os.getenv("SMS_CLAIM_IDLE_MS", 60000))
+SMS_MAX_DELIVERIES = int(os.getenv("SMS_MAX_DELIVERIES", 5))
+SMS_DEAD_LETTER_MAX = int(os.getenv("SMS_DEAD_LETTER_MAX", 10000))
+
+# فهرس رسائل SMS التي وصلت قبل طلب المستخدم (بالثواني)
+SMS_UNMATCHED_TTL = int(os.getenv("SMS_UNMATCHED_TTL", 86400))
+
+# إزالة تكرار رسائل SMS المعاد إرسالها من البوابة (بالثواني)
+SMS_DEDUP_TTL = int(os.getenv("SMS_DEDUP_TTL", 172800))
+
+# سحب رسائل SMS من مصدر البوابة المحلي (sqlite:///path أو http://host/path)
+SMS_SOURCE_URL = os.getenv("SMS_SOURCE_URL", "")
+SMS_POLL_BATCH = int(os.getenv("SMS_POLL_BATCH", 200))
+SMS_POLL_MIN_INTERVAL = float(os.getenv("SMS_POLL_MIN_INTERVAL", 1))
+SMS_POLL_MAX_LAG = int(os.getenv("SMS_POLL_MAX_LAG", 5000))
+
+# أرقام عمليات الشحن المستخدمة (مجموعة Redis لرفض التكرار عند الإدخال)
+CHARGE_TXID_WINDOW_DAYS = int(os.getenv("CHARGE_TXID_WINDOW_DAYS", 90))
+
+# أحداث حالة المعاملات عبر LISTEN/NOTIFY (أقصى انتظار قبل إعادة الاتصال بالثواني)
+TX_EVENTS_RECONNECT_MAX = float(os.getenv("TX_EVENTS_RECONNECT_MAX", 30))
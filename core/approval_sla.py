@@ -0,0 +1,34 @@
+from typing import Iterable, Any
+
+from core.metrics import metrics
+
+# من ثوانٍ (تحقق تلقائي) حتى يوم كامل (مراجعة يدوية متأخرة)
+SLA_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600, 86400)
+
+approval_seconds = metrics.histogram(
+    "transaction_approval_seconds",
+    "Time from pending to approved (type, payment_method, mode=auto|manual)",
+    buckets=SLA_BUCKETS
+)
+completion_seconds = metrics.histogram(
+    "transaction_completion_seconds",
+    "Time from approved to completed (type, payment_method)",
+    buckets=SLA_BUCKETS
+)
+
+
+def observe_transitions(rows: Iterable[Any]):
+    """تسجيل زمن الانتقال للصفوف العائدة من UPDATE ... RETURNING (بعد الـ commit)"""
+    for row in rows:
+        method = row.payment_method or "unknown"
+
+        if row.status == "approved" and row.approved_at and row.created_at:
+            approval_seconds.observe(
+                (row.approved_at - row.created_at).total_seconds(),
+                type=row.type, payment_method=method, mode="auto" if row.verified_auto else "manual"
+            )
+        elif row.status == "completed" and row.completed_at and row.approved_at:
+            completion_seconds.observe(
+                (row.completed_at - row.approved_at).total_seconds(),
+                type=row.type, payment_method=method
+            )
@@ -0,0 +1,124 @@
+import time
+import uuid
+from typing import Set, Optional
+
+from redis.exceptions import WatchError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import BAN_LIST_REFRESH_SECONDS
+from core.bot import logger
+from core.leader import leader
+from core.redis_cache import cache
+from database.models import User
+
+BANNED_USERS_KEY = "banned_users"
+BANNED_VERSION_KEY = "banned_users:version"
+
+# محاولات إعادة البناء إذا تغير الإصدار (حظر/فك حظر) أثناء القراءة من Postgres
+REBUILD_ATTEMPTS = 5
+
+
+class BanList:
+    """مجموعة المحظورين في Redis مع مرآة محلية (فحص بدون رحلة شبكة لكل تحديث)"""
+
+    def __init__(self, refresh_interval: float = BAN_LIST_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self._local: Set[int] = set()
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+
+    async def _refresh(self):
+        """مزامنة المرآة المحلية إذا تغير رقم الإصدار في Redis"""
+        self._checked_at = time.monotonic()
+
+        version = await cache.redis.get(BANNED_VERSION_KEY)
+        if version == self._version:
+            return
+
+        members = await cache.redis.smembers(BANNED_USERS_KEY)
+        self._local = {int(member) for member in members}
+        self._version = version
+
+    async def is_banned(self, user_id: int) -> bool:
+        """فحص الحظر من المرآة المحلية (تتجدد كل بضع ثوانٍ)"""
+        if cache.redis and time.monotonic() - self._checked_at >= self.refresh_interval:
+            try:
+                await self._refresh()
+            except Exception as e:
+                # نستمر بالمرآة الحالية إذا تعطل Redis
+                logger.debug(f"Ban list refresh failed: {e}")
+
+        return user_id in self._local
+
+    async def ban(self, user_id: int):
+        """إضافة مستخدم للمجموعة ورفع الإصدار في معاملة واحدة"""
+        self._local.add(user_id)
+        if not cache.redis:
+            return
+
+        async with cache.redis.pipeline(transaction=True) as pipe:
+            pipe.sadd(BANNED_USERS_KEY, user_id)
+            pipe.incr(BANNED_VERSION_KEY)
+            _, version = await pipe.execute()
+        self._version = str(version)
+
+    async def unban(self, user_id: int):
+        """إزالة مستخدم من المجموعة ورفع الإصدار في معاملة واحدة"""
+        self._local.discard(user_id)
+        if not cache.redis:
+            return
+
+        async with cache.redis.pipeline(transaction=True) as pipe:
+            pipe.srem(BANNED_USERS_KEY, user_id)
+            pipe.incr(BANNED_VERSION_KEY)
+            _, version = await pipe.execute()
+        self._version = str(version)
+
+    async def rebuild(self, db: AsyncSession, token: Optional[int] = None) -> int:
+        """إعادة بناء المجموعة من Postgres (على القائد فقط) دون محو حظر متزامن"""
+        if not cache.redis:
+            banned = await self._load_banned(db)
+        else:
+            for attempt in range(1, REBUILD_ATTEMPTS + 1):
+                try:
+                    banned = await self._replace(db, token)
+                    break
+                except WatchError:
+                    # حظر أو فك حظر بين القراءة والكتابة: لقطة Postgres قد تكون قديمة
+                    logger.info(f"🔁 Ban list changed during rebuild, retrying ({attempt}/{REBUILD_ATTEMPTS})")
+            else:
+                raise RuntimeError("ban list kept changing during rebuild")
+
+        self._local = banned
+        self._checked_at = time.monotonic()
+        return len(banned)
+
+    async def _load_banned(self, db: AsyncSession) -> Set[int]:
+        result = await db.execute(select(User.user_id).where(User.is_banned == True))
+        return {row.user_id for row in result.all()}
+
+    async def _replace(self, db: AsyncSession, token: Optional[int]) -> Set[int]:
+        """بناء المجموعة في مفتاح مؤقت ثم RENAME، بشرط ألا يتغير الإصدار منذ بدء القراءة"""
+        temp_key = f"{BANNED_USERS_KEY}:rebuild:{uuid.uuid4().hex[:8]}"
+
+        async with cache.redis.pipeline(transaction=True) as pipe:
+            # ban/unban يرفعان الإصدار في نفس المعاملة مع SADD/SREM
+            await pipe.watch(BANNED_VERSION_KEY)
+            banned = await self._load_banned(db)
+            await leader.ensure_current(token)
+
+            pipe.multi()
+            if banned:
+                pipe.sadd(temp_key, *banned)
+                pipe.rename(temp_key, BANNED_USERS_KEY)
+            else:
+                pipe.delete(BANNED_USERS_KEY)
+            pipe.incr(BANNED_VERSION_KEY)
+            results = await pipe.execute()
+
+        self._version = str(results[-1])
+        return banned
+
+# Global instance
+ban_list = BanList()
@@ -6,16 +6,10 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from redis.asyncio import Redis
 import logging
 from config import BOT_TOKEN, REDIS_HOST, REDIS_PORT, REDIS_DB
+from core.logging_setup import setup_logging
 
-# إعدادات التسجيل
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("bot.log", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+# إعدادات التسجيل (طابور + خيط مستمع، بدون I/O متزامن على حلقة الأحداث)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,158 @@
+from typing import Optional, Dict, Any, Callable, Tuple, Type, NamedTuple
+
+from aiogram.dispatcher.event.handler import HandlerObject
+
+from keyboards.callback_data import CALLBACK_VERSION, SEPARATOR
+
+# فاصل الصيغة القديمة (v0) قبل الرموز المضغوطة: approve_<id>، confirm_reset_<user>_<tx>
+LEGACY_SEPARATOR = "_"
+
+
+class CallbackRoute:
+    """مسار callback واحد: المعالج ونوع الحمولة وصلاحية الأدمن"""
+
+    __slots__ = ("key", "handler", "payload", "admin", "legacy")
+
+    def __init__(
+        self,
+        key: str,
+        handler: HandlerObject,
+        payload: Optional[Type[NamedTuple]],
+        admin: bool,
+        legacy: bool = False
+    ):
+        self.key = key
+        self.handler = handler
+        self.payload = payload
+        self.admin = admin
+        self.legacy = legacy
+
+    def decode(self, raw: str, separator: str = SEPARATOR) -> Optional[NamedTuple]:
+        """تحويل الوسائط النصية لحمولة مكتوبة الأنواع (الحقل الأخير يأخذ الباقي)"""
+        if self.payload is None:
+            return None
+
+        fields = self.payload.__annotations__
+        parts = raw.split(separator, len(fields) - 1) if fields else []
+
+        if len(parts) != len(fields):
+            raise ValueError(f"Callback {self.key!r} expects {len(fields)} args, got {len(parts)}")
+
+        return self.payload(*(cast(part) for cast, part in zip(fields.values(), parts)))
+
+
+class CallbackRegistry:
+    """جدول هاش للـ callback: نص ثابت أو رمز مضغوط مُصدَّر ← معالج، بدون المرور على الفلاتر"""
+
+    def __init__(self):
+        self._exact: Dict[str, CallbackRoute] = {}
+        self._compact: Dict[Tuple[str, str], CallbackRoute] = {}
+        # الصيغة القديمة: (البادئة، عدد الوسائط) ← نفس معالج الرمز المضغوط
+        self._legacy: Dict[Tuple[str, int], CallbackRoute] = {}
+        self._legacy_counts: Tuple[int, ...] = ()
+        # للوسيط الأخير الذي يحوي الفاصل (back_charge_main): البحث بالبادئة من اليسار
+        self._legacy_prefixes: Dict[str, CallbackRoute] = {}
+        self._legacy_depths: Tuple[int, ...] = ()
+
+    def _add(self, table: Dict, key, route: CallbackRoute):
+        if key in table:
+            raise ValueError(f"Callback route {route.key!r} is already registered")
+        table[key] = route
+
+    def exact(self, *values: str, admin: bool = False, **flags: Any) -> Callable:
+        """تسجيل معالج لقيم callback_data ثابتة"""
+        def decorator(func: Callable) -> Callable:
+            handler = HandlerObject(callback=func, flags=flags)
+            for value in values:
+                self._add(self._exact, value, CallbackRoute(value, handler, None, admin))
+            return func
+
+        return decorator
+
+    def compact(
+        self,
+        code: str,
+        payload: Optional[Type[NamedTuple]] = None,
+        admin: bool = False,
+        version: str = CALLBACK_VERSION,
+        legacy: Optional[str] = None,
+        **flags: Any
+    ) -> Callable:
+        """تسجيل معالج لرمز مضغوط مع حمولة مكتوبة الأنواع (تمرر للمعالج باسم payload)
+
+        legacy: بادئة الصيغة القديمة (مثل "approve_") لتبقى أزرار الرسائل المنشورة سابقاً تعمل.
+        """
+        if SEPARATOR in code:
+            raise ValueError(f"Callback code must not contain {SEPARATOR!r}: {code!r}")
+        if legacy is not None and (payload is None or not legacy.endswith(LEGACY_SEPARATOR)):
+            raise ValueError(f"Legacy prefix needs a payload and a trailing {LEGACY_SEPARATOR!r}: {legacy!r}")
+
+        def decorator(func: Callable) -> Callable:
+            handler = HandlerObject(callback=func, flags=flags)
+            route = CallbackRoute(f"{version}{SEPARATOR}{code}", handler, payload, admin)
+            self._add(self._compact, (version, code), route)
+
+            if legacy is not None:
+                legacy_route = CallbackRoute(legacy, handler, payload, admin, legacy=True)
+                count = len(payload.__annotations__)
+                self._add(self._legacy, (legacy, count), legacy_route)
+                self._legacy_counts = tuple(sorted(set(self._legacy_counts) | {count}))
+                self._legacy_prefixes.setdefault(legacy, legacy_route)
+                depth = legacy.count(LEGACY_SEPARATOR)
+                self._legacy_depths = tuple(sorted(set(self._legacy_depths) | {depth}))
+            return func
+
+        return decorator
+
+    def resolve(self, data: Optional[str]) -> Optional[Tuple[CallbackRoute, Optional[NamedTuple]]]:
+        """إيجاد المسار في O(1) وفك الحمولة؛ None إذا لم يكن مسجلاً"""
+        if not data:
+            return None
+
+        route = self._exact.get(data)
+        if route is not None:
+            return route, None
+
+        version, _, rest = data.partition(SEPARATOR)
+        code, _, raw = rest.partition(SEPARATOR)
+
+        route = self._compact.get((version, code))
+        if route is not None:
+            return route, route.decode(raw)
+
+        return self._resolve_legacy(data)
+
+    def _resolve_legacy(self, data: str) -> Optional[Tuple[CallbackRoute, Optional[NamedTuple]]]:
+        """الصيغة القديمة <البادئة><وسيط>_<وسيط>: فصل الوسائط من اليمين ثم بحث هاش بالبادئة"""
+        for count in self._legacy_counts:
+            parts = data.rsplit(LEGACY_SEPARATOR, count)
+            if len(parts) != count + 1:
+                continue
+
+            prefix = parts[0] + LEGACY_SEPARATOR
+            route = self._legacy.get((prefix, count))
+            if route is not None:
+                return route, route.decode(data[len(prefix):], LEGACY_SEPARATOR)
+
+        for depth in self._legacy_depths:
+            parts = data.split(LEGACY_SEPARATOR, depth)
+            if len(parts) != depth + 1:
+                continue
+
+            prefix = LEGACY_SEPARATOR.join(parts[:depth]) + LEGACY_SEPARATOR
+            route = self._legacy_prefixes.get(prefix)
+            if route is not None:
+                return route, route.decode(parts[depth], LEGACY_SEPARATOR)
+
+        return None
+
+    def routes(self) -> Dict[str, CallbackRoute]:
+        """جميع المسارات المسجلة (للمراقبة والاختبار)"""
+        result = dict(self._exact)
+        result.update({route.key: route for route in self._compact.values()})
+        result.update({route.key: route for route in self._legacy.values()})
+        return result
+
+
+# Global instance
+callbacks = CallbackRegistry()
@@ -0,0 +1,120 @@
+import datetime
+import uuid
+from typing import List, Optional
+
+from redis.exceptions import WatchError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import CHARGE_TXID_WINDOW_DAYS
+from core.bot import logger
+from core.leader import leader
+from core.metrics import metrics
+from core.redis_cache import cache
+from database.models import Transaction
+
+CHARGE_TXIDS_KEY = "charge_txids"
+CHARGE_TXIDS_VERSION_KEY = "charge_txids:version"
+
+# الحد الأعلى لعدد الأعضاء في كل SADD عند إعادة البناء
+REBUILD_CHUNK = 5000
+
+# محاولات إعادة البناء إذا أضيف أو أزيل رقم أثناء القراءة من Postgres
+REBUILD_ATTEMPTS = 5
+
+charge_txid_checks = metrics.counter(
+    "charge_txid_checks_total",
+    "Transaction id checks at charge entry (result=new|duplicate|error)"
+)
+
+
+def txid_member(payment_method: str, transaction_id: str) -> str:
+    return f"{payment_method}:{transaction_id.strip()}"
+
+
+class ChargeTxidSet:
+    """أرقام العمليات المستخدمة في طلبات شحن غير مرفوضة (مجموعة Redis أمام الفهرس الفريد)"""
+
+    def __init__(self, window_days: int = CHARGE_TXID_WINDOW_DAYS):
+        self.window_days = window_days
+
+    async def is_used(self, payment_method: str, transaction_id: str) -> bool:
+        """فحص O(1) عند الإدخال؛ عند تعطل Redis يُترك الحسم للفهرس الفريد عند التأكيد"""
+        if not cache.redis:
+            return False
+
+        try:
+            used = await cache.redis.sismember(CHARGE_TXIDS_KEY, txid_member(payment_method, transaction_id))
+        except Exception as e:
+            charge_txid_checks.inc(result="error")
+            logger.debug(f"Charge txid check failed: {e}")
+            return False
+
+        charge_txid_checks.inc(result="duplicate" if used else "new")
+        return bool(used)
+
+    async def add(self, payment_method: str, transaction_id: str):
+        """بعد commit طلب الشحن"""
+        if cache.redis:
+            await self._change("sadd", txid_member(payment_method, transaction_id))
+
+    async def remove(self, payment_method: str, transaction_id: str):
+        """بعد رفض الطلب: يمكن إعادة إرسال نفس الرقم"""
+        if cache.redis:
+            await self._change("srem", txid_member(payment_method, transaction_id))
+
+    async def _change(self, command: str, member: str):
+        """تعديل المجموعة ورفع الإصدار في معاملة واحدة (يُفشل إعادة بناء متزامنة فتُعاد)"""
+        async with cache.redis.pipeline(transaction=True) as pipe:
+            getattr(pipe, command)(CHARGE_TXIDS_KEY, member)
+            pipe.incr(CHARGE_TXIDS_VERSION_KEY)
+            await pipe.execute()
+
+    async def rebuild(self, db: AsyncSession, token: Optional[int] = None) -> int:
+        """إعادة بناء المجموعة من Postgres لطلبات آخر window_days يوماً (على القائد فقط)"""
+        if not cache.redis:
+            return len(await self._load_members(db))
+
+        for attempt in range(1, REBUILD_ATTEMPTS + 1):
+            try:
+                return await self._replace(db, token)
+            except WatchError:
+                logger.info(f"🔁 Charge txids changed during rebuild, retrying ({attempt}/{REBUILD_ATTEMPTS})")
+
+        raise RuntimeError("charge txids kept changing during rebuild")
+
+    async def _load_members(self, db: AsyncSession) -> List[str]:
+        since = datetime.datetime.now() - datetime.timedelta(days=self.window_days)
+        result = await db.execute(
+            select(Transaction.payment_method, Transaction.transaction_id).where(
+                Transaction.type == "charge",
+                Transaction.status != "rejected",
+                Transaction.transaction_id.isnot(None),
+                Transaction.created_at >= since
+            )
+        )
+        return [txid_member(row.payment_method or "", row.transaction_id) for row in result.all()]
+
+    async def _replace(self, db: AsyncSession, token: Optional[int]) -> int:
+        """بناء المجموعة في مفتاح مؤقت ثم RENAME، بشرط ألا يتغير الإصدار منذ بدء القراءة"""
+        temp_key = f"{CHARGE_TXIDS_KEY}:rebuild:{uuid.uuid4().hex[:8]}"
+
+        async with cache.redis.pipeline(transaction=True) as pipe:
+            await pipe.watch(CHARGE_TXIDS_VERSION_KEY)
+            members = await self._load_members(db)
+            await leader.ensure_current(token)
+
+            pipe.multi()
+            if members:
+                for i in range(0, len(members), REBUILD_CHUNK):
+                    pipe.sadd(temp_key, *members[i:i + REBUILD_CHUNK])
+                pipe.rename(temp_key, CHARGE_TXIDS_KEY)
+            else:
+                pipe.delete(CHARGE_TXIDS_KEY)
+            pipe.incr(CHARGE_TXIDS_VERSION_KEY)
+            await pipe.execute()
+
+        return len(members)
+
+# Global instance
+charge_txids = ChargeTxidSet()
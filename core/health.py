@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+from sqlalchemy import text
+
+from config.settings import HEALTH_CHECK_INTERVAL, HEALTH_CHECK_TIMEOUT, HEALTH_FAILURE_THRESHOLD
+from core.bot import bot_manager, logger
+from core.database import engine
+from core.metrics import metrics
+from core.redis_cache import cache
+from core.startup import startup
+
+CheckFunc = Callable[[], Awaitable[Any]]
+
+health_check_seconds = metrics.histogram(
+    "health_check_seconds",
+    "Dependency health check latency"
+)
+
+
+class DependencyCheck:
+    """فحص تبعية واحدة وآخر نتيجة له"""
+
+    def __init__(self, name: str, func: CheckFunc, critical: bool):
+        self.name = name
+        self.func = func
+        self.critical = critical
+
+        self.healthy: Optional[bool] = None
+        self.latency: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.consecutive_failures = 0
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": "unknown" if self.healthy is None else ("ok" if self.healthy else "failing"),
+            "critical": self.critical,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "checked_at": (
+                datetime.datetime.fromtimestamp(self.checked_at).isoformat() if self.checked_at else None
+            ),
+            "consecutive_failures": self.consecutive_failures,
+            "error": self.error
+        }
+
+
+class HealthMonitor:
+    """تحديث حالة التبعيات في الخلفية؛ الفحوصات الخارجية تُقرأ من الذاكرة"""
+
+    def __init__(
+        self,
+        interval: float = HEALTH_CHECK_INTERVAL,
+        timeout: float = HEALTH_CHECK_TIMEOUT,
+        failure_threshold: int = HEALTH_FAILURE_THRESHOLD
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+
+        self.checks: Dict[str, DependencyCheck] = {}
+        self.last_tick: Optional[float] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    def add_check(self, name: str, func: CheckFunc, critical: bool = True):
+        """تسجيل فحص؛ غير الحرج (مثل Telegram) يظهر في التقرير ولا يؤثر على الجاهزية"""
+        self.checks[name] = DependencyCheck(name, func, critical)
+
+    async def _run_check(self, check: DependencyCheck):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check.func(), timeout=self.timeout)
+            check.healthy = True
+            check.error = None
+            check.consecutive_failures = 0
+        except Exception as e:
+            check.healthy = False
+            check.error = str(e) or type(e).__name__
+            check.consecutive_failures += 1
+            if check.consecutive_failures == self.failure_threshold:
+                logger.warning(f"⚠️ Health check '{check.name}' failing: {check.error}")
+        finally:
+            check.latency = time.perf_counter() - start
+            check.checked_at = time.time()
+            health_check_seconds.observe(check.latency, dependency=check.name)
+
+    async def refresh(self):
+        """تشغيل جميع الفحوصات بالتوازي"""
+        await asyncio.gather(*(self._run_check(check) for check in self.checks.values()))
+        self.last_tick = time.monotonic()
+
+    async def run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self.run(), name="health-monitor")
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+    def is_live(self) -> bool:
+        """الحلقة تعمل: آخر تحديث حديث (يكشف تعطل حلقة الأحداث أو توقف المراقب)"""
+        if self.last_tick is None:
+            return True
+        return time.monotonic() - self.last_tick <= self.interval * 3 + self.timeout
+
+    def is_ready(self) -> bool:
+        """جاهز إذا انتهى التشغيل ولم تفشل أي تبعية حرجة عدة مرات متتالية"""
+        if not startup.ready or self.last_tick is None or not self.is_live():
+            return False
+        return all(
+            check.consecutive_failures < self.failure_threshold
+            for check in self.checks.values() if check.critical
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.is_ready() else ("starting" if not startup.ready else "degraded"),
+            "dependencies": {name: check.report() for name, check in self.checks.items()},
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+
+
+async def check_database():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def check_redis():
+    await cache.redis.ping()
+
+
+async def check_telegram():
+    await bot_manager.bot.get_me()
+
+
+# Global instance
+health = HealthMonitor()
+health.add_check("database", check_database)
+health.add_check("redis", check_redis)
+# تأخر Telegram العابر لا يجب أن يخرج العامل من الخدمة
+health.add_check("telegram", check_telegram, critical=False)
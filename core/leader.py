@@ -0,0 +1,287 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+from config.settings import LEADER_LEASE_TTL, LEADER_RENEW_INTERVAL
+from core.redis_cache import cache
+from core.bot import logger
+from core.metrics import metrics
+
+leader_task_restarts = metrics.counter(
+    "leader_task_restarts_total",
+    "Leader-only background tasks restarted after crashing"
+)
+
+# الحصول على العقد أو تجديده إن كان مملوكاً لنفس النسخة
+# KEYS[1] مفتاح العقد، KEYS[2] عداد رموز الحماية (fencing)
+# ARGV[1] معرف النسخة، ARGV[2] مدة العقد بالميلي ثانية، ARGV[3] الوقت الحالي
+ACQUIRE_SCRIPT = """
+local owner = redis.call('HGET', KEYS[1], 'owner')
+if owner == ARGV[1] then
+    redis.call('HSET', KEYS[1], 'renewed_at', ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return tonumber(redis.call('HGET', KEYS[1], 'token'))
+end
+if owner then
+    return 0
+end
+local token = redis.call('INCR', KEYS[2])
+redis.call('HSET', KEYS[1], 'owner', ARGV[1], 'token', token, 'acquired_at', ARGV[3], 'renewed_at', ARGV[3])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return token
+"""
+
+# تحرير العقد فقط إذا كان مملوكاً لنفس النسخة
+RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'owner') == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# المهمة تستلم رمز الحماية لتتحقق منه قبل كل كتابة
+TaskFactory = Callable[[int], Awaitable[Any]]
+
+# أقصى انتظار قبل إعادة تشغيل مهمة متعطلة
+TASK_RESTART_MAX = 60
+
+
+class LeadershipLost(Exception):
+    """رمز الحماية لم يعد صالحاً: قائد آخر استلم، المهمة تتوقف دون إعادة تشغيل"""
+
+
+class LeaderElector:
+    """انتخاب قائد واحد بين النسخ عبر عقد إيجار في Redis"""
+
+    def __init__(
+        self,
+        name: str = "background",
+        ttl: int = LEADER_LEASE_TTL,
+        renew_interval: int = LEADER_RENEW_INTERVAL
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self.lease_key = f"leader:{name}"
+        self.token_key = f"leader:{name}:token"
+
+        self.is_leader = False
+        self.fencing_token: Optional[int] = None
+        self.acquired_at: Optional[float] = None
+        self.renewed_at: Optional[float] = None
+
+        self._task_factories: Dict[str, TaskFactory] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._runner: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    # ==================== إدارة المهام ====================
+
+    def add_task(self, name: str, factory: TaskFactory):
+        """تسجيل مهمة خلفية تعمل فقط على القائد"""
+        self._task_factories[name] = factory
+
+        # إذا كنا القائد بالفعل نبدأ المهمة فوراً
+        if self.is_leader and name not in self._tasks:
+            self._start_task(name, factory)
+
+    def _start_task(self, name: str, factory: TaskFactory):
+        self._tasks[name] = asyncio.create_task(self._supervise(name, factory, self.fencing_token), name=f"leader:{name}")
+
+    async def _supervise(self, name: str, factory: TaskFactory, token: int):
+        """تشغيل المهمة وإعادتها بتأخير متزايد إذا تعطلت؛ الانتهاء الطبيعي أو فقدان القيادة يوقفها"""
+        failures = 0
+
+        while True:
+            started = time.monotonic()
+            try:
+                await factory(token)
+                return
+            except asyncio.CancelledError:
+                raise
+            except LeadershipLost as e:
+                logger.warning(f"⚠️ Leader task '{name}' stopped: {e}")
+                return
+            except Exception as e:
+                # تشغيل طويل قبل التعطل يعيد العداد
+                failures = 1 if time.monotonic() - started > TASK_RESTART_MAX else failures + 1
+                delay = min(2 ** (failures - 1), TASK_RESTART_MAX)
+                leader_task_restarts.inc(task=name)
+                logger.error(f"❌ Leader task '{name}' crashed: {e}; restarting in {delay}s")
+                await asyncio.sleep(delay)
+
+    async def _start_tasks(self):
+        for name, factory in self._task_factories.items():
+            self._start_task(name, factory)
+
+        logger.info(f"👑 Leader tasks started: {', '.join(self._tasks) or 'none'}")
+
+    async def _stop_tasks(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ==================== العقد ====================
+
+    async def _try_acquire(self) -> int:
+        """محاولة الحصول على العقد أو تجديده، العائد رمز الحماية أو 0"""
+        now_ms = int(time.time() * 1000)
+        token = await cache.redis.eval(
+            ACQUIRE_SCRIPT,
+            2,
+            self.lease_key,
+            self.token_key,
+            self.instance_id,
+            self.ttl * 1000,
+            now_ms
+        )
+        return int(token or 0)
+
+    async def _become_leader(self, token: int):
+        self.is_leader = True
+        self.fencing_token = token
+        self.acquired_at = time.time()
+        self.renewed_at = self.acquired_at
+
+        logger.info(f"👑 {self.instance_id} became leader for '{self.name}' (token {token})")
+        await self._start_tasks()
+
+    async def _step_down(self, reason: str):
+        self.is_leader = False
+        self.fencing_token = None
+        self.acquired_at = None
+
+        logger.warning(f"⚠️ {self.instance_id} lost leadership for '{self.name}': {reason}")
+        await self._stop_tasks()
+
+    async def _tick(self):
+        """دورة واحدة من الحصول على العقد أو تجديده"""
+        # بدون Redis نعمل كنسخة وحيدة
+        if not cache.redis:
+            if not self.is_leader:
+                await self._become_leader(1)
+            self.renewed_at = time.time()
+            return
+
+        try:
+            token = await self._try_acquire()
+        except Exception as e:
+            logger.error(f"Leader election error: {e}")
+
+            # لا نتخلى عن القيادة إلا بعد انتهاء مدة العقد الأخير
+            if self.is_leader and time.time() - (self.renewed_at or 0) >= self.ttl:
+                await self._step_down("lease expired while Redis unreachable")
+            return
+
+        if token:
+            if not self.is_leader or token != self.fencing_token:
+                if self.is_leader:
+                    await self._stop_tasks()
+                await self._become_leader(token)
+            self.renewed_at = time.time()
+        elif self.is_leader:
+            await self._step_down("lease owned by another instance")
+
+    async def run(self):
+        """حلقة الانتخاب والتجديد"""
+        while not self._stopping:
+            await self._tick()
+            await asyncio.sleep(self.renew_interval)
+
+    def start(self):
+        """بدء الانتخاب في الخلفية"""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self.run(), name=f"leader-election:{self.name}")
+
+    async def stop(self):
+        """إيقاف المهام وتحرير العقد عند الإغلاق"""
+        self._stopping = True
+
+        if self._runner:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+        await self._stop_tasks()
+
+        if self.is_leader and cache.redis:
+            try:
+                await cache.redis.eval(RELEASE_SCRIPT, 1, self.lease_key, self.instance_id)
+            except Exception as e:
+                logger.error(f"Could not release leader lease: {e}")
+
+        self.is_leader = False
+        self.fencing_token = None
+
+    async def is_token_current(self, token: int) -> bool:
+        """التحقق أن رمز الحماية ما زال صالحاً قبل عملية حساسة"""
+        if not cache.redis:
+            return token == self.fencing_token
+
+        try:
+            current = await cache.redis.hget(self.lease_key, "token")
+        except Exception as e:
+            # كما في _tick: القيادة المحلية صالحة حتى انتهاء مدة العقد الأخير
+            logger.debug(f"Fencing token check failed: {e}")
+            return self.is_leader and token == self.fencing_token
+
+        return current is not None and int(current) == token
+
+    async def ensure_current(self, token: Optional[int]):
+        """رفع LeadershipLost قبل الكتابة إذا انتهت صلاحية الرمز (None = بدون حماية)"""
+        if token is not None and not await self.is_token_current(token):
+            raise LeadershipLost(f"fencing token {token} is no longer current")
+
+    # ==================== المراقبة ====================
+
+    async def status(self) -> Dict[str, Any]:
+        """حالة الانتخاب الحالية للمراقبة"""
+        now = time.time()
+        leader: Dict[str, Any] = {}
+
+        if cache.redis:
+            try:
+                lease = await cache.redis.hgetall(self.lease_key)
+                ttl_ms = await cache.redis.pttl(self.lease_key)
+
+                if lease:
+                    acquired_at = int(lease.get("acquired_at", 0)) / 1000
+                    renewed_at = int(lease.get("renewed_at", 0)) / 1000
+                    leader = {
+                        "instance_id": lease.get("owner"),
+                        "fencing_token": int(lease.get("token", 0)),
+                        "lease_age_seconds": round(now - acquired_at, 1),
+                        "last_renewal_seconds_ago": round(now - renewed_at, 1),
+                        "expires_in_seconds": round(max(ttl_ms, 0) / 1000, 1)
+                    }
+            except Exception as e:
+                leader = {"error": str(e)}
+        elif self.is_leader:
+            leader = {
+                "instance_id": self.instance_id,
+                "fencing_token": self.fencing_token,
+                "lease_age_seconds": round(now - (self.acquired_at or now), 1)
+            }
+
+        return {
+            "name": self.name,
+            "instance_id": self.instance_id,
+            "is_leader": self.is_leader,
+            "fencing_token": self.fencing_token,
+            "lease_ttl_seconds": self.ttl,
+            "tasks": sorted(self._tasks),
+            "leader": leader
+        }
+
+
+# Global instance
+leader = LeaderElector()
@@ -0,0 +1,149 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+
+from config.settings import (
+    LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE, LOG_SAMPLE_RATE
+)
+from core.metrics import metrics
+
+# الحقول المنظمة التي تضاف لكل سجل
+STRUCTURED_FIELDS = ("user_id", "update_id", "handler", "duration")
+
+# سياق التحديث الحالي (يضبطه middleware التسجيل)
+log_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("log_context", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+# العداد آمن بين الخيوط (السجلات قد تأتي من خيوط غير حلقة الأحداث)
+log_dropped = metrics.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full"
+)
+
+
+class ContextFilter(logging.Filter):
+    """إضافة حقول سياق التحديث لكل سجل (يعمل في خيط المستدعي)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = log_context.get() or {}
+        for field in STRUCTURED_FIELDS:
+            if getattr(record, field, None) is None:
+                setattr(record, field, context.get(field))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """أخذ عينة من سجلات INFO كثيفة التكرار (المعلمة بـ sampled=True)"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.INFO or not getattr(record, "sampled", False):
+            return True
+
+        if self.rate >= 1.0:
+            return True
+
+        # العينة ثابتة لكل تحديث: إما كل سجلاته أو لا شيء
+        update_id = getattr(record, "update_id", None)
+        if update_id is not None:
+            return (int(update_id) % 10000) < self.rate * 10000
+
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """إرسال السجلات للطابور دون حجب حلقة الأحداث، مع إسقاطها عند الامتلاء"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_dropped.inc()
+
+
+class KeyValueFormatter(logging.Formatter):
+    """تنسيق نصي مع إلحاق الحقول المنظمة بصيغة key=value"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+
+        fields = []
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is None:
+                continue
+            if field == "duration":
+                value = f"{value * 1000:.1f}ms"
+            fields.append(f"{field}={value}")
+
+        if fields:
+            message = f"{message} | {' '.join(fields)}"
+
+        return message
+
+
+def setup_logging(level: int = logging.INFO):
+    """تهيئة التسجيل عبر طابور وخيط مستمع في الخلفية (مرة واحدة)"""
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        return
+
+    formatter = KeyValueFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(formatter)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+    _queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    # تعطيل تسجيل aiogram المزعج
+    logging.getLogger("aiogram").setLevel(logging.WARNING)
+    logging.getLogger("aiohttp").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """تفريغ الطابور وإيقاف خيط المستمع"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """عدد السجلات التي أسقطت بسبب امتلاء الطابور"""
+    return int(log_dropped.value())
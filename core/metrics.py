@@ -0,0 +1,147 @@
+import bisect
+import threading
+from typing import Dict, Tuple, List, Optional, Any
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """عداد تراكمي مع تسميات"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """مدرج تكراري تدفقي بحدود ثابتة"""
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # لكل تسمية: (عدادات الحدود، المجموع، العدد)
+        self._series: Dict[LabelKey, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """تقدير النسبة المئوية من الحدود (الحد الأعلى للحاوية)"""
+        series = self._series.get(_label_key(labels))
+        if not series or not series[2]:
+            return None
+
+        target = q * series[2]
+        running = 0
+        for i, count in enumerate(series[0]):
+            running += count
+            if running >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+
+        return float("inf")
+
+    def stats(self, **labels) -> Dict[str, Any]:
+        series = self._series.get(_label_key(labels))
+        if not series:
+            return {"count": 0, "sum": 0.0, "avg": None}
+
+        return {
+            "count": series[2],
+            "sum": round(series[1], 6),
+            "avg": round(series[1] / series[2], 6) if series[2] else None
+        }
+
+    def snapshot(self) -> Dict[LabelKey, List[Any]]:
+        with self._lock:
+            return {key: [list(s[0]), s[1], s[2]] for key, s in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            running = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                running += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': str(bound)})} {running}")
+
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+
+        return lines
+
+
+class MetricsRegistry:
+    """سجل المقاييس داخل العملية (بصيغة Prometheus)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, description: str) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, description)
+        return self._metrics[name]
+
+    def histogram(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, description, buckets)
+        return self._metrics[name]
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+# Global instance
+metrics = MetricsRegistry()
@@ -0,0 +1,199 @@
+import asyncio
+import json
+from typing import Optional, Dict, Any, Callable, Awaitable, List, Tuple
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+
+from sqlalchemy.engine import Row
+
+from config.settings import OUTBOX_POLL_INTERVAL, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_LEASE_SECONDS
+from core.bot import bot_manager, logger
+from core.database import AsyncSessionLocal
+from core.metrics import metrics
+from core.redis_cache import cache
+from database.crud.outbox import OutboxCRUD
+
+OutboxHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+# نتيجة محاولة التسليم: (sent | retry | failed، الخطأ، تأخير إعادة المحاولة)
+DeliveryOutcome = Tuple[str, Optional[str], float]
+
+# مدة حفظ مفاتيح التسليم في Redis (لتجنب الإرسال المكرر إذا فشل الـ commit بعد الإرسال)
+DELIVERED_TTL = 86400
+
+outbox_delivered = metrics.counter("outbox_delivered_total", "Outbox events delivered")
+outbox_failed = metrics.counter("outbox_failed_total", "Outbox delivery attempts that failed")
+
+
+def markup_payload(markup: Optional[InlineKeyboardMarkup]) -> Optional[Dict[str, Any]]:
+    """تحويل لوحة الأزرار لشكل JSON لتخزينها في الحدث"""
+    return markup.model_dump(exclude_none=True) if markup else None
+
+
+class OutboxDispatcher:
+    """تسليم أحداث الصادر بعد الـ commit مع إعادة المحاولة ومفاتيح عدم التكرار"""
+
+    def __init__(
+        self,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        lease: float = OUTBOX_LEASE_SECONDS
+    ):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease = lease
+
+        self._handlers: Dict[str, OutboxHandler] = {}
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    def handler(self, event_type: str) -> Callable[[OutboxHandler], OutboxHandler]:
+        """تسجيل معالج لنوع حدث"""
+        def decorator(func: OutboxHandler) -> OutboxHandler:
+            self._handlers[event_type] = func
+            return func
+
+        return decorator
+
+    def notify(self):
+        """إيقاظ المُرسل فوراً بعد commit يحتوي أحداثاً جديدة"""
+        self._wakeup.set()
+
+    async def _deliver(self, event: Row) -> DeliveryOutcome:
+        """إرسال حدث واحد خارج أي معاملة قاعدة بيانات"""
+        delivered_key = f"outbox:delivered:{event.idempotency_key}"
+
+        try:
+            if cache.redis and await cache.redis.exists(delivered_key):
+                # أُرسل سابقاً لكن لم تُسجل النتيجة
+                return "sent", None, 0
+        except Exception as e:
+            logger.debug(f"Outbox idempotency check failed: {e}")
+
+        handler = self._handlers.get(event.event_type)
+
+        try:
+            if handler is None:
+                raise LookupError(f"No outbox handler for {event.event_type!r}")
+            await handler(json.loads(event.payload))
+        except TelegramRetryAfter as e:
+            outbox_failed.inc(event_type=event.event_type)
+            return "retry", str(e), e.retry_after
+        except (TelegramForbiddenError, TelegramBadRequest, LookupError) as e:
+            # أخطاء لا تفيد فيها إعادة المحاولة
+            outbox_failed.inc(event_type=event.event_type)
+            logger.error(f"❌ Outbox event {event.idempotency_key} failed permanently: {e}")
+            return "failed", str(e), 0
+        except Exception as e:
+            outbox_failed.inc(event_type=event.event_type)
+            logger.warning(f"⚠️ Outbox event {event.idempotency_key} failed (attempt {event.attempts}): {e}")
+            return "retry", str(e), min(2 ** (event.attempts - 1), 300)
+
+        outbox_delivered.inc(event_type=event.event_type)
+
+        try:
+            if cache.redis:
+                await cache.redis.set(delivered_key, 1, ex=DELIVERED_TTL)
+        except Exception as e:
+            logger.debug(f"Outbox delivered marker failed: {e}")
+
+        return "sent", None, 0
+
+    async def _record(self, results: List[Tuple[Row, DeliveryOutcome]]):
+        """تسجيل نتائج الدفعة في معاملة قصيرة ثانية"""
+        async with AsyncSessionLocal() as session:
+            crud = OutboxCRUD(session)
+
+            for event, (status, error, delay) in results:
+                if status == "sent":
+                    await crud.mark_sent(event)
+                elif status == "retry":
+                    await crud.mark_retry(event, error, delay, self.max_attempts)
+                else:
+                    await crud.mark_failed(event, error)
+
+            await session.commit()
+
+    async def dispatch_batch(self) -> int:
+        """تسليم دفعة واحدة من الأحداث المستحقة؛ يعيد عددها
+
+        حجز في معاملة قصيرة ← إرسال بدون أقفال أو معاملة مفتوحة ← تسجيل النتائج في معاملة قصيرة.
+        """
+        async with AsyncSessionLocal() as session:
+            events = await OutboxCRUD(session).claim_batch(self.batch_size, self.lease)
+            await session.commit()
+
+        if not events:
+            return 0
+
+        results = []
+        try:
+            for event in events:
+                results.append((event, await self._deliver(event)))
+        finally:
+            # ما أُرسل قبل الإلغاء يُسجل؛ الباقي يعود مستحقاً بعد انتهاء الحجز
+            if results:
+                await self._record(results)
+
+        return len(events)
+
+    async def run(self):
+        """حلقة التسليم: فور الإيقاظ أو كل poll_interval"""
+        while True:
+            self._wakeup.clear()
+
+            try:
+                count = await self.dispatch_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Outbox dispatch failed: {e}")
+                count = 0
+
+            if count >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """بدء المُرسل في الخلفية (على كل عامل؛ الحجز بـ SKIP LOCKED يمنع التكرار)"""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self.run(), name="outbox-dispatcher")
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+
+# Global instance
+outbox = OutboxDispatcher()
+
+
+@outbox.handler("send_message")
+async def deliver_send_message(payload: Dict[str, Any]):
+    markup = payload.get("reply_markup")
+    await bot_manager.bot.send_message(
+        payload["chat_id"],
+        payload["text"],
+        reply_markup=InlineKeyboardMarkup.model_validate(markup) if markup else None,
+        parse_mode=payload.get("parse_mode", "HTML")
+    )
+
+
+@outbox.handler("edit_message_text")
+async def deliver_edit_message_text(payload: Dict[str, Any]):
+    markup = payload.get("reply_markup")
+    await bot_manager.bot.edit_message_text(
+        chat_id=payload["chat_id"],
+        message_id=payload["message_id"],
+        text=payload["text"],
+        reply_markup=InlineKeyboardMarkup.model_validate(markup) if markup else None,
+        parse_mode=payload.get("parse_mode", "HTML")
+    )
@@ -1,6 +1,6 @@
 import redis.asyncio as redis
 import json
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List
 from config.settings import REDIS_URL, REDIS_CACHE_TTL
 
 class RedisCache:
@@ -22,11 +22,27 @@ class RedisCache:
         data = await self.redis.get(key)
         return json.loads(data) if data else None
     
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None):
+        """حفظ عدة قيم في رحلة واحدة (pipeline)"""
+        if not self.redis or not items:
+            return
+        if ttl is None:
+            ttl = REDIS_CACHE_TTL
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, json.dumps(value), ex=ttl)
+            await pipe.execute()
+    
     async def delete(self, key: str):
         """حذف قيمة من الكاش"""
         if self.redis:
             await self.redis.delete(key)
     
+    async def delete_many(self, keys: List[str]):
+        """حذف عدة قيم بأمر واحد"""
+        if self.redis and keys:
+            await self.redis.delete(*keys)
+    
     async def exists(self, key: str) -> bool:
         """التحقق من وجود المفتاح"""
         if not self.redis:
@@ -0,0 +1,357 @@
+import asyncio
+import datetime
+import random
+import re
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable, Set
+
+import pytz
+
+from config.settings import SCHEDULER_TIMEZONE
+from core.bot import logger
+from core.database import AsyncSessionLocal
+from core.leader import leader, LeadershipLost
+from core.metrics import metrics
+
+job_duration = metrics.histogram(
+    "scheduler_job_duration_seconds",
+    "Duration of scheduled job runs"
+)
+job_runs = metrics.counter(
+    "scheduler_job_runs_total",
+    "Scheduled job runs by status"
+)
+
+JobFunc = Callable[[], Awaitable[Any]]
+
+# ==================== الجداول ====================
+
+class CronSchedule:
+    """جدول بصيغة cron من خمسة حقول: دقيقة ساعة يوم شهر يوم_الأسبوع"""
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        parts = self.expression.split()
+
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression: {expression!r}")
+
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse_field(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+
+        # في cron إذا تم تقييد اليوم ويوم الأسبوع معاً يكفي تطابق أحدهما
+        self._day_any = parts[2] == "*"
+        self._weekday_any = parts[4] == "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+
+        for item in field.split(","):
+            match = re.fullmatch(r"(\*|\d+(?:-\d+)?)(?:/(\d+))?", item)
+            if not match:
+                raise ValueError(f"Invalid cron field: {field!r}")
+
+            base, step = match.group(1), int(match.group(2) or 1)
+
+            if base == "*":
+                start, end = low, high
+            elif "-" in base:
+                start, end = (int(x) for x in base.split("-"))
+            else:
+                start = int(base)
+                end = high if match.group(2) else start
+
+            # الأحد يمكن كتابته 0 أو 7
+            if high == 6 and end == 7:
+                values.add(0)
+                end = 6
+                if start == 7:
+                    continue
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field out of range: {field!r}")
+
+            values.update(range(start, end + 1, step))
+
+        return values
+
+    def _day_matches(self, dt: datetime.datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+
+        if self._day_any:
+            return weekday_ok
+        if self._weekday_any:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt: datetime.datetime) -> datetime.datetime:
+        """أول موعد مطابق بعد الوقت المعطى"""
+        candidate = dt.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = candidate + datetime.timedelta(days=366 * 4)
+
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+
+            if not self._day_matches(candidate):
+                candidate = (candidate + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+
+            if candidate.hour not in self.hours:
+                candidate = (candidate + datetime.timedelta(hours=1)).replace(minute=0)
+                continue
+
+            if candidate.minute not in self.minutes:
+                candidate += datetime.timedelta(minutes=1)
+                continue
+
+            return candidate
+
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+    def __str__(self) -> str:
+        return self.expression
+
+
+class IntervalSchedule:
+    """جدول بفاصل زمني ثابت بالثواني"""
+
+    def __init__(self, seconds: int):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, dt: datetime.datetime) -> datetime.datetime:
+        return dt + datetime.timedelta(seconds=self.seconds)
+
+    def __str__(self) -> str:
+        return f"every {self.seconds}s"
+
+# ==================== المهام ====================
+
+class ScheduledTask:
+    """مهمة مجدولة مع حدودها"""
+
+    def __init__(
+        self,
+        name: str,
+        func: JobFunc,
+        schedule,
+        timeout: float,
+        max_instances: int,
+        jitter: float,
+        catch_up: bool
+    ):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.timeout = timeout
+        self.max_instances = max_instances
+        self.jitter = jitter
+        self.catch_up = catch_up
+
+        self.next_run_at: Optional[datetime.datetime] = None
+        self.last_run_at: Optional[datetime.datetime] = None
+        self.last_status: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self.running = 0
+
+
+class Scheduler:
+    """مجدول المهام الدورية مع حفظ الحالة في قاعدة البيانات"""
+
+    def __init__(self, timezone: str = SCHEDULER_TIMEZONE):
+        self.tz = pytz.timezone(timezone)
+        self.jobs: Dict[str, ScheduledTask] = {}
+        self._executions: Set[asyncio.Task] = set()
+        # رمز حماية القائد للتشغيل الحالي (None خارج القائد، مثلاً في الاختبارات)
+        self._token: Optional[int] = None
+
+    def now(self) -> datetime.datetime:
+        """الوقت المحلي بدون منطقة زمنية (كما يُحفظ في الجدول)"""
+        return datetime.datetime.now(self.tz).replace(tzinfo=None)
+
+    def add_job(
+        self,
+        name: str,
+        func: JobFunc,
+        cron: Optional[str] = None,
+        every: Optional[int] = None,
+        timeout: float = 300,
+        max_instances: int = 1,
+        jitter: float = 0,
+        catch_up: bool = True
+    ) -> ScheduledTask:
+        """تسجيل مهمة دورية بجدول cron أو بفاصل زمني"""
+        if (cron is None) == (every is None):
+            raise ValueError("Specify exactly one of cron or every")
+
+        schedule = CronSchedule(cron) if cron else IntervalSchedule(every)
+        job = ScheduledTask(name, func, schedule, timeout, max_instances, jitter, catch_up)
+        self.jobs[name] = job
+        return job
+
+    # ==================== الحالة المحفوظة ====================
+
+    async def _load_state(self):
+        """تحميل آخر تشغيل والتشغيل القادم، مع تعويض التشغيلات الفائتة"""
+        now = self.now()
+
+        try:
+            from database.crud.scheduled_jobs import ScheduledJobCRUD
+
+            async with AsyncSessionLocal() as session:
+                crud = ScheduledJobCRUD(session)
+                persisted = await crud.get_all()
+
+                for job in self.jobs.values():
+                    row = persisted.get(job.name)
+                    schedule_changed = row is not None and row.schedule != str(job.schedule)
+
+                    if row is None or row.next_run_at is None or schedule_changed:
+                        job.next_run_at = job.schedule.next_after(now)
+                    elif row.next_run_at <= now:
+                        # تشغيل فائت أثناء التوقف: نشغله مرة واحدة فوراً
+                        job.next_run_at = now if job.catch_up else job.schedule.next_after(now)
+                        logger.info(f"⏰ Job '{job.name}' missed its run at {row.next_run_at}, catch_up={job.catch_up}")
+                    else:
+                        job.next_run_at = row.next_run_at
+
+                    if row is not None:
+                        job.last_run_at = row.last_run_at
+                        job.last_status = row.last_status
+                        job.last_duration = row.last_duration
+
+                    await leader.ensure_current(self._token)
+                    await crud.register(job.name, str(job.schedule), job.next_run_at)
+        except LeadershipLost:
+            raise
+        except Exception as e:
+            logger.error(f"Could not load scheduler state: {e}")
+
+            for job in self.jobs.values():
+                if job.next_run_at is None:
+                    job.next_run_at = job.schedule.next_after(now)
+
+    async def _persist_run(self, job: ScheduledTask, started_at: datetime.datetime, status: str, duration: float, error: Optional[str]):
+        try:
+            from database.crud.scheduled_jobs import ScheduledJobCRUD
+
+            # قائد سابق لا يكتب فوق حالة القائد الحالي
+            await leader.ensure_current(self._token)
+
+            async with AsyncSessionLocal() as session:
+                await ScheduledJobCRUD(session).record_run(
+                    job.name, started_at, job.next_run_at, status, duration, error
+                )
+        except LeadershipLost as e:
+            logger.warning(f"Run of job '{job.name}' not persisted: {e}")
+        except Exception as e:
+            logger.error(f"Could not persist run of job '{job.name}': {e}")
+
+    # ==================== التنفيذ ====================
+
+    async def _execute(self, job: ScheduledTask):
+        started_at = self.now()
+        start = time.perf_counter()
+        status = "success"
+        error = None
+
+        job.running += 1
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+        except asyncio.TimeoutError:
+            status = "timeout"
+            error = f"Timed out after {job.timeout}s"
+            logger.error(f"Job '{job.name}' timed out after {job.timeout}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status = "failed"
+            error = str(e)
+            logger.error(f"Job '{job.name}' failed: {e}")
+        finally:
+            job.running -= 1
+
+        duration = time.perf_counter() - start
+        job.last_run_at = started_at
+        job.last_status = status
+        job.last_duration = duration
+
+        job_duration.observe(duration, job=job.name)
+        job_runs.inc(job=job.name, status=status)
+
+        logger.info(f"⏰ Job '{job.name}' finished: {status} in {duration:.2f}s, next run {job.next_run_at}")
+        await self._persist_run(job, started_at, status, duration, error)
+
+    async def _job_loop(self, job: ScheduledTask):
+        while True:
+            delay = (job.next_run_at - self.now()).total_seconds()
+            if job.jitter:
+                delay += random.uniform(0, job.jitter)
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # نحسب الموعد القادم من الآن، فالتشغيلات الفائتة تُدمج ولا تتراكم
+            job.next_run_at = job.schedule.next_after(max(self.now(), job.next_run_at))
+
+            if job.running >= job.max_instances:
+                job_runs.inc(job=job.name, status="skipped")
+                logger.warning(f"Job '{job.name}' skipped: {job.running} run(s) still in progress")
+                continue
+
+            # المهام تكتب في قاعدة البيانات: لا تشغيل برمز منتهي
+            await leader.ensure_current(self._token)
+
+            task = asyncio.create_task(self._execute(job), name=f"job:{job.name}")
+            self._executions.add(task)
+            task.add_done_callback(self._executions.discard)
+
+    async def run(self, token: Optional[int] = None):
+        """تشغيل المجدول (يعمل على القائد فقط برمز الحماية)"""
+        self._token = token
+        await self._load_state()
+
+        loops = [asyncio.create_task(self._job_loop(job), name=f"schedule:{job.name}") for job in self.jobs.values()]
+        logger.info(f"✅ Scheduler started with {len(loops)} job(s)")
+
+        try:
+            await asyncio.gather(*loops)
+        finally:
+            for task in loops + list(self._executions):
+                task.cancel()
+            await asyncio.gather(*loops, *self._executions, return_exceptions=True)
+
+    def status(self) -> Dict[str, Any]:
+        """حالة المهام للمراقبة"""
+        return {
+            "timezone": str(self.tz),
+            "jobs": [
+                {
+                    "name": job.name,
+                    "schedule": str(job.schedule),
+                    "next_run_at": job.next_run_at.isoformat() if job.next_run_at else None,
+                    "last_run_at": job.last_run_at.isoformat() if job.last_run_at else None,
+                    "last_status": job.last_status,
+                    "last_duration": round(job.last_duration, 3) if job.last_duration is not None else None,
+                    "running": job.running,
+                    "timeout": job.timeout,
+                    "max_instances": job.max_instances,
+                    "duration": job_duration.stats(job=job.name)
+                }
+                for job in self.jobs.values()
+            ]
+        }
+
+
+# Global instance
+scheduler = Scheduler()
@@ -0,0 +1,102 @@
+import hashlib
+from typing import List, Tuple, Dict, Any
+
+from config.settings import SMS_DEDUP_TTL
+from core.bot import logger
+from core.metrics import metrics
+from core.redis_cache import cache
+from utils.sms_matcher import SyriatelSMS
+
+# (الرسالة المحللة، النص الخام كما وصل من البوابة)
+SMSItem = Tuple[SyriatelSMS, str]
+
+sms_dedup = metrics.counter(
+    "sms_dedup_total",
+    "SMS dedup decisions (layer=redis|database, result=new|replay|conflict)"
+)
+
+
+def content_hash(message: str) -> str:
+    """بصمة نص الرسالة بعد توحيد المسافات"""
+    return hashlib.blake2b(" ".join(message.split()).encode(), digest_size=12).hexdigest()
+
+
+def dedup_key(transaction_id: str) -> str:
+    return f"sms:seen:{transaction_id}"
+
+
+class SMSDedupGate:
+    """رفض الرسائل المعاد إرسالها قبل أي عمل على قاعدة البيانات (SET NX برقم العملية وبصمة المحتوى)"""
+
+    def __init__(self, ttl: int = SMS_DEDUP_TTL):
+        self.ttl = ttl
+
+    async def admit(self, items: List[SMSItem]) -> List[bool]:
+        """True للرسائل الجديدة؛ إذا تعطل Redis تُقبل الكل ويحسم القيد الفريد في الجدول"""
+        if not items:
+            return []
+        if not cache.redis:
+            return [True] * len(items)
+
+        try:
+            async with cache.redis.pipeline(transaction=False) as pipe:
+                for sms, message in items:
+                    pipe.set(dedup_key(sms.transaction_id), content_hash(message), nx=True, ex=self.ttl)
+                admitted = [bool(result) for result in await pipe.execute()]
+
+            rejected = [item for item, ok in zip(items, admitted) if not ok]
+            if rejected:
+                async with cache.redis.pipeline(transaction=False) as pipe:
+                    for sms, _ in rejected:
+                        pipe.get(dedup_key(sms.transaction_id))
+                    seen = await pipe.execute()
+
+                for (sms, message), digest in zip(rejected, seen):
+                    if digest == content_hash(message):
+                        sms_dedup.inc(layer="redis", result="replay")
+                    else:
+                        # نفس رقم العملية بمحتوى مختلف: لا يُعالج مرتين، لكنه يستحق المراجعة
+                        sms_dedup.inc(layer="redis", result="conflict")
+                        logger.warning(f"⚠️ SMS {sms.transaction_id} seen before with different content")
+        except Exception as e:
+            logger.debug(f"SMS dedup check failed, relying on database constraint: {e}")
+            return [True] * len(items)
+
+        sms_dedup.inc(sum(admitted), layer="redis", result="new")
+        return admitted
+
+    async def release(self, items: List[SMSItem]):
+        """إلغاء العلامة عند فشل المعالجة حتى تُقبل إعادة المحاولة"""
+        if not items or not cache.redis:
+            return
+
+        try:
+            await cache.redis.delete(*{dedup_key(sms.transaction_id) for sms, _ in items})
+        except Exception as e:
+            logger.debug(f"SMS dedup release failed: {e}")
+
+    @staticmethod
+    def record_database(new: int, duplicates: int):
+        """نتيجة القيد الفريد في processed_sms (الطبقة الثانية)"""
+        sms_dedup.inc(new, layer="database", result="new")
+        sms_dedup.inc(duplicates, layer="database", result="replay")
+
+    def stats(self) -> Dict[str, Any]:
+        """نسبة الرسائل المرفوضة كتكرار من كل ما وصل للبوابة"""
+        new = sms_dedup.value(layer="redis", result="new")
+        replay = sms_dedup.value(layer="redis", result="replay")
+        conflict = sms_dedup.value(layer="redis", result="conflict")
+        db_replay = sms_dedup.value(layer="database", result="replay")
+        total = new + replay + conflict
+
+        return {
+            "seen": int(total),
+            "replays": int(replay),
+            "conflicts": int(conflict),
+            "database_replays": int(db_replay),
+            "hit_rate": round((replay + conflict) / total, 4) if total else 0.0
+        }
+
+
+# Global instance
+sms_gate = SMSDedupGate()
@@ -0,0 +1,224 @@
+import asyncio
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, List, NamedTuple
+
+import aiohttp
+
+from config.settings import (
+    SMS_SOURCE_URL, SMS_POLL_BATCH, SMS_POLL_MIN_INTERVAL, SMS_CHECK_INTERVAL, SMS_POLL_MAX_LAG
+)
+from core.bot import logger
+from core.leader import leader, LeadershipLost
+from core.metrics import metrics
+from core.redis_cache import cache
+from core.sms_stream import SMS_STREAM, SMS_GROUP, validate_sms, enqueue_sms
+
+sms_polled = metrics.counter(
+    "sms_source_polled_total",
+    "SMS pulled from the gateway source (result=enqueued|invalid)"
+)
+sms_poll_skipped = metrics.counter(
+    "sms_source_backpressure_total",
+    "Polls skipped because the stream consumers are behind"
+)
+
+
+class SourceRecord(NamedTuple):
+    """رسالة من مصدر البوابة مع موقعها (المؤشر) في المصدر"""
+    cursor: str
+    sender: str
+    message: str
+    timestamp: str
+
+
+class SMSSource(ABC):
+    """مصدر سحب رسائل SMS: يعيد الرسائل بعد مؤشر معين بترتيب تصاعدي"""
+
+    name = "source"
+
+    @abstractmethod
+    async def fetch(self, cursor: str, limit: int) -> List[SourceRecord]:
+        """حتى limit رسالة بعد المؤشر (مؤشر فارغ = من البداية)"""
+
+    async def close(self):
+        pass
+
+
+class SQLiteSMSSource(SMSSource):
+    """ملف SQLite مشترك مع تطبيق البوابة على نفس الجهاز (قراءة فقط)"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, table: str = "sms"):
+        self.path = path
+        self.table = table
+
+    def _query(self, cursor: int, limit: int) -> List[SourceRecord]:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                f"SELECT id, sender, message, timestamp FROM {self.table} WHERE id > ? ORDER BY id LIMIT ?",
+                (cursor, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return [SourceRecord(str(row[0]), row[1] or "", row[2] or "", row[3] or "") for row in rows]
+
+    async def fetch(self, cursor: str, limit: int) -> List[SourceRecord]:
+        return await asyncio.to_thread(self._query, int(cursor or 0), limit)
+
+
+class HTTPSMSSource(SMSSource):
+    """نقطة HTTP محلية في تطبيق البوابة: GET ?after=<cursor>&limit=<n> ← قائمة JSON"""
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def fetch(self, cursor: str, limit: int) -> List[SourceRecord]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+
+        async with self._session.get(self.url, params={"after": cursor, "limit": limit}) as response:
+            response.raise_for_status()
+            items = await response.json()
+
+        return [
+            SourceRecord(str(item["id"]), item.get("sender") or "", item.get("message") or "", item.get("timestamp") or "")
+            for item in items
+        ]
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class MemorySMSSource(SMSSource):
+    """مصدر في الذاكرة للتطوير والاختبار (بديل محلي عن البوابة)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.records: List[SourceRecord] = []
+
+    def push(self, sender: str, message: str, timestamp: str = ""):
+        self.records.append(SourceRecord(str(len(self.records) + 1), sender, message, timestamp))
+
+    async def fetch(self, cursor: str, limit: int) -> List[SourceRecord]:
+        start = int(cursor or 0)
+        return self.records[start:start + limit]
+
+
+def source_from_url(url: str) -> Optional[SMSSource]:
+    """sqlite:///path/to/sms.db أو http://127.0.0.1:8080/sms أو memory://"""
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteSMSSource(url[len("sqlite:///"):])
+    if url.startswith(("http://", "https://")):
+        return HTTPSMSSource(url)
+    if url.startswith("memory://"):
+        return MemorySMSSource()
+
+    raise ValueError(f"Unsupported SMS source: {url!r}")
+
+
+class SMSPoller:
+    """سحب تزايدي من المصدر بمؤشر محفوظ، بفاصل يتكيف مع الحركة وضغط عكسي من التدفق"""
+
+    def __init__(
+        self,
+        source: SMSSource,
+        batch_size: int = SMS_POLL_BATCH,
+        min_interval: float = SMS_POLL_MIN_INTERVAL,
+        max_interval: float = SMS_CHECK_INTERVAL,
+        max_lag: int = SMS_POLL_MAX_LAG
+    ):
+        self.source = source
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_lag = max_lag
+        self.cursor_key = f"sms:source:{source.name}:cursor"
+        self.interval = min_interval
+
+    async def _lag(self) -> int:
+        """رسائل لم يؤكدها عمال التدفق بعد (المعلقة + غير المقروءة)"""
+        try:
+            groups = await cache.redis.xinfo_groups(SMS_STREAM)
+        except Exception:
+            return 0  # التدفق لم يُنشأ بعد
+
+        for group in groups:
+            if group["name"] == SMS_GROUP:
+                return int(group.get("pending") or 0) + int(group.get("lag") or 0)
+        return 0
+
+    async def poll_once(self, token: Optional[int] = None) -> Optional[int]:
+        """دفعة واحدة: عدد الرسائل المسحوبة، أو None إذا تم التخطي بسبب الضغط العكسي
+
+        token: رمز حماية القائد؛ يُتحقق منه قبل كل كتابة (LeadershipLost إذا انتهى).
+        """
+        if await self._lag() >= self.max_lag:
+            sms_poll_skipped.inc()
+            return None
+
+        cursor = await cache.redis.get(self.cursor_key) or ""
+        records = await self.source.fetch(cursor, self.batch_size)
+        if not records:
+            return 0
+
+        items = []
+        for record in records:
+            item = validate_sms(record._asdict())
+            if item is None:
+                sms_polled.inc(result="invalid")
+            else:
+                items.append(item)
+
+        if items:
+            await leader.ensure_current(token)
+            await enqueue_sms(items)
+            sms_polled.inc(len(items), result="enqueued")
+
+        # المؤشر يتقدم بعد الإلحاق فقط؛ التكرار عند إعادة التشغيل تلتقطه بوابة إزالة التكرار
+        await leader.ensure_current(token)
+        await cache.redis.set(self.cursor_key, records[-1].cursor)
+        return len(records)
+
+    def _next_interval(self, count: Optional[int]) -> float:
+        if count is not None and count >= self.batch_size:
+            return 0  # ما زال هناك المزيد
+        if count:
+            return self.min_interval
+        # لا جديد أو التدفق مزدحم: إبطاء تدريجي حتى الحد الأقصى
+        return min(self.max_interval, max(self.interval, self.min_interval) * 2)
+
+    async def run(self, token: Optional[int] = None):
+        logger.info(f"📥 SMS poller started ({self.source.name})")
+
+        try:
+            while True:
+                try:
+                    count = await self.poll_once(token)
+                except (asyncio.CancelledError, LeadershipLost):
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ SMS source poll failed: {e}")
+                    count = 0
+
+                self.interval = self._next_interval(count)
+                await asyncio.sleep(self.interval)
+        finally:
+            await self.source.close()
+
+
+# Global instance
+sms_source = source_from_url(SMS_SOURCE_URL)
+sms_poller = SMSPoller(sms_source) if sms_source else None
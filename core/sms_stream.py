@@ -0,0 +1,219 @@
+import asyncio
+import datetime
+import json
+from typing import Optional, Dict, Any, List, Tuple
+
+from config.settings import (
+    SMS_STREAM_MAXLEN, SMS_BATCH_SIZE, SMS_BLOCK_MS, SMS_CLAIM_IDLE_MS,
+    SMS_MAX_DELIVERIES, SMS_DEAD_LETTER_MAX
+)
+from core.bot import logger
+from core.database import AsyncSessionLocal
+from core.leader import leader
+from core.metrics import metrics
+from core.redis_cache import cache
+from core.sms_dedup import sms_gate
+from core.unmatched_sms import unmatched_sms
+from utils.sms_matcher import match_syriatel_sms
+
+SMS_STREAM = "sms:incoming"
+SMS_GROUP = "sms-verifiers"
+SMS_DEAD_LETTER = "sms:dead_letter"
+SMS_ATTEMPTS = "sms:attempts"
+
+StreamEntry = Tuple[str, Dict[str, str]]
+
+sms_enqueued = metrics.counter("sms_enqueued_total", "SMS appended to the ingestion stream")
+sms_processed = metrics.counter(
+    "sms_processed_total",
+    "SMS processed by stream workers (result=approved|unmatched|duplicate|dead_letter|error)"
+)
+
+
+def validate_sms(data: Any) -> Optional[Dict[str, str]]:
+    """الحقول المطلوبة من بوابة الهاتف؛ None إذا كانت ناقصة"""
+    if not isinstance(data, dict):
+        return None
+
+    sender = str(data.get("sender") or "").strip()
+    message = str(data.get("message") or "").strip()
+    if not sender or not message:
+        return None
+
+    return {
+        "sender": sender,
+        "message": message,
+        "timestamp": str(data.get("timestamp") or ""),
+        "received_at": datetime.datetime.now().isoformat()
+    }
+
+
+async def enqueue_sms(items: List[Dict[str, str]]) -> List[str]:
+    """إلحاق رسائل بالتدفق في رحلة واحدة؛ يعيد معرفات الإدخالات"""
+    async with cache.redis.pipeline(transaction=False) as pipe:
+        for item in items:
+            pipe.xadd(SMS_STREAM, item, maxlen=SMS_STREAM_MAXLEN, approximate=True)
+        ids = await pipe.execute()
+
+    sms_enqueued.inc(len(ids))
+    return ids
+
+
+class SMSStreamConsumer:
+    """عامل ضمن مجموعة المستهلكين: يحلل ويتحقق على دفعات ويؤكد (XACK) بعد الـ commit"""
+
+    def __init__(
+        self,
+        batch_size: int = SMS_BATCH_SIZE,
+        block_ms: int = SMS_BLOCK_MS,
+        claim_idle_ms: int = SMS_CLAIM_IDLE_MS,
+        max_deliveries: int = SMS_MAX_DELIVERIES
+    ):
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.consumer = leader.instance_id
+        self._runner: Optional[asyncio.Task] = None
+
+    async def ensure_group(self):
+        try:
+            await cache.redis.xgroup_create(SMS_STREAM, SMS_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def dead_letter(self, entry_id: str, fields: Dict[str, str], reason: str):
+        """نقل رسالة لقائمة الرسائل الميتة للمراجعة اليدوية"""
+        record = dict(fields, id=entry_id, reason=reason, failed_at=datetime.datetime.now().isoformat())
+
+        async with cache.redis.pipeline(transaction=False) as pipe:
+            pipe.lpush(SMS_DEAD_LETTER, json.dumps(record, ensure_ascii=False))
+            pipe.ltrim(SMS_DEAD_LETTER, 0, SMS_DEAD_LETTER_MAX - 1)
+            pipe.hdel(SMS_ATTEMPTS, entry_id)
+            await pipe.execute()
+
+        sms_processed.inc(result="dead_letter")
+        logger.warning(f"📭 SMS {entry_id} moved to dead letter: {reason}")
+
+    async def _record_failure(self, entry_id: str, fields: Dict[str, str], error: Exception) -> bool:
+        """عدّ المحاولات الفاشلة؛ True إذا نُقلت الرسالة للقائمة الميتة"""
+        sms_processed.inc(result="error")
+        attempts = await cache.redis.hincrby(SMS_ATTEMPTS, entry_id, 1)
+
+        if attempts >= self.max_deliveries:
+            await self.dead_letter(entry_id, fields, f"failed {attempts} times: {error}")
+            return True
+
+        logger.warning(f"⚠️ SMS {entry_id} failed (attempt {attempts}): {error}")
+        return False
+
+    async def process_batch(self, entries: List[StreamEntry]):
+        """تحليل الدفعة، مطابقتها باستعلام واحد، والموافقة عليها في معاملة واحدة ثم XACK"""
+        from utils.sms_parser import SMSParser
+
+        done: List[str] = []
+        parsed_entries = []
+
+        for entry_id, fields in entries:
+            parsed = match_syriatel_sms(fields.get("message", ""), fields.get("sender"))
+            if parsed is None:
+                await self.dead_letter(entry_id, fields, "unparseable")
+                done.append(entry_id)
+            else:
+                parsed_entries.append((entry_id, fields, parsed))
+
+        if parsed_entries:
+            # تكرار من البوابة: يُرفض قبل أي عمل على قاعدة البيانات
+            admitted = await sms_gate.admit([(parsed, fields.get("message", "")) for _, fields, parsed in parsed_entries])
+            duplicates = [entry_id for (entry_id, _, _), ok in zip(parsed_entries, admitted) if not ok]
+            sms_processed.inc(len(duplicates), result="duplicate")
+            done.extend(duplicates)
+            parsed_entries = [entry for entry, ok in zip(parsed_entries, admitted) if ok]
+
+        if parsed_entries:
+            items = [(parsed, fields.get("message", "")) for _, fields, parsed in parsed_entries]
+
+            async with AsyncSessionLocal() as session:
+                parser = SMSParser(session)
+                try:
+                    fresh = await parser.record_processed(items)
+                    matches = await parser.reconcile_batch([sms for sms, _ in fresh])
+                    matched = [(sms, tx_id) for sms, tx_id in matches if tx_id is not None]
+                    approved = await parser.auto_approve_batch(matched)
+                    # يحفظ سجل processed_sms حتى لو لم تكن هناك موافقات
+                    await session.commit()
+                    await unmatched_sms.remember([sms for sms, tx_id in matches if tx_id is None])
+
+                    sms_processed.inc(len(items) - len(fresh), result="duplicate")
+                    sms_processed.inc(len(approved), result="approved")
+                    sms_processed.inc(len(fresh) - len(approved), result="unmatched")
+                    done.extend(entry_id for entry_id, _, _ in parsed_entries)
+                except Exception as e:
+                    await session.rollback()
+                    await sms_gate.release(items)
+                    for entry_id, fields, _ in parsed_entries:
+                        if await self._record_failure(entry_id, fields, e):
+                            done.append(entry_id)
+
+        if done:
+            await cache.redis.xack(SMS_STREAM, SMS_GROUP, *done)
+
+    async def _reclaim(self) -> List[StreamEntry]:
+        """استعادة رسائل عالقة لدى عامل توقف قبل التأكيد"""
+        result = await cache.redis.xautoclaim(
+            SMS_STREAM, SMS_GROUP, self.consumer,
+            min_idle_time=self.claim_idle_ms, start_id="0-0", count=self.batch_size
+        )
+        return [(entry_id, fields) for entry_id, fields in result[1] if fields]
+
+    async def run(self):
+        await self.ensure_group()
+
+        while True:
+            try:
+                entries = await self._reclaim()
+
+                if not entries:
+                    response = await cache.redis.xreadgroup(
+                        SMS_GROUP, self.consumer, {SMS_STREAM: ">"},
+                        count=self.batch_size, block=self.block_ms
+                    )
+                    entries = response[0][1] if response else []
+
+                if entries:
+                    await self.process_batch(entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ SMS stream worker error: {e}")
+                await asyncio.sleep(1)
+
+    def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self.run(), name="sms-stream-consumer")
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+    async def status(self) -> Dict[str, Any]:
+        async with cache.redis.pipeline(transaction=False) as pipe:
+            pipe.xlen(SMS_STREAM)
+            pipe.xpending(SMS_STREAM, SMS_GROUP)
+            pipe.llen(SMS_DEAD_LETTER)
+            length, pending, dead = await pipe.execute()
+
+        return {
+            "stream_length": length,
+            "pending": pending["pending"],
+            "dead_letter": dead,
+            "consumer": self.consumer,
+            "dedup": sms_gate.stats()
+        }
+
+
+# Global instance
+sms_consumer = SMSStreamConsumer()
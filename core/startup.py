@@ -0,0 +1,173 @@
+import asyncio
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable, Iterable
+
+from sqlalchemy import text
+
+from config.settings import (
+    DB_POOL_MIN_SIZE, REDIS_POOL_MIN_SIZE, STARTUP_STEP_TIMEOUT, FAST_RESPONSE_MS
+)
+from core.bot import logger
+from core.database import engine
+from core.redis_cache import cache
+
+# وقت بدء العملية (لقياس الزمن حتى الجاهزية وأول استجابة سريعة)
+PROCESS_STARTED_AT = time.time()
+
+StepFunc = Callable[[], Awaitable[Any]]
+
+
+class StartupStep:
+    """خطوة تهيئة واحدة مع اعتمادياتها وتوقيتها"""
+
+    def __init__(self, name: str, func: StepFunc, depends_on: Iterable[str], timeout: float, critical: bool):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.critical = critical
+
+        self.status = "pending"  # pending, running, done, failed, skipped
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.done = asyncio.Event()
+
+
+class StartupPipeline:
+    """تشغيل خطوات بدء التشغيل المستقلة بالتوازي مع توقيت كل خطوة"""
+
+    def __init__(self):
+        self.steps: Dict[str, StartupStep] = {}
+        self.ready = False
+        self.ready_at: Optional[float] = None
+        self.first_fast_response_at: Optional[float] = None
+
+    def add_step(
+        self,
+        name: str,
+        func: StepFunc,
+        depends_on: Iterable[str] = (),
+        timeout: float = STARTUP_STEP_TIMEOUT,
+        critical: bool = True
+    ):
+        """إضافة خطوة؛ الخطوات غير الحرجة (مثل التسخين) لا توقف التشغيل عند فشلها"""
+        self.steps[name] = StartupStep(name, func, depends_on, timeout, critical)
+
+    async def _run_step(self, step: StartupStep):
+        try:
+            for dependency in step.depends_on:
+                await self.steps[dependency].done.wait()
+
+            failed = [d for d in step.depends_on if self.steps[d].status != "done"]
+            if failed:
+                step.status = "skipped"
+                step.error = f"dependency failed: {', '.join(failed)}"
+                return
+
+            step.status = "running"
+            step.started_at = time.perf_counter()
+
+            try:
+                await asyncio.wait_for(step.func(), timeout=step.timeout)
+                step.status = "done"
+            except Exception as e:
+                step.status = "failed"
+                step.error = str(e) or type(e).__name__
+            finally:
+                step.duration = time.perf_counter() - step.started_at
+
+            if step.status == "done":
+                logger.info(f"✅ Startup step '{step.name}' done in {step.duration * 1000:.0f}ms")
+            elif step.critical:
+                logger.error(f"❌ Startup step '{step.name}' failed: {step.error}")
+            else:
+                logger.warning(f"⚠️ Startup step '{step.name}' failed (non-critical): {step.error}")
+        finally:
+            step.done.set()
+
+    async def run(self):
+        """تشغيل جميع الخطوات؛ يرفع خطأ إذا فشلت خطوة حرجة"""
+        start = time.perf_counter()
+        await asyncio.gather(*(self._run_step(step) for step in self.steps.values()))
+
+        logger.info(f"🚀 Startup pipeline finished in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        failed = [s for s in self.steps.values() if s.critical and s.status != "done"]
+        if failed:
+            details = "; ".join(f"{s.name}: {s.error}" for s in failed)
+            raise RuntimeError(f"Startup failed: {details}")
+
+    def mark_ready(self):
+        """الإعلان عن الجاهزية بعد انتهاء التهيئة والتسخين"""
+        self.ready = True
+        self.ready_at = time.time()
+        logger.info(f"✅ Ready {self.ready_at - PROCESS_STARTED_AT:.2f}s after process start")
+
+    def record_response(self, duration: float):
+        """تسجيل أول استجابة سريعة بعد الجاهزية (الزمن حتى أول استجابة سريعة)"""
+        if self.first_fast_response_at is not None or not self.ready:
+            return
+
+        if duration * 1000 <= FAST_RESPONSE_MS:
+            self.first_fast_response_at = time.time()
+            logger.info(
+                f"⚡ First fast response {self.first_fast_response_at - PROCESS_STARTED_AT:.2f}s "
+                f"after process start ({duration * 1000:.0f}ms)"
+            )
+
+    def report(self) -> Dict[str, Any]:
+        """تقرير التوقيت لكل خطوة"""
+        return {
+            "ready": self.ready,
+            "time_to_ready_seconds": round(self.ready_at - PROCESS_STARTED_AT, 3) if self.ready_at else None,
+            "time_to_first_fast_response_seconds": (
+                round(self.first_fast_response_at - PROCESS_STARTED_AT, 3)
+                if self.first_fast_response_at else None
+            ),
+            "fast_response_threshold_ms": FAST_RESPONSE_MS,
+            "steps": [
+                {
+                    "name": step.name,
+                    "status": step.status,
+                    "depends_on": list(step.depends_on),
+                    "critical": step.critical,
+                    "duration_ms": round(step.duration * 1000, 1) if step.duration is not None else None,
+                    "error": step.error
+                }
+                for step in self.steps.values()
+            ]
+        }
+
+# ==================== تسخين الاتصالات ====================
+
+async def warm_db_pool(size: int = DB_POOL_MIN_SIZE):
+    """فتح الحد الأدنى من اتصالات قاعدة البيانات مسبقاً وإعادتها للـ pool"""
+    opened = 0
+    all_open = asyncio.Event()
+
+    async def _open():
+        nonlocal opened
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            opened += 1
+            if opened == size:
+                all_open.set()
+            # نبقي الاتصال مفتوحاً حتى تُفتح جميع الاتصالات كي لا يعاد استخدامه
+            await all_open.wait()
+
+    try:
+        await asyncio.gather(*(_open() for _ in range(size)))
+    finally:
+        all_open.set()
+
+
+async def warm_redis_pool(size: int = REDIS_POOL_MIN_SIZE):
+    """فتح الحد الأدنى من اتصالات Redis مسبقاً (طلبات متزامنة تنشئ اتصالات منفصلة)"""
+    if not cache.redis:
+        return
+    await asyncio.gather(*(cache.redis.ping() for _ in range(size)))
+
+
+# Global instance
+startup = StartupPipeline()
@@ -0,0 +1,147 @@
+import asyncio
+import json
+from typing import Optional, Dict, Any, Callable, Awaitable, List, Set
+
+import asyncpg
+
+from config.settings import TX_EVENTS_RECONNECT_MAX
+from core.bot import logger
+from core.charge_txids import charge_txids
+from core.database import engine
+from core.metrics import metrics
+from core.redis_cache import cache
+
+# قناة NOTIFY التي تُرسل عليها تغييرات حالة المعاملات (من داخل معاملة الـ commit نفسها)
+TX_EVENTS_CHANNEL = "tx_events"
+
+TxEvent = Dict[str, Any]
+TxSubscriber = Callable[[TxEvent], Awaitable[None]]
+
+tx_events_received = metrics.counter(
+    "tx_events_received_total",
+    "Transaction status events received via LISTEN (status=...)"
+)
+tx_subscriber_errors = metrics.counter(
+    "tx_event_subscriber_errors_total",
+    "In-process transaction event subscribers that raised"
+)
+
+
+class TxEventBus:
+    """مستمع LISTEN في كل عامل يوزع أحداث المعاملات على المشتركين داخل العملية"""
+
+    def __init__(self, channel: str = TX_EVENTS_CHANNEL, reconnect_max: float = TX_EVENTS_RECONNECT_MAX):
+        self.channel = channel
+        self.reconnect_max = reconnect_max
+
+        self._subscribers: List[TxSubscriber] = []
+        self._pending: Set[asyncio.Task] = set()
+        self._connection: Optional[asyncpg.Connection] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    def subscribe(self, func: TxSubscriber) -> TxSubscriber:
+        """تسجيل مشترك (يُستخدم كـ decorator)"""
+        self._subscribers.append(func)
+        return func
+
+    async def _call(self, func: TxSubscriber, event: TxEvent):
+        try:
+            await func(event)
+        except Exception as e:
+            tx_subscriber_errors.inc(subscriber=func.__name__)
+            logger.error(f"❌ Transaction event subscriber {func.__name__} failed: {e}")
+
+    def dispatch(self, event: TxEvent):
+        """توزيع حدث على جميع المشتركين دون حجز المستمع"""
+        tx_events_received.inc(status=event.get("status", "unknown"))
+
+        for func in self._subscribers:
+            task = asyncio.create_task(self._call(func, event))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"⚠️ Malformed transaction event: {payload[:200]}")
+            return
+
+        self.dispatch(event)
+
+    async def _listen(self):
+        """اتصال مخصص خارج الـ pool يبقى مفتوحاً حتى ينقطع"""
+        lost = asyncio.Event()
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+        self._connection = await asyncpg.connect(dsn)
+        self._connection.add_termination_listener(lambda connection: lost.set())
+        await self._connection.add_listener(self.channel, self._on_notify)
+        logger.info(f"📡 Listening for transaction events on '{self.channel}'")
+
+        try:
+            await lost.wait()
+        finally:
+            connection, self._connection = self._connection, None
+            if not connection.is_closed():
+                await connection.close()
+
+    async def run(self):
+        delay = 1.0
+
+        while True:
+            try:
+                await self._listen()
+                delay = 1.0
+                logger.warning("⚠️ Transaction event listener connection lost, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Transaction event listener error: {e}")
+
+            # الأحداث أثناء الانقطاع تضيع (NOTIFY لا يُخزن)؛ المشتركون يجب أن يتحملوا ذلك
+            await asyncio.sleep(delay)
+            delay = min(self.reconnect_max, delay * 2)
+
+    def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self.run(), name="tx-events-listener")
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "connected": self._connection is not None and not self._connection.is_closed(),
+            "subscribers": [func.__name__ for func in self._subscribers]
+        }
+
+
+# Global instance
+tx_events = TxEventBus()
+
+
+# ==================== المشتركون ====================
+
+@tx_events.subscribe
+async def invalidate_user_cache(event: TxEvent):
+    """الحالات التي تغير الرصيد: شحن موافق عليه أو سحب مرفوض (أُعيد المبلغ)
+
+    إضافي فوق الحذف المباشر بعد الـ commit: الأحداث تضيع أثناء إعادة اتصال المستمع.
+    """
+    if (event["type"], event["status"]) in (("charge", "approved"), ("withdraw", "rejected")):
+        await cache.delete(f"user:{event['user_id']}")
+
+
+@tx_events.subscribe
+async def release_rejected_charge_txid(event: TxEvent):
+    """رقم عملية شحن مرفوض يمكن إعادة إرساله"""
+    if event["type"] == "charge" and event["status"] == "rejected" and event.get("transaction_id"):
+        await charge_txids.remove(event.get("payment_method") or "", event["transaction_id"])
@@ -0,0 +1,99 @@
+from typing import Optional, List
+
+from config.settings import SMS_UNMATCHED_TTL
+from core.bot import logger
+from core.metrics import metrics
+from core.redis_cache import cache
+from utils.sms_matcher import SyriatelSMS
+
+# سحب ذري: الحذف فقط إذا تطابق المبلغ (يمنع استخدام نفس الرسالة لطلبين)
+# KEYS[1] مفتاح الرسالة؛ ARGV[1] المبلغ المتوقع
+# يعيد الحقول عند النجاح، 0 إذا اختلف المبلغ، nil إذا لم توجد
+CLAIM_SCRIPT = """
+local fields = redis.call('HGETALL', KEYS[1])
+if #fields == 0 then
+    return nil
+end
+local amount = redis.call('HGET', KEYS[1], 'amount')
+if amount ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+return fields
+"""
+
+sms_unmatched = metrics.counter(
+    "sms_unmatched_index_total",
+    "Unmatched SMS index operations (result=stored|hit|miss|amount_mismatch|error)"
+)
+
+
+def unmatched_key(transaction_id: str) -> str:
+    return f"sms:unmatched:{transaction_id}"
+
+
+class UnmatchedSMSIndex:
+    """رسائل سيرياتيل وصلت قبل طلب المستخدم، مفهرسة برقم العملية لمدة محدودة"""
+
+    def __init__(self, ttl: int = SMS_UNMATCHED_TTL):
+        self.ttl = ttl
+        self._script = None
+
+    async def remember(self, messages: List[SyriatelSMS]):
+        """حفظ رسائل بدون طلب معلق مطابق (رحلة واحدة للدفعة)"""
+        if not messages or not cache.redis:
+            return
+
+        try:
+            async with cache.redis.pipeline(transaction=False) as pipe:
+                for sms in messages:
+                    key = unmatched_key(sms.transaction_id)
+                    pipe.hset(key, mapping={
+                        "transaction_id": sms.transaction_id,
+                        "amount": sms.amount,
+                        "from_number": sms.from_number or "",
+                        "balance": "" if sms.balance is None else sms.balance,
+                        "pattern": sms.pattern
+                    })
+                    pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            sms_unmatched.inc(len(messages), result="error")
+            logger.warning(f"⚠️ Failed to index unmatched SMS: {e}")
+            return
+
+        sms_unmatched.inc(len(messages), result="stored")
+
+    async def claim(self, transaction_id: str, amount: int) -> Optional[SyriatelSMS]:
+        """سحب الرسالة المطابقة لرقم العملية والمبلغ؛ None إذا لم توجد أو اختلف المبلغ"""
+        if not transaction_id or not cache.redis:
+            return None
+
+        try:
+            if self._script is None:
+                self._script = cache.redis.register_script(CLAIM_SCRIPT)
+
+            fields = await self._script(keys=[unmatched_key(transaction_id)], args=[amount])
+        except Exception as e:
+            # بدون الفهرس يذهب الطلب للمراجعة اليدوية كالمعتاد
+            sms_unmatched.inc(result="error")
+            logger.debug(f"Unmatched SMS claim failed: {e}")
+            return None
+
+        if not fields:
+            sms_unmatched.inc(result="miss" if fields is None else "amount_mismatch")
+            return None
+
+        sms_unmatched.inc(result="hit")
+        record = dict(zip(fields[::2], fields[1::2]))
+        return SyriatelSMS(
+            transaction_id=record["transaction_id"],
+            amount=int(record["amount"]),
+            from_number=record["from_number"] or None,
+            balance=int(record["balance"]) if record["balance"] else None,
+            pattern=record["pattern"]
+        )
+
+
+# Global instance
+unmatched_sms = UnmatchedSMSIndex()
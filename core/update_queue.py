@@ -0,0 +1,230 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, List, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config import ADMIN_ID
+from config.settings import UPDATE_WORKERS, UPDATE_QUEUE_MAX, UPDATE_DRAIN_TIMEOUT
+from core.bot import logger
+from core.callbacks import callbacks
+from core.metrics import metrics
+from core.redis_cache import cache
+
+# التحديثات التي لم تُعالج عند الإيقاف (JSON لكل تحديث)؛ الـ webhook أعاد 200 فلن يعيدها Telegram
+PENDING_KEY = "updates:pending"
+
+# الأوزان: في كل دورة مزدحمة يأخذ الأدمن 8 تحديثات مقابل 4 للدفع و1 للتصفح
+# (ترتيب القاموس هو ترتيب الأولوية داخل الدورة)
+LANE_WEIGHTS = {
+    "admin": 8,
+    "payment": 4,
+    "general": 1
+}
+
+queue_wait = metrics.histogram(
+    "update_queue_wait_seconds",
+    "Time an update waited in its lane before a worker picked it up",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+queue_rejected = metrics.counter(
+    "update_queue_rejected_total",
+    "Updates rejected because their lane was full"
+)
+queue_carried = metrics.counter(
+    "update_queue_carried_over_total",
+    "Updates left unprocessed at shutdown (result=persisted|restored|lost)"
+)
+
+
+def classify_update(update: Update) -> str:
+    """تحديد مسار الأولوية بدون أي I/O: الأدمن، تأكيدات الدفع، ثم التصفح العام"""
+    callback = update.callback_query
+    event = callback or update.message
+    user = event.from_user if event else None
+
+    if user is not None and user.id == ADMIN_ID:
+        return "admin"
+
+    if callback is not None:
+        try:
+            resolved = callbacks.resolve(callback.data)
+        except ValueError:
+            resolved = None
+
+        if resolved is not None:
+            route, _ = resolved
+            if route.admin:
+                return "admin"
+            if route.handler.flags.get("priority") == "payment":
+                return "payment"
+
+    return "general"
+
+
+class PriorityUpdateQueue:
+    """طوابير منفصلة لكل مسار مع جدولة round-robin موزونة بين العمال"""
+
+    def __init__(self, weights: Dict[str, int] = LANE_WEIGHTS, maxsize: int = UPDATE_QUEUE_MAX):
+        self.weights = dict(weights)
+        self.maxsize = maxsize
+        self._lanes: Dict[str, Deque[Tuple[Update, float]]] = {lane: deque() for lane in weights}
+        self._credits = dict(weights)
+        self._items = asyncio.Semaphore(0)
+
+    def put(self, update: Update, lane: str) -> bool:
+        """إضافة تحديث لمساره؛ False إذا كان المسار ممتلئاً"""
+        queue = self._lanes[lane]
+        if len(queue) >= self.maxsize:
+            queue_rejected.inc(lane=lane)
+            return False
+
+        queue.append((update, time.perf_counter()))
+        self._items.release()
+        return True
+
+    def _next_lane(self) -> str:
+        for _ in range(2):
+            for lane, queue in self._lanes.items():
+                if queue and self._credits[lane] > 0:
+                    self._credits[lane] -= 1
+                    return lane
+            # انتهت الدورة: إعادة الأرصدة حسب الأوزان
+            self._credits = dict(self.weights)
+        raise RuntimeError("Update queue is empty")
+
+    async def get(self) -> Tuple[Update, str]:
+        await self._items.acquire()
+        lane = self._next_lane()
+        update, enqueued_at = self._lanes[lane].popleft()
+        queue_wait.observe(time.perf_counter() - enqueued_at, lane=lane)
+        return update, lane
+
+    def depth(self) -> Dict[str, int]:
+        return {lane: len(queue) for lane, queue in self._lanes.items()}
+
+    def drain(self) -> List[Update]:
+        """سحب كل ما تبقى في المسارات بترتيب الأولوية (عند الإيقاف بعد توقف العمال)"""
+        updates = []
+        for queue in self._lanes.values():
+            updates.extend(update for update, _ in queue)
+            queue.clear()
+        self._items = asyncio.Semaphore(0)
+        return updates
+
+
+class UpdateScheduler:
+    """استقبال التحديثات في المسارات وتغذية الـ dispatcher من عدة عمال"""
+
+    def __init__(self, workers: int = UPDATE_WORKERS):
+        self.workers = workers
+        self.queue = PriorityUpdateQueue()
+        self._tasks: List[asyncio.Task] = []
+        self._dp: Optional[Dispatcher] = None
+        self._bot: Optional[Bot] = None
+        self._in_flight: Dict[int, Update] = {}
+        self._interrupted: List[Update] = []
+        self._closing = False
+
+    def submit(self, update: Update) -> bool:
+        if self._closing:
+            # أثناء الإيقاف: 503 فيعيد Telegram الإرسال إلى عامل آخر أو بعد إعادة التشغيل
+            return False
+        return self.queue.put(update, classify_update(update))
+
+    async def _worker(self):
+        while True:
+            update, lane = await self.queue.get()
+            self._in_flight[update.update_id] = update
+            try:
+                await self._dp.feed_update(self._bot, update)
+            except asyncio.CancelledError:
+                # أُلغي أثناء المعالجة عند الإيقاف: يُحفظ مع الباقي (وبت إزالة التكرار أُلغي في الـ middleware)
+                self._interrupted.append(update)
+                raise
+            except Exception as e:
+                logger.error(f"❌ Update {update.update_id} ({lane}) failed: {e}")
+            finally:
+                self._in_flight.pop(update.update_id, None)
+
+    def start(self, dp: Dispatcher, bot: Bot):
+        if self._tasks:
+            return
+        self._dp = dp
+        self._bot = bot
+        self._closing = False
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"update-worker:{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"✅ Update scheduler started ({self.workers} workers)")
+
+    async def stop(self, drain_timeout: float = UPDATE_DRAIN_TIMEOUT):
+        """إيقاف الاستقبال وانتظار تفريغ الطوابير والمعالجة الجارية، ثم حفظ ما تبقى في Redis"""
+        self._closing = True
+        deadline = time.monotonic() + drain_timeout
+        while (any(self.queue.depth().values()) or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        leftover = self._interrupted + self.queue.drain()
+        self._interrupted = []
+        if leftover:
+            await self._persist(leftover)
+
+    async def _persist(self, updates: List[Update]):
+        """حفظ التحديثات غير المعالجة لإعادتها عند التشغيل التالي"""
+        try:
+            await cache.redis.rpush(
+                PENDING_KEY,
+                *(update.model_dump_json(exclude_none=True) for update in updates)
+            )
+        except Exception as e:
+            queue_carried.inc(len(updates), result="lost")
+            logger.error(f"❌ {len(updates)} unprocessed updates lost at shutdown: {e}")
+            return
+
+        queue_carried.inc(len(updates), result="persisted")
+        logger.warning(f"⚠️ {len(updates)} unprocessed updates saved for replay")
+
+    async def restore(self) -> int:
+        """إعادة التحديثات المحفوظة عند الإيقاف السابق إلى المسارات (عامل واحد يأخذها ذرياً)"""
+        try:
+            async with cache.redis.pipeline(transaction=True) as pipe:
+                pipe.lrange(PENDING_KEY, 0, -1)
+                pipe.delete(PENDING_KEY)
+                raw_updates, _ = await pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Could not load saved updates: {e}")
+            return 0
+
+        restored = 0
+        for raw in raw_updates:
+            update = Update.model_validate_json(raw, context={"bot": self._bot})
+            if self.submit(update):
+                restored += 1
+            else:
+                logger.error(f"❌ Saved update {update.update_id} dropped: lane full")
+
+        if restored:
+            queue_carried.inc(restored, result="restored")
+            logger.info(f"✅ Replaying {restored} updates saved at last shutdown")
+        return restored
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "weights": self.queue.weights,
+            "depth": self.queue.depth(),
+            "wait": {lane: queue_wait.stats(lane=lane) for lane in self.queue.weights}
+        }
+
+
+# Global instance
+update_scheduler = UpdateScheduler()
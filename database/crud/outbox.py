@@ -0,0 +1,68 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.engine import Row
+from typing import List, Dict, Any
+from database.models import OutboxEvent
+import datetime
+import json
+
+class OutboxCRUD:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def add(self, event_type: str, payload: Dict[str, Any], idempotency_key: str) -> OutboxEvent:
+        """إضافة حدث للمعاملة الحالية (بدون commit، يُحفظ مع التغيير نفسه)"""
+        event = OutboxEvent(
+            event_type=event_type,
+            payload=json.dumps(payload, ensure_ascii=False),
+            idempotency_key=idempotency_key,
+            available_at=datetime.datetime.now()
+        )
+        self.db.add(event)
+        return event
+
+    async def claim_batch(self, limit: int, lease: float) -> List[Row]:
+        """حجز دفعة مستحقة (بدون commit): زيادة المحاولات وتأجيل available_at بمدة الحجز
+
+        SKIP LOCKED يمنع تنافس العمال داخل المعاملة القصيرة، والحجز يبقي الحدث خارج
+        الدفعات التالية بعد الـ commit وأثناء الإرسال.
+        """
+        now = datetime.datetime.now()
+        due = select(OutboxEvent.id).where(
+            OutboxEvent.status == "pending",
+            OutboxEvent.available_at <= now
+        ).order_by(OutboxEvent.id).limit(limit).with_for_update(skip_locked=True)
+
+        stmt = (
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(due.scalar_subquery()))
+            .values(attempts=OutboxEvent.attempts + 1, available_at=now + datetime.timedelta(seconds=lease))
+            .returning(
+                OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload,
+                OutboxEvent.idempotency_key, OutboxEvent.attempts
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        result = await self.db.execute(stmt)
+        return sorted(result.all(), key=lambda row: row.id)
+
+    async def _set(self, event_id: int, **values):
+        stmt = update(OutboxEvent).where(OutboxEvent.id == event_id).values(**values)
+        await self.db.execute(stmt.execution_options(synchronize_session=False))
+
+    async def mark_sent(self, event: Row):
+        """تعليم الحدث كمُرسل"""
+        await self._set(event.id, status="sent", sent_at=datetime.datetime.now(), last_error=None)
+
+    async def mark_retry(self, event: Row, error: str, delay: float, max_attempts: int):
+        """جدولة إعادة المحاولة أو الفشل النهائي بعد استنفاد المحاولات (المحاولة حُسبت عند الحجز)"""
+        if event.attempts >= max_attempts:
+            await self._set(event.id, status="failed", last_error=error)
+        else:
+            available_at = datetime.datetime.now() + datetime.timedelta(seconds=delay)
+            await self._set(event.id, available_at=available_at, last_error=error)
+
+    async def mark_failed(self, event: Row, error: str):
+        """فشل نهائي بدون إعادة محاولة"""
+        await self._set(event.id, status="failed", last_error=error)
@@ -0,0 +1,23 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from typing import List, Set, Tuple
+from database.models import ProcessedSMS
+
+class ProcessedSMSCRUD:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def record(self, items: List[Tuple[str, str]]) -> Set[str]:
+        """تسجيل (رقم العملية، بصمة المحتوى) بأمر واحد (بدون commit)؛ يعيد الأرقام الجديدة فقط"""
+        if not items:
+            return set()
+
+        stmt = (
+            insert(ProcessedSMS)
+            .values([{"transaction_id": txid, "content_hash": digest} for txid, digest in dict(items).items()])
+            .on_conflict_do_nothing(index_elements=[ProcessedSMS.transaction_id])
+            .returning(ProcessedSMS.transaction_id)
+        )
+
+        result = await self.db.execute(stmt)
+        return set(result.scalars().all())
@@ -0,0 +1,60 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from typing import Optional, Dict
+from database.models import ScheduledJob
+import datetime
+
+class ScheduledJobCRUD:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all(self) -> Dict[str, ScheduledJob]:
+        """جلب حالة جميع المهام المجدولة"""
+        stmt = select(ScheduledJob)
+        result = await self.db.execute(stmt)
+        return {job.name: job for job in result.scalars().all()}
+
+    async def register(self, name: str, schedule: str, next_run_at: datetime.datetime) -> ScheduledJob:
+        """تسجيل مهمة جديدة أو تحديث جدولها"""
+        stmt = select(ScheduledJob).where(ScheduledJob.name == name)
+        result = await self.db.execute(stmt)
+        job = result.scalar_one_or_none()
+
+        if job is None:
+            job = ScheduledJob(name=name, schedule=schedule, next_run_at=next_run_at)
+            self.db.add(job)
+        elif job.schedule != schedule:
+            # تغير الجدول، نعيد حساب التشغيل القادم
+            job.schedule = schedule
+            job.next_run_at = next_run_at
+
+        await self.db.commit()
+        return job
+
+    async def record_run(
+        self,
+        name: str,
+        started_at: datetime.datetime,
+        next_run_at: Optional[datetime.datetime],
+        status: str,
+        duration: float,
+        error: Optional[str] = None
+    ) -> bool:
+        """تسجيل نتيجة تشغيل المهمة والموعد القادم"""
+        values = {
+            "last_run_at": started_at,
+            "next_run_at": next_run_at,
+            "last_status": status,
+            "last_duration": duration,
+            "last_error": error,
+            "run_count": ScheduledJob.run_count + 1
+        }
+
+        if status != "success":
+            values["failure_count"] = ScheduledJob.failure_count + 1
+
+        stmt = update(ScheduledJob).where(ScheduledJob.name == name).values(**values)
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+
+        return result.rowcount > 0
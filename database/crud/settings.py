@@ -0,0 +1,44 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional, Dict
+from database.models import Setting
+from core.redis_cache import cache
+
+class SettingCRUD:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all(self) -> Dict[str, str]:
+        """جميع الإعدادات العامة بالكاش"""
+        cache_key = "settings:all"
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        stmt = select(Setting.key, Setting.value)
+        result = await self.db.execute(stmt)
+        settings = {row.key: row.value for row in result.all()}
+
+        await cache.set(cache_key, settings, ttl=600)
+        return settings
+
+    async def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """قيمة إعداد واحد"""
+        settings = await self.get_all()
+        return settings.get(key, default)
+
+    async def set(self, key: str, value: str) -> Setting:
+        """حفظ إعداد وتنظيف الكاش"""
+        setting = await self.db.get(Setting, key)
+
+        if setting is None:
+            setting = Setting(key=key, value=value)
+            self.db.add(setting)
+        else:
+            setting.value = value
+
+        await self.db.commit()
+
+        await cache.delete("settings:all")
+
+        return setting
@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, func, and_, or_, text
-from typing import Optional, List, Tuple, Dict
+from typing import Optional, List, Tuple, Dict, Any
 from database.models import SyriatelCode, Transaction
 from core.redis_cache import cache
 import datetime
@@ -9,15 +9,51 @@ class SyriatelCodeCRUD:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def get_available_code(self, amount: int) -> Optional[SyriatelCode]:
-        """الحصول على كود متاح يتسع للمبلغ"""
-        cache_key = f"syriatel_available:{amount}"
+    async def get_active_codes(self) -> List[Dict[str, int]]:
+        """الأكواد النشطة مع امتلائها (كاش ساخن يُسخّن عند بدء التشغيل)"""
+        cache_key = "syriatel_active_codes"
         cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        stmt = select(
+            SyriatelCode.id, SyriatelCode.current_amount, SyriatelCode.max_amount
+        ).where(
+            SyriatelCode.is_active == True
+        ).order_by(SyriatelCode.current_amount.asc())
         
-        if cached:
-            stmt = select(SyriatelCode).where(SyriatelCode.id == cached["id"])
+        result = await self.db.execute(stmt)
+        codes = [
+            {"id": row.id, "current_amount": row.current_amount, "max_amount": row.max_amount}
+            for row in result.all()
+        ]
+        
+        await cache.set(cache_key, codes, ttl=60)
+        return codes
+    
+    async def get_available_code(self, amount: int) -> Optional[SyriatelCode]:
+        """الحصول على كود متاح يتسع للمبلغ"""
+        # الاختيار من الكاش (الأقل امتلاءً أولاً) ثم التحقق من قاعدة البيانات
+        for candidate in await self.get_active_codes():
+            if candidate["current_amount"] + amount > candidate["max_amount"]:
+                continue
+            
+            stmt = select(SyriatelCode).where(
+                and_(
+                    SyriatelCode.id == candidate["id"],
+                    SyriatelCode.is_active == True,
+                    SyriatelCode.current_amount + amount <= SyriatelCode.max_amount
+                )
+            )
             result = await self.db.execute(stmt)
-            return result.scalar_one_or_none()
+            code = result.scalar_one_or_none()
+            
+            if code:
+                return code
+            
+            # الكاش قديم، نتركه لقاعدة البيانات
+            await cache.delete("syriatel_active_codes")
+            break
         
         # البحث عن كود يتسع للمبلغ
         stmt = select(SyriatelCode).where(
@@ -30,14 +66,9 @@ class SyriatelCodeCRUD:
         ).limit(1)
         
         result = await self.db.execute(stmt)
-        code = result.scalar_one_or_none()
-        
-        if code:
-            await cache.set(cache_key, {"id": code.id}, ttl=60)
-        
-        return code
+        return result.scalar_one_or_none()
     
-    async def update_code_amount(self, code_id: int, amount: int) -> Tuple[int, int]:
+    async def update_code_amount(self, code_id: int, amount: int, commit: bool = True) -> Tuple[int, int]:
         """تحديث المبلغ في الكود"""
         stmt = select(SyriatelCode).where(SyriatelCode.id == code_id)
         result = await self.db.execute(stmt)
@@ -57,10 +88,11 @@ class SyriatelCodeCRUD:
         )
         
         await self.db.execute(update_stmt)
-        await self.db.commit()
+        if commit:
+            await self.db.commit()
         
         # تنظيف الكاش
-        await cache.delete("syriatel_available:*")
+        await cache.delete("syriatel_active_codes")
         
         return old_amount, new_amount
     
@@ -74,7 +106,7 @@ class SyriatelCodeCRUD:
         await self.db.commit()
         
         # تنظيف الكاش
-        await cache.delete("syriatel_available:*")
+        await cache.delete("syriatel_active_codes")
     
     async def add_code(self, code: str, max_amount: int = 5400) -> SyriatelCode:
         """إضافة كود جديد"""
@@ -90,8 +122,32 @@ class SyriatelCodeCRUD:
         await self.db.commit()
         await self.db.refresh(syriatel_code)
         
+        await cache.delete("syriatel_active_codes")
+        
         return syriatel_code
     
+    async def update_code(self, code_id: int, **values) -> bool:
+        """تحديث حقول كود واحد؛ False إذا لم يوجد"""
+        stmt = update(SyriatelCode).where(SyriatelCode.id == code_id).values(**values)
+        
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        
+        await cache.delete("syriatel_active_codes")
+        
+        return result.rowcount > 0
+    
+    async def delete_code(self, code_id: int) -> bool:
+        """حذف كود؛ False إذا لم يوجد"""
+        stmt = delete(SyriatelCode).where(SyriatelCode.id == code_id)
+        
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        
+        await cache.delete("syriatel_active_codes")
+        
+        return result.rowcount > 0
+    
     async def get_code_stats(self) -> Dict[str, Any]:
         """إحصائيات الأكواد"""
         # إجمالي الأكواد
@@ -1,11 +1,35 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, insert, update, delete, func, and_, or_
+from sqlalchemy import select, insert, update, delete, func, and_, or_, any_, bindparam, cast, literal_column, String, Integer, Text, ARRAY
 from sqlalchemy.orm import joinedload
 from typing import Optional, List, Dict, Any
 from database.models import Transaction, MonthlyCounter, User
 from core.redis_cache import cache
+from core.tx_events import TX_EVENTS_CHANNEL
+from core.approval_sla import observe_transitions
 import datetime
 
+# أعمدة حدث تغيير الحالة (تُعاد من UPDATE ... RETURNING)
+EVENT_COLUMNS = (
+    Transaction.id, Transaction.user_id, Transaction.type, Transaction.status,
+    Transaction.amount, Transaction.payment_method, Transaction.transaction_id, Transaction.verified_auto,
+    Transaction.created_at, Transaction.approved_at, Transaction.completed_at
+)
+
+# عمود وقت الانتقال لكل حالة
+STATUS_TIMESTAMPS = {
+    "approved": "approved_at",
+    "completed": "completed_at",
+    "rejected": "rejected_at"
+}
+
+def status_notification(changed):
+    """pg_notify لكل صف تغير؛ Postgres يرسله للمستمعين عند الـ commit فقط"""
+    # مفاتيح JSON كثوابت SQL: json_build_object لا يستنتج نوع المعاملات المربوطة
+    payload = func.json_build_object(
+        *(item for column in EVENT_COLUMNS for item in (literal_column(f"'{column.key}'"), changed.c[column.key]))
+    )
+    return func.pg_notify(TX_EVENTS_CHANNEL, cast(payload, Text)).label("notified")
+
 class TransactionCRUD:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -18,9 +42,10 @@ class TransactionCRUD:
         payment_method: str,
         transaction_id: str,
         account_number: str = "",
-        notes: str = ""
+        notes: str = "",
+        commit: bool = True
     ) -> Dict[str, Any]:
-        """إنشاء معاملة جديدة مع عداد شهري"""
+        """إنشاء معاملة جديدة مع عداد شهري (commit=False لإكمال المعاملة لاحقاً مع تغييرات أخرى)"""
         now = datetime.datetime.now()
         month = now.month
         year = now.year
@@ -60,8 +85,11 @@ class TransactionCRUD:
         )
         
         self.db.add(transaction)
-        await self.db.commit()
-        await self.db.refresh(transaction)
+        if commit:
+            await self.db.commit()
+            await self.db.refresh(transaction)
+        else:
+            await self.db.flush()
         
         return {
             "id": transaction.id,
@@ -84,17 +112,98 @@ class TransactionCRUD:
         verified_auto: bool = False,
         notes: str = ""
     ) -> bool:
-        """تحديث حالة المعاملة"""
-        stmt = update(Transaction).where(Transaction.id == transaction_id).values(
-            status=status,
-            verified_auto=verified_auto,
-            notes=notes
+        """تحديث حالة المعاملة (مع حدث NOTIFY يُرسل عند الـ commit ووقت الانتقال)"""
+        values = {"status": status, "verified_auto": verified_auto, "notes": notes}
+        if status in STATUS_TIMESTAMPS:
+            values[STATUS_TIMESTAMPS[status]] = datetime.datetime.now()
+        
+        changed = (
+            update(Transaction)
+            .where(Transaction.id == transaction_id)
+            .values(**values)
+            .returning(*EVENT_COLUMNS)
+            .cte("changed")
         )
-        result = await self.db.execute(stmt)
+        result = await self.db.execute(
+            select(*(changed.c[column.key] for column in EVENT_COLUMNS), status_notification(changed))
+        )
+        updated = result.all()
         await self.db.commit()
         
-        return result.rowcount > 0
+        observe_transitions(updated)
+        return len(updated) > 0
     
+    async def get_pending_charges_by_txids(self, txids: List[str]) -> Dict[str, Any]:
+        """طلبات الشحن المعلقة لعدة أرقام عمليات باستعلام واحد (الأحدث لكل رقم)"""
+        if not txids:
+            return {}
+        
+        stmt = (
+            select(Transaction.id, Transaction.transaction_id, Transaction.user_id, Transaction.amount)
+            .where(
+                Transaction.transaction_id == any_(bindparam("txids", list(set(txids)), type_=ARRAY(String))),
+                Transaction.type == "charge",
+                Transaction.status == "pending"
+            )
+            .order_by(Transaction.created_at.asc())
+        )
+        
+        result = await self.db.execute(stmt)
+        return {row.transaction_id: row for row in result.all()}
+    
+    async def approve_and_credit_charges(self, ids: List[int], notes: str = "") -> List[Any]:
+        """الموافقة على طلبات شحن معلقة وإضافة مبالغها للأرصدة بأمر SQL واحد (بدون commit)"""
+        if not ids:
+            return []
+        
+        # قلب الحالة بشرط أنها ما زالت معلقة؛ ما عولج سابقاً لا يُعاد ولا يُضاف رصيده
+        approved = (
+            update(Transaction)
+            .where(
+                Transaction.id == any_(bindparam("ids", list(set(ids)), type_=ARRAY(Integer))),
+                Transaction.type == "charge",
+                Transaction.status == "pending"
+            )
+            .values(status="approved", verified_auto=True, notes=notes, approved_at=datetime.datetime.now())
+            .returning(*EVENT_COLUMNS)
+            .cte("approved")
+        )
+        
+        # مجموع لكل مستخدم: UPDATE ... FROM لا يطبق إلا صفاً واحداً لكل مستخدم
+        credits = (
+            select(approved.c.user_id, func.sum(approved.c.amount).label("amount"))
+            .group_by(approved.c.user_id)
+            .subquery("credits")
+        )
+        
+        credited = (
+            update(User)
+            .where(User.user_id == credits.c.user_id)
+            .values(balance=User.balance + credits.c.amount)
+            .returning(User.user_id, User.balance)
+            .cte("credited")
+        )
+        
+        # الصفوف التي تغيرت فعلاً مع الرصيد الجديد لصاحبها، وحدث NOTIFY لكل منها
+        stmt = select(
+            *(approved.c[column.key] for column in EVENT_COLUMNS), credited.c.balance,
+            status_notification(approved)
+        ).join(credited, credited.c.user_id == approved.c.user_id)
+        
+        result = await self.db.execute(stmt)
+        return result.all()
+    
+    async def is_charge_txid_approved(self, transaction_id: str) -> bool:
+        """هل استُخدم رقم العملية في شحن تمت الموافقة عليه سابقاً"""
+        stmt = select(Transaction.id).where(
+            Transaction.transaction_id == transaction_id,
+            Transaction.type == "charge",
+            Transaction.status == "approved"
+        ).limit(1)
+
+        result = await self.db.execute(stmt)
+        return result.first() is not None
+
     async def get_pending_transactions(
         self,
         type_: Optional[str] = None,
@@ -196,4 +305,29 @@ class TransactionCRUD:
             "charge": charge_stats,
             "withdraw": withdraw_stats,
             "counts": count_stats
-        }
\ No newline at end of file
+        }
+    
+    async def get_approval_sla(self, days: int = 7) -> List[Dict[str, Any]]:
+        """الوسيط والـ p90 لزمن الموافقة والإكمال لكل نوع وطريقة دفع (آخر days يوماً)"""
+        since = datetime.datetime.now() - datetime.timedelta(days=days)
+        approval = func.extract("epoch", Transaction.approved_at - Transaction.created_at)
+        completion = func.extract("epoch", Transaction.completed_at - Transaction.approved_at)
+        
+        stmt = select(
+            Transaction.type,
+            Transaction.payment_method,
+            Transaction.verified_auto,
+            func.count(Transaction.approved_at).label("approved"),
+            func.percentile_cont(0.5).within_group(approval).label("approval_p50"),
+            func.percentile_cont(0.9).within_group(approval).label("approval_p90"),
+            func.count(Transaction.completed_at).label("completed"),
+            func.percentile_cont(0.5).within_group(completion).label("completion_p50"),
+            func.percentile_cont(0.9).within_group(completion).label("completion_p90")
+        ).where(
+            Transaction.approved_at >= since
+        ).group_by(
+            Transaction.type, Transaction.payment_method, Transaction.verified_auto
+        ).order_by(Transaction.type, Transaction.payment_method)
+        
+        result = await self.db.execute(stmt)
+        return [row._asdict() for row in result.all()]
\ No newline at end of file
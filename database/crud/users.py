@@ -3,6 +3,7 @@ from sqlalchemy import select, update, delete, func
 from sqlalchemy.orm import joinedload
 from typing import Optional, List, Tuple
 from database.models import User, Transaction, IchancyAccount, Referral
+from database.snapshots import UserSnapshot
 from core.redis_cache import cache
 import datetime
 
@@ -10,27 +11,52 @@ class UserCRUD:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def get_user(self, user_id: int) -> Optional[User]:
-        """جلب مستخدم بالكاش"""
+    async def get_user(self, user_id: int) -> Optional[UserSnapshot]:
+        """جلب نسخة قراءة فقط من المستخدم بالكاش (للعرض والتحقق)"""
         cache_key = f"user:{user_id}"
         cached = await cache.get(cache_key)
         if cached:
-            return User(**cached)
+            return UserSnapshot.from_cache(cached)
         
         stmt = select(User).where(User.user_id == user_id)
         result = await self.db.execute(stmt)
         user = result.scalar_one_or_none()
         
-        if user:
-            await cache.set(cache_key, {
-                "user_id": user.user_id,
-                "balance": user.balance,
-                "is_banned": user.is_banned,
-                "referrals_count": user.referrals_count,
-                "active_referrals": user.active_referrals
-            }, ttl=600)
+        if user is None:
+            return None
         
-        return user
+        snapshot = UserSnapshot.from_model(user)
+        await cache.set(cache_key, snapshot.to_cache(), ttl=600)
+        
+        return snapshot
+    
+    async def get_user_for_update(self, user_id: int) -> Optional[User]:
+        """جلب كائن ORM من قاعدة البيانات مع قفل الصف (للتعديل، بدون كاش)"""
+        stmt = select(User).where(User.user_id == user_id).with_for_update()
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+    
+    async def warm_recent_users(self, days: int = 3, limit: int = 500) -> int:
+        """تسخين كاش المستخدمين النشطين مؤخراً باستعلام واحد"""
+        date_threshold = datetime.datetime.now() - datetime.timedelta(days=days)
+        
+        recent = (
+            select(Transaction.user_id)
+            .where(Transaction.created_at >= date_threshold)
+            .group_by(Transaction.user_id)
+            .order_by(func.max(Transaction.created_at).desc())
+            .limit(limit)
+        )
+        stmt = select(User).where(User.user_id.in_(recent))
+        result = await self.db.execute(stmt)
+        users = result.scalars().all()
+        
+        await cache.set_many(
+            {f"user:{user.user_id}": UserSnapshot.from_model(user).to_cache() for user in users},
+            ttl=600
+        )
+        
+        return len(users)
     
     async def create_user(self, user_id: int) -> User:
         """إنشاء مستخدم جديد"""
@@ -46,7 +72,7 @@ class UserCRUD:
     
     async def update_balance(self, user_id: int, amount: int, operation: str = "add") -> Tuple[int, int]:
         """تحديث رصيد المستخدم"""
-        user = await self.get_user(user_id)
+        user = await self.get_user_for_update(user_id)
         if not user:
             user = await self.create_user(user_id)
         
@@ -68,6 +94,10 @@ class UserCRUD:
         
         return old_balance, new_balance
     
+    async def invalidate_cache(self, user_ids: List[int]):
+        """تنظيف كاش عدة مستخدمين بعد الـ commit"""
+        await cache.delete_many([f"user:{user_id}" for user_id in user_ids])
+    
     async def get_user_with_details(self, user_id: int) -> Optional[User]:
         """جلب مستخدم مع جميع تفاصيله"""
         stmt = (
@@ -77,7 +107,8 @@ class UserCRUD:
             .where(User.user_id == user_id)
         )
         result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
+        # joinedload على مجموعة يكرر صف المستخدم لكل معاملة
+        return result.unique().scalar_one_or_none()
     
     async def get_top_users_by_balance(self, limit: int = 20) -> List[User]:
         """أعلى المستخدمين حسب الرصيد"""
@@ -1,4 +1,4 @@
- from sqlalchemy import Column, Integer, String, BigInteger, Boolean, DateTime, Float, ForeignKey, Text, UniqueConstraint, CheckConstraint
+from sqlalchemy import Column, Integer, String, BigInteger, Boolean, DateTime, Float, ForeignKey, Text, UniqueConstraint, CheckConstraint, Index, PrimaryKeyConstraint, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -18,7 +18,7 @@ class User(Base):
     
     # Relationships
     transactions = relationship("Transaction", back_populates="user")
-    referrals = relationship("Referral", foreign_keys="Referral.referred_by", back_populates="referrer")
+    referrals = relationship("Referral", foreign_keys="Referral.referrer_id", back_populates="referrer")
     ichancy_account = relationship("IchancyAccount", back_populates="user", uselist=False)
 
 class Transaction(Base):
@@ -35,6 +35,10 @@ class Transaction(Base):
     verified_auto = Column(Boolean, default=False)
     notes = Column(Text)
     created_at = Column(DateTime, default=func.now())
+    # أوقات انتقال الحالة (لقياس زمن المعالجة)
+    approved_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    rejected_at = Column(DateTime)
     
     # Relationships
     user = relationship("User", back_populates="transactions")
@@ -42,6 +46,16 @@ class Transaction(Base):
     __table_args__ = (
         Index('idx_transactions_user_status', 'user_id', 'status'),
         Index('idx_transactions_created', 'created_at'),
+        # مطابقة رسائل SMS مع طلبات الشحن المعلقة فقط
+        Index(
+            'idx_transactions_pending_charge_txid', 'transaction_id',
+            postgresql_where=text("type = 'charge' AND status = 'pending'")
+        ),
+        # رقم العملية لا يُستخدم في أكثر من طلب شحن (إلا بعد رفض الطلب)
+        Index(
+            'uq_transactions_charge_txid', 'payment_method', 'transaction_id', unique=True,
+            postgresql_where=text("type = 'charge' AND status <> 'rejected'")
+        ),
     )
 
 class MonthlyCounter(Base):
@@ -136,4 +150,45 @@ class Setting(Base):
     
     key = Column(String(100), primary_key=True)
     value = Column(Text)
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+# جدول المهام المجدولة (آخر تشغيل والتشغيل القادم)
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+    
+    name = Column(String(100), primary_key=True)
+    schedule = Column(String(100), nullable=False)
+    last_run_at = Column(DateTime)
+    next_run_at = Column(DateTime)
+    last_status = Column(String(20))  # success, failed, timeout, skipped
+    last_duration = Column(Float)
+    last_error = Column(Text)
+    run_count = Column(Integer, default=0)
+    failure_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+# صندوق الصادر: آثار جانبية تُكتب في نفس معاملة التغيير وتُرسل لاحقاً
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_type = Column(String(50), nullable=False)  # send_message, edit_message_text
+    payload = Column(Text, nullable=False)  # JSON
+    idempotency_key = Column(String(150), unique=True, nullable=False)
+    status = Column(String(20), default="pending", nullable=False)  # pending, sent, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime, default=func.now(), nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index('idx_outbox_pending', 'available_at', postgresql_where=text("status = 'pending'")),
+    )
+
+class ProcessedSMS(Base):
+    __tablename__ = "processed_sms"
+    
+    transaction_id = Column(String(100), primary_key=True)  # رقم عملية المشغل
+    content_hash = Column(String(32), nullable=False)
+    received_at = Column(DateTime, default=func.now())
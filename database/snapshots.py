@@ -0,0 +1,70 @@
+import datetime
+from typing import Optional, Dict, Any
+
+from database.models import User
+
+
+class UserSnapshot:
+    """نسخة قراءة فقط من المستخدم (بدون ORM): للعرض والتحقق، وليست للتعديل"""
+
+    __slots__ = (
+        "user_id", "balance", "referrals_count", "active_referrals",
+        "total_earned", "is_banned", "created_at"
+    )
+
+    def __init__(
+        self,
+        user_id: int,
+        balance: int = 0,
+        referrals_count: int = 0,
+        active_referrals: int = 0,
+        total_earned: int = 0,
+        is_banned: bool = False,
+        created_at: Optional[datetime.datetime] = None
+    ):
+        self.user_id = user_id
+        self.balance = balance
+        self.referrals_count = referrals_count
+        self.active_referrals = active_referrals
+        self.total_earned = total_earned
+        self.is_banned = is_banned
+        self.created_at = created_at
+
+    @classmethod
+    def from_model(cls, user: User) -> "UserSnapshot":
+        return cls(
+            user.user_id,
+            user.balance or 0,
+            user.referrals_count or 0,
+            user.active_referrals or 0,
+            user.total_earned or 0,
+            bool(user.is_banned),
+            user.created_at
+        )
+
+    @classmethod
+    def from_cache(cls, data: Dict[str, Any]) -> "UserSnapshot":
+        created_at = data.get("created_at")
+        return cls(
+            data["user_id"],
+            data.get("balance", 0),
+            data.get("referrals_count", 0),
+            data.get("active_referrals", 0),
+            data.get("total_earned", 0),
+            data.get("is_banned", False),
+            datetime.datetime.fromisoformat(created_at) if created_at else None
+        )
+
+    def to_cache(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "balance": self.balance,
+            "referrals_count": self.referrals_count,
+            "active_referrals": self.active_referrals,
+            "total_earned": self.total_earned,
+            "is_banned": self.is_banned,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self) -> str:
+        return f"UserSnapshot(user_id={self.user_id}, balance={self.balance})"
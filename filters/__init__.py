@@ -0,0 +1,5 @@
+from .admin import IsAdmin
+
+__all__ = [
+    'IsAdmin'
+]
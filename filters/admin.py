@@ -0,0 +1,11 @@
+from aiogram.filters import BaseFilter
+from aiogram.types import TelegramObject, User
+
+from config import ADMIN_ID
+
+
+class IsAdmin(BaseFilter):
+    """فلتر الأدمن: يُستخدم على مستوى الـ router فيتم تخطي الـ router كاملاً لغير الأدمن"""
+
+    async def __call__(self, event: TelegramObject, event_from_user: User = None) -> bool:
+        return event_from_user is not None and event_from_user.id == ADMIN_ID
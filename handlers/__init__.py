@@ -1,4 +1,4 @@
- from .start import router as start_router
+from .start import router as start_router
 from .charge.main import router as charge_router
 from .charge.syriatel import router as syriatel_router
 from .withdraw.main import router as withdraw_router
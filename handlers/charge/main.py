@@ -1,7 +1,8 @@
- from aiogram import Router, F
+from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import re
@@ -9,9 +10,15 @@ import re
 from keyboards.main import payment_methods_keyboard, back_button, cancel_button, numeric_keyboard
 from core.redis_cache import set_user_state, get_user_state, delete_user_state
 from core.bot import logger
+from core.callbacks import callbacks
+from core.outbox import outbox, markup_payload
+from core.unmatched_sms import unmatched_sms
+from core.charge_txids import charge_txids
 from database.crud.transactions import TransactionCRUD
 from database.crud.syriatel_codes import SyriatelCodeCRUD
 from database.crud.users import UserCRUD
+from database.crud.outbox import OutboxCRUD
+from utils.sms_parser import SMSParser
 from config import MIN_DEPOSIT, MAX_DEPOSIT, SYRIATEL_CODE_LIMIT
 
 router = Router()
@@ -23,7 +30,7 @@ class ChargeStates(StatesGroup):
     enter_transaction_id = State()
     confirm = State()
 
-@router.callback_query(F.data == "charge_main")
+@callbacks.exact("charge_main")
 async def charge_main_menu(callback: CallbackQuery, state: FSMContext):
     """القائمة الرئيسية للشحن"""
     user_id = callback.from_user.id
@@ -48,7 +55,7 @@ async def charge_main_menu(callback: CallbackQuery, state: FSMContext):
     
     await callback.answer()
 
-@router.callback_query(F.data.in_(["pay_syr", "pay_sch", "pay_sch_usd"]))
+@callbacks.exact("pay_syr", "pay_sch", "pay_sch_usd")
 async def choose_payment_method(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """اختيار طريقة الدفع"""
     user_id = callback.from_user.id
@@ -159,7 +166,7 @@ async def enter_amount(message: Message, state: FSMContext, session: AsyncSessio
             
             # إشعار للإدمن
             from core.bot import bot_manager
-            bot = await bot_manager.bot
+            bot = bot_manager.bot
             from config import CHANNEL_ADMIN_LOGS
             
             await bot.send_message(
@@ -216,6 +223,16 @@ async def enter_transaction_id(message: Message, state: FSMContext, session: Asy
         )
         return
     
+    # رقم مستخدم في طلب سابق: يُرفض هنا قبل أن يصل لقائمة الإدمن
+    if await charge_txids.is_used(user_state.get("payment_method", "غير معروف"), transaction_id):
+        await message.answer(
+            "❌ <b>رقم العملية مستخدم مسبقاً!</b>\n"
+            "هذا الرقم مرتبط بطلب شحن سابق.\n"
+            "⬇️ أدخل رقم عملية آخر:",
+            parse_mode="HTML"
+        )
+        return
+    
     # حفظ رقم العملية
     user_state["transaction_id"] = transaction_id
     user_state["step"] = "confirm"
@@ -252,7 +269,7 @@ async def enter_transaction_id(message: Message, state: FSMContext, session: Asy
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data == "confirm_charge")
+@callbacks.exact("confirm_charge", long_running="⏳ جاري إرسال الطلب...", priority="payment")
 async def confirm_charge_request(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """تأكيد طلب الشحن"""
     user_id = callback.from_user.id
@@ -268,18 +285,27 @@ async def confirm_charge_request(callback: CallbackQuery, state: FSMContext, ses
     method = user_state.get("payment_method", "غير معروف")
     transaction_id = user_state.get("transaction_id", "")
     method_key = user_state.get("method_key", "")
+    sms = None
     
     try:
-        # إنشاء المعاملة في قاعدة البيانات
+        # إنشاء المعاملة وتحديث الكود ورسائل الصادر في معاملة واحدة
         tx_crud = TransactionCRUD(session)
         
+        # رسالة سيرياتيل لنفس رقم العملية والمبلغ وصلت قبل الطلب؟
+        if method_key == "pay_syr":
+            sms = await unmatched_sms.claim(transaction_id, amount)
+            if sms is not None and await tx_crud.is_charge_txid_approved(transaction_id):
+                logger.warning(f"⚠️ SMS {transaction_id} already credited, sending charge to manual review")
+                sms = None
+        
         tx_result = await tx_crud.create_transaction(
             user_id=user_id,
             type_="charge",
             amount=amount,
             payment_method=method,
             transaction_id=transaction_id,
-            notes=f"طلب شحن عبر {method}"
+            notes=f"طلب شحن عبر {method}",
+            commit=False
         )
         
         # إذا كان سيرياتيل كاش، تحديث الكود
@@ -287,29 +313,45 @@ async def confirm_charge_request(callback: CallbackQuery, state: FSMContext, ses
             syriatel_crud = SyriatelCodeCRUD(session)
             await syriatel_crud.update_code_amount(
                 user_state["syriatel_code_id"],
-                amount
+                amount,
+                commit=False
             )
         
-        # إرسال طلب الموافقة للقناة المناسبة
-        from core.bot import bot_manager
-        from config import CHANNEL_SYR_CASH, CHANNEL_SCH_CASH
-        from keyboards.main import admin_transaction_buttons
-        
-        bot = await bot_manager.bot
+        if sms is not None:
+            # الرسالة وصلت قبل الطلب: موافقة فورية بدون مراجعة الإدمن
+            OutboxCRUD(session).add(
+                "edit_message_text",
+                {
+                    "chat_id": callback.message.chat.id,
+                    "message_id": callback.message.message_id,
+                    "text": (
+                        f"✅ <b>تم التحقق من تحويلك تلقائياً!</b>\n\n"
+                        f"💰 <b>المبلغ:</b> {amount:,} ليرة\n"
+                        f"🔑 <b>رقم العملية:</b> {transaction_id}\n"
+                        f"📋 <b>رقم الطلب:</b> #{tx_result['order_number']}"
+                    )
+                },
+                idempotency_key=f"charge:{tx_result['id']}:user"
+            )
+            await SMSParser(session).auto_approve_batch([(sms, tx_result["id"])])
+        else:
+            # طلب الموافقة للقناة المناسبة
+            from config import CHANNEL_SYR_CASH, CHANNEL_SCH_CASH
+            from keyboards.main import admin_transaction_buttons
         
-        # تحديد القناة
-        if method_key == "pay_syr":
-            channel_id = CHANNEL_SYR_CASH
-        elif method_key == "pay_sch":
-            channel_id = CHANNEL_SCH_CASH
-        else:  # pay_sch_usd
-            channel_id = CHANNEL_SCH_CASH  # يمكن إنشاء قناة منفصلة
+            # تحديد القناة
+            if method_key == "pay_syr":
+                channel_id = CHANNEL_SYR_CASH
+            elif method_key == "pay_sch":
+                channel_id = CHANNEL_SCH_CASH
+            else:  # pay_sch_usd
+                channel_id = CHANNEL_SCH_CASH  # يمكن إنشاء قناة منفصلة
         
-        # نص الرسالة للقناة
-        order_number = tx_result["order_number"]
-        order_time = tx_result["datetime"]
+            # نص الرسالة للقناة
+            order_number = tx_result["order_number"]
+            order_time = tx_result["datetime"]
         
-        channel_msg = f"""
+            channel_msg = f"""
 🔔 <b>طلب شحن جديد!</b>
 
 📋 <b>رقم الطلب الشهري:</b> #{order_number}
@@ -322,35 +364,77 @@ async def confirm_charge_request(callback: CallbackQuery, state: FSMContext, ses
 {'🆔 <b>كود سيرياتيل:</b> ' + user_state.get('syriatel_code', '') if method_key == 'pay_syr' else ''}
 """
         
-        # إرسال للقناة
-        await bot.send_message(
-            channel_id,
-            channel_msg.strip(),
-            reply_markup=admin_transaction_buttons(tx_result["id"]),
-            parse_mode="HTML"
-        )
+            # الرسائل تُرسل بعد الـ commit عبر صندوق الصادر
+            outbox_crud = OutboxCRUD(session)
         
-        # إرسال تأكيد للمستخدم
-        await callback.message.edit_text(
-            f"✅ <b>تم إرسال طلب الشحن بنجاح!</b>\n\n"
-            f"💰 <b>المبلغ:</b> {amount:,} ليرة\n"
-            f"💳 <b>الطريقة:</b> {method}\n"
-            f"🔑 <b>رقم العملية:</b> {transaction_id}\n"
-            f"📋 <b>رقم الطلب:</b> #{order_number}\n\n"
-            f"⏳ <b>سيتم مراجعة طلبك قريبًا من قبل الإدمن</b>\n"
-            f"📬 <b>ستصلك إشعار عند الموافقة</b>",
-            parse_mode="HTML"
-        )
+            outbox_crud.add(
+                "send_message",
+                {
+                    "chat_id": channel_id,
+                    "text": channel_msg.strip(),
+                    "reply_markup": markup_payload(admin_transaction_buttons(tx_result["id"]))
+                },
+                idempotency_key=f"charge:{tx_result['id']}:channel"
+            )
+        
+            # تأكيد للمستخدم
+            outbox_crud.add(
+                "edit_message_text",
+                {
+                    "chat_id": callback.message.chat.id,
+                    "message_id": callback.message.message_id,
+                    "text": (
+                        f"✅ <b>تم إرسال طلب الشحن بنجاح!</b>\n\n"
+                        f"💰 <b>المبلغ:</b> {amount:,} ليرة\n"
+                        f"💳 <b>الطريقة:</b> {method}\n"
+                        f"🔑 <b>رقم العملية:</b> {transaction_id}\n"
+                        f"📋 <b>رقم الطلب:</b> #{order_number}\n\n"
+                        f"⏳ <b>سيتم مراجعة طلبك قريبًا من قبل الإدمن</b>\n"
+                        f"📬 <b>ستصلك إشعار عند الموافقة</b>"
+                    )
+                },
+                idempotency_key=f"charge:{tx_result['id']}:user"
+            )
+        
+            await session.commit()
+            outbox.notify()
+        
+        await charge_txids.add(method, transaction_id)
         
         # مسح الحالة
         await state.clear()
         await delete_user_state(user_id)
         
-        logger.info(f"Charge request created: User {user_id}, Amount {amount}, TX {transaction_id}")
+        logger.info(
+            f"Charge request created: User {user_id}, Amount {amount}, TX {transaction_id}"
+            f"{' (auto-approved from indexed SMS)' if sms else ''}"
+        )
+        
+    except IntegrityError:
+        # الفهرس الفريد: نفس الرقم أُرسل في طلب آخر بين الإدخال والتأكيد
+        await session.rollback()
+        await charge_txids.add(method, transaction_id)
+        
+        if sms is not None:
+            await unmatched_sms.remember([sms])
+        
+        await state.clear()
+        await delete_user_state(user_id)
+        
+        await callback.message.edit_text(
+            "❌ <b>رقم العملية مستخدم مسبقاً!</b>\n\n"
+            "هذا الرقم مرتبط بطلب شحن آخر، لم يتم إنشاء طلب جديد.",
+            parse_mode="HTML"
+        )
         
     except Exception as e:
+        await session.rollback()
         logger.error(f"Error creating charge request: {e}")
         
+        if sms is not None:
+            # إعادة الرسالة للفهرس حتى لا تضيع مع الطلب الفاشل
+            await unmatched_sms.remember([sms])
+        
         await callback.message.edit_text(
             f"❌ <b>حدث خطأ أثناء معالجة طلبك!</b>\n\n"
             f"تفاصيل الخطأ: {str(e)}\n\n"
@@ -1,4 +1,4 @@
- from aiogram import Router, F
+from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -9,6 +9,10 @@ import datetime
 from keyboards.main import back_button, confirmation_buttons
 from core.redis_cache import set_user_state, get_user_state
 from core.bot import logger
+from core.callbacks import callbacks
+from keyboards.callback_data import (
+    pack, CodeRef, CODE_VIEW, CODE_ACTIVATE, CODE_ENABLE, CODE_DISABLE, CODE_REMOVE, CODE_ZERO, CODE_EDIT
+)
 from database.crud.syriatel_codes import SyriatelCodeCRUD
 from database.crud.transactions import TransactionCRUD
 from config import SYRIATEL_CODE_LIMIT, CHANNEL_ADMIN_LOGS
@@ -21,6 +25,7 @@ class SyriatelAdminStates(StatesGroup):
     delete_code = State()
     toggle_code = State()
     view_stats = State()
+    edit_limit = State()
 
 # ==================== أدوات مساعدة ====================
 
@@ -42,7 +47,7 @@ async def get_syriatel_stats(session: AsyncSession) -> Dict[str, Any]:
 
 # ==================== معالجة طلبات الشحن بسيرياتيل ====================
 
-@router.callback_query(F.data == "syriatel_info")
+@callbacks.exact("syriatel_info")
 async def show_syriatel_info(callback: CallbackQuery, session: AsyncSession):
     """عرض معلومات نظام سيرياتيل كاش"""
     stats = await get_syriatel_stats(session)
@@ -79,7 +84,7 @@ async def show_syriatel_info(callback: CallbackQuery, session: AsyncSession):
 
 # ==================== إدارة الأكواد (للأدمن) ====================
 
-@router.callback_query(F.data == "admin_syriatel_codes")
+@callbacks.exact("admin_syriatel_codes", admin=True)
 async def admin_syriatel_menu(callback: CallbackQuery, session: AsyncSession):
     """قائمة إدارة أكواد سيرياتيل للأدمن"""
     from config import ADMIN_ID
@@ -124,7 +129,7 @@ async def admin_syriatel_menu(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer()
 
-@router.callback_query(F.data == "syriatel_add_code")
+@callbacks.exact("syriatel_add_code", admin=True)
 async def add_syriatel_code_start(callback: CallbackQuery, state: FSMContext):
     """بدء إضافة كود سيرياتيل"""
     from config import ADMIN_ID
@@ -193,7 +198,7 @@ async def add_syriatel_code_process(message: Message, state: FSMContext, session
             f"آخر استخدام: {existing.last_used or 'لم يستخدم'}\n\n"
             f"هل تريد تفعيله إذا كان معطلًا؟",
             reply_markup=confirmation_buttons(
-                f"syriatel_activate_{existing.id}",
+                pack(CODE_ACTIVATE, existing.id),
                 "admin_syriatel_codes"
             ),
             parse_mode="HTML"
@@ -216,7 +221,7 @@ async def add_syriatel_code_process(message: Message, state: FSMContext, session
         
         # إشعار في قناة الإدمن
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         await bot.send_message(
             CHANNEL_ADMIN_LOGS,
@@ -237,8 +242,8 @@ async def add_syriatel_code_process(message: Message, state: FSMContext, session
             parse_mode="HTML"
         )
 
-@router.callback_query(F.data.startswith("syriatel_activate_"))
-async def activate_existing_code(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(CODE_ACTIVATE, CodeRef, admin=True, legacy="syriatel_activate_")
+async def activate_existing_code(callback: CallbackQuery, payload: CodeRef, session: AsyncSession):
     """تفعيل كود موجود"""
     from config import ADMIN_ID
     
@@ -246,7 +251,7 @@ async def activate_existing_code(callback: CallbackQuery, session: AsyncSession)
         await callback.answer("⛔ صلاحيات غير كافية", show_alert=True)
         return
     
-    code_id = int(callback.data.split("_")[2])
+    code_id = payload.code_id
     
     from sqlalchemy import update
     from database.models import SyriatelCode
@@ -266,7 +271,7 @@ async def activate_existing_code(callback: CallbackQuery, session: AsyncSession)
     
     await callback.answer()
 
-@router.callback_query(F.data == "syriatel_list_codes")
+@callbacks.exact("syriatel_list_codes", admin=True)
 async def list_all_syriatel_codes(callback: CallbackQuery, session: AsyncSession):
     """عرض جميع أكواد سيرياتيل"""
     from config import ADMIN_ID
@@ -317,7 +322,7 @@ async def list_all_syriatel_codes(callback: CallbackQuery, session: AsyncSession
     for code in codes[:10]:  # أزرار لأول 10 أكواد
         builder.button(
             text=f"{'✅' if code.is_active else '❌'} {code.code[:6]}...",
-            callback_data=f"syriatel_code_{code.id}"
+            callback_data=pack(CODE_VIEW, code.id)
         )
     
     builder.button(text="⬅️ رجوع", callback_data="admin_syriatel_codes")
@@ -331,8 +336,8 @@ async def list_all_syriatel_codes(callback: CallbackQuery, session: AsyncSession
     
     await callback.answer()
 
-@router.callback_query(F.data.startswith("syriatel_code_"))
-async def manage_single_code(callback: CallbackQuery, session: AsyncSession):
+@callbacks.compact(CODE_VIEW, CodeRef, admin=True, legacy="syriatel_code_")
+async def manage_single_code(callback: CallbackQuery, payload: CodeRef, session: AsyncSession):
     """إدارة كود فردي"""
     from config import ADMIN_ID
     
@@ -340,7 +345,7 @@ async def manage_single_code(callback: CallbackQuery, session: AsyncSession):
         await callback.answer("⛔ صلاحيات غير كافية", show_alert=True)
         return
     
-    code_id = int(callback.data.split("_")[2])
+    code_id = payload.code_id
     
     from sqlalchemy import select
     from database.models import SyriatelCode
@@ -378,13 +383,13 @@ async def manage_single_code(callback: CallbackQuery, session: AsyncSession):
     builder = InlineKeyboardBuilder()
     
     if code.is_active:
-        builder.button(text="⏸️ تعطيل الكود", callback_data=f"syriatel_disable_{code.id}")
+        builder.button(text="⏸️ تعطيل الكود", callback_data=pack(CODE_DISABLE, code.id))
     else:
-        builder.button(text="▶️ تفعيل الكود", callback_data=f"syriatel_enable_{code.id}")
+        builder.button(text="▶️ تفعيل الكود", callback_data=pack(CODE_ENABLE, code.id))
     
-    builder.button(text="🗑️ حذف الكود", callback_data=f"syriatel_remove_{code.id}")
-    builder.button(text="🔄 تصفير الكود", callback_data=f"syriatel_zero_{code.id}")
-    builder.button(text="📝 تعديل الحد", callback_data=f"syriatel_edit_{code.id}")
+    builder.button(text="🗑️ حذف الكود", callback_data=pack(CODE_REMOVE, code.id))
+    builder.button(text="🔄 تصفير الكود", callback_data=pack(CODE_ZERO, code.id))
+    builder.button(text="📝 تعديل الحد", callback_data=pack(CODE_EDIT, code.id))
     builder.button(text="⬅️ رجوع للقائمة", callback_data="syriatel_list_codes")
     
     builder.adjust(2, 2, 1, 1)
@@ -397,7 +402,127 @@ async def manage_single_code(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer()
 
-@router.callback_query(F.data == "syriatel_reset_codes")
+@callbacks.compact(CODE_ENABLE, CodeRef, admin=True)
+async def enable_single_code(callback: CallbackQuery, payload: CodeRef, session: AsyncSession):
+    """تفعيل كود من شاشة إدارته"""
+    if not await SyriatelCodeCRUD(session).update_code(payload.code_id, is_active=True):
+        await callback.answer("❌ الكود غير موجود", show_alert=True)
+        return
+    
+    await manage_single_code(callback, payload, session)
+
+@callbacks.compact(CODE_DISABLE, CodeRef, admin=True)
+async def disable_single_code(callback: CallbackQuery, payload: CodeRef, session: AsyncSession):
+    """تعطيل كود من شاشة إدارته"""
+    if not await SyriatelCodeCRUD(session).update_code(payload.code_id, is_active=False):
+        await callback.answer("❌ الكود غير موجود", show_alert=True)
+        return
+    
+    await manage_single_code(callback, payload, session)
+
+@callbacks.compact(CODE_ZERO, CodeRef, admin=True)
+async def zero_single_code(callback: CallbackQuery, payload: CodeRef, session: AsyncSession):
+    """تصفير مبلغ كود واحد"""
+    if not await SyriatelCodeCRUD(session).update_code(payload.code_id, current_amount=0):
+        await callback.answer("❌ الكود غير موجود", show_alert=True)
+        return
+    
+    logger.info(f"Syriatel code {payload.code_id} zeroed by {callback.from_user.id}")
+    await manage_single_code(callback, payload, session)
+
+@callbacks.compact(CODE_REMOVE, CodeRef, admin=True)
+async def remove_single_code(callback: CallbackQuery, payload: CodeRef, session: AsyncSession):
+    """حذف كود"""
+    if not await SyriatelCodeCRUD(session).delete_code(payload.code_id):
+        await callback.answer("❌ الكود غير موجود", show_alert=True)
+        return
+    
+    logger.info(f"Syriatel code {payload.code_id} removed by {callback.from_user.id}")
+    
+    await callback.message.edit_text(
+        "🗑️ <b>تم حذف الكود</b>",
+        reply_markup=back_button("admin_syriatel_codes"),
+        parse_mode="HTML"
+    )
+    
+    await callback.answer()
+
+@callbacks.compact(CODE_EDIT, CodeRef, admin=True)
+async def edit_code_limit_start(callback: CallbackQuery, payload: CodeRef, state: FSMContext):
+    """بدء تعديل الحد الأقصى لكود"""
+    await state.set_state(SyriatelAdminStates.edit_limit)
+    await state.update_data(code_id=payload.code_id)
+    
+    await callback.message.edit_text(
+        "📝 <b>تعديل الحد الأقصى للكود</b>\n\n"
+        "⬇️ <b>أدخل الحد الجديد:</b>\n"
+        "• أدخل الرقم فقط\n"
+        f"• مثال: {SYRIATEL_CODE_LIMIT}\n\n"
+        "أو أرسل ❌ للإلغاء.",
+        reply_markup=back_button("admin_syriatel_codes")
+    )
+    
+    await callback.answer()
+
+@router.message(SyriatelAdminStates.edit_limit)
+async def edit_code_limit_process(message: Message, state: FSMContext, session: AsyncSession):
+    """معالجة تعديل الحد الأقصى"""
+    from config import ADMIN_ID
+    
+    if message.from_user.id != ADMIN_ID:
+        return
+    
+    data = await state.get_data()
+    code_id = data.get("code_id")
+    limit_text = message.text.strip()
+    
+    if limit_text == "❌" or not code_id:
+        await state.clear()
+        await message.answer("❌ تم الإلغاء", reply_markup=back_button("admin_syriatel_codes"))
+        return
+    
+    if not limit_text.isdigit() or int(limit_text) <= 0:
+        await message.answer(
+            "❌ <b>قيمة غير صالحة!</b>\n"
+            "يجب إدخال رقم موجب.\n"
+            "⬇️ أعد إدخال الحد:",
+            parse_mode="HTML"
+        )
+        return
+    
+    max_amount = int(limit_text)
+    
+    from sqlalchemy import select
+    from database.models import SyriatelCode
+    
+    result = await session.execute(select(SyriatelCode.current_amount).where(SyriatelCode.id == code_id))
+    current_amount = result.scalar_one_or_none()
+    
+    if current_amount is None:
+        await state.clear()
+        await message.answer("❌ الكود غير موجود", reply_markup=back_button("admin_syriatel_codes"))
+        return
+    
+    # قيد check_amount_limit: الحد لا يقل عن المبلغ الحالي
+    if max_amount < current_amount:
+        await message.answer(
+            f"❌ <b>الحد أقل من المبلغ الحالي ({current_amount:,} ليرة)!</b>\n"
+            "⬇️ أعد إدخال الحد أو صفّر الكود أولاً:",
+            parse_mode="HTML"
+        )
+        return
+    
+    await SyriatelCodeCRUD(session).update_code(code_id, max_amount=max_amount)
+    await state.clear()
+    
+    await message.answer(
+        f"✅ <b>تم تعديل الحد الأقصى</b>\n\n"
+        f"🎯 <b>الحد الجديد:</b> {max_amount:,} ليرة",
+        reply_markup=back_button("admin_syriatel_codes"),
+        parse_mode="HTML"
+    )
+
+@callbacks.exact("syriatel_reset_codes", admin=True)
 async def reset_syriatel_codes(callback: CallbackQuery, session: AsyncSession):
     """تصفير جميع الأكواد يدويًا"""
     from config import ADMIN_ID
@@ -423,7 +548,7 @@ async def reset_syriatel_codes(callback: CallbackQuery, session: AsyncSession):
     
     await callback.answer()
 
-@router.callback_query(F.data == "confirm_syriatel_reset")
+@callbacks.exact("confirm_syriatel_reset", admin=True)
 async def confirm_reset_syriatel_codes(callback: CallbackQuery, session: AsyncSession):
     """تأكيد تصفير الأكواد"""
     from config import ADMIN_ID
@@ -438,7 +563,7 @@ async def confirm_reset_syriatel_codes(callback: CallbackQuery, session: AsyncSe
         
         # إشعار في قناة الإدمن
         from core.bot import bot_manager
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         await bot.send_message(
             CHANNEL_ADMIN_LOGS,
@@ -1 +1,4 @@
- 
\ No newline at end of file
+from aiogram import Router
+
+# معالجات Ichancy لم تُضف بعد؛ الـ router موجود ليُسجل في main.py
+router = Router()
@@ -7,7 +7,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from database.crud.users import UserCRUD
 from database.crud.transactions import TransactionCRUD
 from keyboards.main import main_menu, back_button
+from keyboards.screens import help_screen, cancelled_screen
 from core.bot import logger
+from core.callbacks import callbacks
+from keyboards.callback_data import BACK, BackTarget
 from core.redis_cache import delete_user_state
 import html
 
@@ -50,7 +53,7 @@ async def cmd_start(message: Message, session: AsyncSession, state: FSMContext):
         parse_mode="HTML"
     )
     
-    logger.info(f"User {user_id} started the bot")
+    logger.info(f"User {user_id} started the bot", extra={"sampled": True})
 
 @router.message(Command("balance"))
 async def cmd_balance(message: Message, session: AsyncSession):
@@ -69,24 +72,9 @@ async def cmd_balance(message: Message, session: AsyncSession):
 @router.message(Command("help"))
 async def cmd_help(message: Message):
     """مساعدة"""
-    help_text = """
-<b>🎮 أوامر البوت:</b>
+    await message.answer(help_screen(), parse_mode="HTML")
 
-/start - بدء البوت والقائمة الرئيسية
-/balance - عرض رصيدك
-/help - عرض هذه الرسالة
-
-<b>📞 للدعم:</b>
-- استخدام زر "تواصل معنا"
-- أو إرسال رسالة مباشرة
-
-<b>⚠️ ملاحظات:</b>
-- لا تشارك معلوماتك مع أحد
-- تأكد من صحة العمليات قبل التأكيد
-"""
-    await message.answer(help_text, parse_mode="HTML")
-
-@router.callback_query(F.data == "back_main")
+@callbacks.exact("back_main")
 async def back_to_main(callback: CallbackQuery, session: AsyncSession, state: FSMContext):
     """العودة للقائمة الرئيسية"""
     user_id = callback.from_user.id
@@ -113,7 +101,7 @@ async def back_to_main(callback: CallbackQuery, session: AsyncSession, state: FS
     
     await callback.answer()
 
-@router.callback_query(F.data == "cancel")
+@callbacks.exact("cancel")
 async def cancel_action(callback: CallbackQuery, state: FSMContext):
     """إلغاء العملية الحالية"""
     user_id = callback.from_user.id
@@ -123,16 +111,16 @@ async def cancel_action(callback: CallbackQuery, state: FSMContext):
     await delete_user_state(user_id)
     
     await callback.message.edit_text(
-        "❌ <b>تم إلغاء العملية</b>\n\nاستخدم /start للعودة للقائمة الرئيسية.",
+        cancelled_screen(),
         parse_mode="HTML"
     )
     
     await callback.answer("تم الإلغاء")
 
-@router.callback_query(F.data.startswith("back_"))
-async def handle_back(callback: CallbackQuery, state: FSMContext):
+@callbacks.compact(BACK, BackTarget, legacy="back_")
+async def handle_back(callback: CallbackQuery, payload: BackTarget, session: AsyncSession, state: FSMContext):
     """معالجة أزرار العودة المختلفة"""
-    back_to = callback.data.split("_", 1)[1]
+    back_to = payload.target
     user_id = callback.from_user.id
     
     # مسح الحالة المؤقتة
@@ -148,11 +136,11 @@ async def handle_back(callback: CallbackQuery, state: FSMContext):
     
     elif back_to == "withdraw_main":
         from handlers.withdraw.main import withdraw_main_menu
-        await withdraw_main_menu(callback, state)
+        await withdraw_main_menu(callback, state, session)
     
     else:
         # العودة للقائمة الرئيسية
-        await back_to_main(callback, state)
+        await back_to_main(callback, session, state)
     
     await callback.answer()
 
@@ -9,6 +9,7 @@ import random
 from keyboards.main import payment_methods_keyboard, back_button, cancel_button, confirmation_buttons
 from core.redis_cache import set_user_state, get_user_state, delete_user_state
 from core.bot import logger
+from core.callbacks import callbacks
 from database.crud.transactions import TransactionCRUD
 from database.crud.users import UserCRUD
 from config import MIN_WITHDRAW, MAX_WITHDRAW, CHANNEL_WITHDRAW
@@ -22,8 +23,8 @@ class WithdrawStates(StatesGroup):
     enter_account = State()
     confirm = State()
 
-@router.callback_query(F.data == "withdraw_main")
-async def withdraw_main_menu(callback: CallbackQuery, state: FSMContext):
+@callbacks.exact("withdraw_main")
+async def withdraw_main_menu(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """القائمة الرئيسية للسحب"""
     user_id = callback.from_user.id
     
@@ -32,7 +33,7 @@ async def withdraw_main_menu(callback: CallbackQuery, state: FSMContext):
     await delete_user_state(user_id)
     
     # التحقق من رصيد المستخدم
-    user_crud = UserCRUD(callback.session)
+    user_crud = UserCRUD(session)
     user = await user_crud.get_user(user_id)
     
     if not user or user.balance < MIN_WITHDRAW:
@@ -65,7 +66,7 @@ async def withdraw_main_menu(callback: CallbackQuery, state: FSMContext):
     
     await callback.answer()
 
-@router.callback_query(F.data.in_(["withdraw_syr", "withdraw_sch", "withdraw_sch_usd"]))
+@callbacks.exact("withdraw_syr", "withdraw_sch", "withdraw_sch_usd")
 async def choose_withdraw_method(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """اختيار طريقة السحب"""
     user_id = callback.from_user.id
@@ -276,7 +277,7 @@ async def withdraw_enter_account(message: Message, state: FSMContext, session: A
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data == "confirm_withdraw")
+@callbacks.exact("confirm_withdraw", long_running="⏳ جاري إرسال الطلب...", priority="payment")
 async def confirm_withdraw_request(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """تأكيد طلب السحب"""
     user_id = callback.from_user.id
@@ -307,11 +308,24 @@ async def confirm_withdraw_request(callback: CallbackQuery, state: FSMContext, s
             payment_method=method,
             transaction_id=transaction_id,
             account_number=account_number,
-            notes=f"طلب سحب عبر {method}"
+            notes=f"طلب سحب عبر {method}",
+            commit=False
         )
         
-        # خصم المبلغ من رصيد المستخدم (معلق حتى الموافقة)
+        # الرصيد في الحالة مأخوذ من الكاش عند بدء السحب: التحقق من قاعدة البيانات مع قفل الصف
         user_crud = UserCRUD(session)
+        user = await user_crud.get_user_for_update(user_id)
+        balance = user.balance if user else 0
+        if balance < amount:
+            # يلغي المعاملة غير المحفوظة ويحرر القفل
+            await session.rollback()
+            await callback.answer(
+                f"❌ رصيدك الحالي ({balance:,} ليرة) أقل من مبلغ السحب",
+                show_alert=True
+            )
+            return
+        
+        # خصم المبلغ من رصيد المستخدم (معلق حتى الموافقة) مع الـ commit للمعاملة
         old_balance, new_balance = await user_crud.update_balance(
             user_id, 
             amount, 
@@ -322,7 +336,7 @@ async def confirm_withdraw_request(callback: CallbackQuery, state: FSMContext, s
         from core.bot import bot_manager
         from keyboards.main import admin_transaction_buttons
         
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         
         # نص الرسالة للقناة
         order_number = tx_result["order_number"]
@@ -0,0 +1,79 @@
+from typing import NamedTuple, Any
+
+# إصدار صيغة البيانات المضغوطة: v1:<code>:<args>
+CALLBACK_VERSION = "v1"
+SEPARATOR = ":"
+
+# حد Telegram لطول callback_data بالبايت
+MAX_CALLBACK_DATA = 64
+
+# ==================== الرموز المضغوطة ====================
+
+BACK = "bk"
+
+# المعاملات
+TX_APPROVE = "ta"
+TX_REJECT = "tr"
+TX_REVERIFY = "tv"
+TX_DELIVER = "td"
+TX_RESET_USER = "tu"
+TX_CONFIRM_RESET = "tz"
+TX_EXPORT_CSV = "te"
+PENDING_NEXT = "pn"
+PENDING_PREV = "pp"
+
+# إدارة المستخدمين
+USER_VIEW = "uv"
+USER_EDIT_BALANCE = "ue"
+USER_ADD_BALANCE = "ua"
+USER_SUBTRACT_BALANCE = "us"
+USER_BAN = "ub"
+USER_UNBAN = "uu"
+USER_SEND_MESSAGE = "um"
+USER_EXPORT = "ux"
+USER_DELETE = "ud"
+USER_CONFIRM_DELETE = "uk"
+BROADCAST_CONFIRM = "bc"
+
+# أكواد سيرياتيل
+CODE_VIEW = "cv"
+CODE_ACTIVATE = "ca"
+CODE_ENABLE = "ce"
+CODE_DISABLE = "cd"
+CODE_REMOVE = "cr"
+CODE_ZERO = "cz"
+CODE_EDIT = "cm"
+
+# ==================== أنواع الحمولة ====================
+
+class BackTarget(NamedTuple):
+    target: str
+
+class TransactionRef(NamedTuple):
+    transaction_id: int
+
+class UserRef(NamedTuple):
+    user_id: int
+
+class UserTransactionRef(NamedTuple):
+    user_id: int
+    transaction_id: int
+
+class CodeRef(NamedTuple):
+    code_id: int
+
+class MessageRef(NamedTuple):
+    message_id: int
+
+class ExportRef(NamedTuple):
+    tx_type: str
+
+
+def pack(code: str, *args: Any, version: str = CALLBACK_VERSION) -> str:
+    """بناء callback_data مضغوطة: v1:<code>:<args>"""
+    data = SEPARATOR.join((version, code, *(str(arg) for arg in args)))
+
+    if len(data.encode()) > MAX_CALLBACK_DATA:
+        raise ValueError(f"Callback data too long ({len(data.encode())} bytes): {data!r}")
+
+    return data
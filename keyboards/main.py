@@ -1,10 +1,23 @@
- from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 from typing import Optional, List, Dict
 from config import ADMIN_ID
+from keyboards.registry import keyboards, role_for
+from keyboards.callback_data import (
+    pack, BACK, USER_VIEW, TX_APPROVE, TX_REJECT, TX_REVERIFY, TX_DELIVER, TX_RESET_USER
+)
+
+# وجهات العودة الثابتة التي تُبنى مسبقاً (الوجهات الديناميكية تُبنى عند الطلب)
+STATIC_BACK_TARGETS = (
+    "main", "charge_main", "withdraw_main",
+    "admin_users", "admin_payments", "admin_withdraws", "admin_syriatel_codes"
+)
 
 def main_menu(user_id: int) -> InlineKeyboardMarkup:
-    """القائمة الرئيسية للبوت"""
+    """القائمة الرئيسية للبوت (نسخة مشتركة حسب الدور)"""
+    return keyboards.variant("main_menu", role_for(user_id))
+
+def _build_main_menu(is_admin: bool) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     # الصف الأول: Ichancy
@@ -47,7 +60,7 @@ def main_menu(user_id: int) -> InlineKeyboardMarkup:
     builder.button(text="📌 الشروط والأحكام", callback_data="rules")
     
     # الصف العاشر: لوحة التحكم (للأدمن فقط)
-    if user_id == ADMIN_ID:
+    if is_admin:
         builder.button(text="🎛 لوحة التحكم", callback_data="admin_panel")
     
     builder.adjust(1)
@@ -55,12 +68,27 @@ def main_menu(user_id: int) -> InlineKeyboardMarkup:
 
 def back_button(back_to: str = "main") -> InlineKeyboardMarkup:
     """زر العودة"""
+    key = f"back:{back_to}"
+    if keyboards.has(key):
+        return keyboards.get(key)
+    return _build_back_button(back_to)
+
+def _build_back_button(back_to: str) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="⬅️ رجوع", callback_data=pack(BACK, back_to))
+    return builder.as_markup()
+
+def user_details_back_button(user_id: int) -> InlineKeyboardMarkup:
+    """زر العودة لتفاصيل مستخدم في لوحة الأدمن"""
     builder = InlineKeyboardBuilder()
-    builder.button(text="⬅️ رجوع", callback_data=f"back_{back_to}")
+    builder.button(text="⬅️ رجوع", callback_data=pack(USER_VIEW, user_id))
     return builder.as_markup()
 
 def cancel_button() -> InlineKeyboardMarkup:
     """زر إلغاء"""
+    return keyboards.get("cancel")
+
+def _build_cancel_button() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="❌ إلغاء", callback_data="cancel")
     return builder.as_markup()
@@ -75,6 +103,9 @@ def confirmation_buttons(confirm_data: str, cancel_data: str = "cancel") -> Inli
 
 def payment_methods_keyboard(action: str = "charge") -> InlineKeyboardMarkup:
     """لوحة طرق الدفع/السحب"""
+    return keyboards.variant("payment_methods", action, default="withdraw")
+
+def _build_payment_methods_keyboard(action: str) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     if action == "charge":
@@ -86,7 +117,7 @@ def payment_methods_keyboard(action: str = "charge") -> InlineKeyboardMarkup:
         builder.button(text="💰 شام كاش", callback_data="withdraw_sch")
         builder.button(text="💰 شام كاش دولار", callback_data="withdraw_sch_usd")
     
-    builder.button(text="⬅️ رجوع", callback_data=f"back_{action}_main")
+    builder.button(text="⬅️ رجوع", callback_data=pack(BACK, f"{action}_main"))
     builder.adjust(1)
     return builder.as_markup()
 
@@ -94,17 +125,20 @@ def admin_transaction_buttons(transaction_id: int) -> InlineKeyboardMarkup:
     """أزرار إدارة المعاملة للأدمن"""
     builder = InlineKeyboardBuilder()
     
-    builder.button(text="✅ قبول", callback_data=f"approve_{transaction_id}")
-    builder.button(text="❌ رفض", callback_data=f"reject_{transaction_id}")
-    builder.button(text="🔁 إعادة التحقق", callback_data=f"reverify_{transaction_id}")
-    builder.button(text="💵 تم التسليم", callback_data=f"deliver_{transaction_id}")
-    builder.button(text="🔄 تصفير الحساب", callback_data=f"reset_user_{transaction_id}")
+    builder.button(text="✅ قبول", callback_data=pack(TX_APPROVE, transaction_id))
+    builder.button(text="❌ رفض", callback_data=pack(TX_REJECT, transaction_id))
+    builder.button(text="🔁 إعادة التحقق", callback_data=pack(TX_REVERIFY, transaction_id))
+    builder.button(text="💵 تم التسليم", callback_data=pack(TX_DELIVER, transaction_id))
+    builder.button(text="🔄 تصفير الحساب", callback_data=pack(TX_RESET_USER, transaction_id))
     
     builder.adjust(2)
     return builder.as_markup()
 
 def logs_filter_keyboard() -> InlineKeyboardMarkup:
     """تصفية السجل"""
+    return keyboards.get("logs_filter")
+
+def _build_logs_filter_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     builder.button(text="📥 الشحن", callback_data="logs_charge")
@@ -118,6 +152,9 @@ def logs_filter_keyboard() -> InlineKeyboardMarkup:
 
 def numeric_keyboard() -> ReplyKeyboardMarkup:
     """لوحة أرقام للرسائل النصية"""
+    return keyboards.get("numeric")
+
+def _build_numeric_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     
     for i in range(1, 10):
@@ -130,6 +167,9 @@ def numeric_keyboard() -> ReplyKeyboardMarkup:
 
 def admin_panel_keyboard() -> InlineKeyboardMarkup:
     """لوحة تحكم الأدمن الرئيسية"""
+    return keyboards.get("admin_panel")
+
+def _build_admin_panel_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     # الصف الأول: الإحصائيات
@@ -167,4 +207,18 @@ def admin_panel_keyboard() -> InlineKeyboardMarkup:
     builder.button(text="⬅️ رجوع للقائمة", callback_data="back_main")
     
     builder.adjust(1)
-    return builder.as_markup()
\ No newline at end of file
+    return builder.as_markup()
+
+# ==================== تسجيل اللوحات الثابتة ====================
+
+keyboards.register("main_menu:user", lambda: _build_main_menu(is_admin=False))
+keyboards.register("main_menu:admin", lambda: _build_main_menu(is_admin=True))
+keyboards.register("payment_methods:charge", lambda: _build_payment_methods_keyboard("charge"))
+keyboards.register("payment_methods:withdraw", lambda: _build_payment_methods_keyboard("withdraw"))
+keyboards.register("cancel", _build_cancel_button)
+keyboards.register("logs_filter", _build_logs_filter_keyboard)
+keyboards.register("numeric", _build_numeric_keyboard)
+keyboards.register("admin_panel", _build_admin_panel_keyboard)
+
+for _target in STATIC_BACK_TARGETS:
+    keyboards.register(f"back:{_target}", lambda target=_target: _build_back_button(target))
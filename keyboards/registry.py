@@ -0,0 +1,49 @@
+from typing import Dict, Callable, Any, Optional
+
+from config import ADMIN_ID
+
+
+def role_for(user_id: int) -> str:
+    """الدور المستخدم لاختيار نسخة اللوحة"""
+    return "admin" if user_id == ADMIN_ID else "user"
+
+
+class KeyboardRegistry:
+    """سجل اللوحات والشاشات الثابتة: تُبنى مرة واحدة وتُشارك بين جميع التحديثات"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._built: Dict[str, Any] = {}
+
+    def register(self, key: str, factory: Callable[[], Any]):
+        """تسجيل دالة بناء للوحة أو نص ثابت"""
+        self._factories[key] = factory
+        self._built.pop(key, None)
+
+    def has(self, key: str) -> bool:
+        return key in self._factories
+
+    def get(self, key: str) -> Any:
+        """النسخة المشتركة (الكائنات مجمدة، لا يجوز تعديلها)"""
+        value = self._built.get(key)
+        if value is None:
+            value = self._factories[key]()
+            self._built[key] = value
+        return value
+
+    def variant(self, key: str, variant: str, default: Optional[str] = None) -> Any:
+        """نسخة حسب المتغير (مثل الدور)، مع نسخة افتراضية"""
+        full_key = f"{key}:{variant}"
+        if full_key not in self._factories and default is not None:
+            full_key = f"{key}:{default}"
+        return self.get(full_key)
+
+    def build_all(self) -> int:
+        """بناء جميع العناصر المسجلة مسبقاً (عند بدء التشغيل)"""
+        for key in self._factories:
+            self.get(key)
+        return len(self._built)
+
+
+# Global instance
+keyboards = KeyboardRegistry()
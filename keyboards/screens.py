@@ -0,0 +1,31 @@
+from keyboards.registry import keyboards
+
+# نصوص الشاشات الثابتة (لا تعتمد على المستخدم)
+HELP_TEXT = """
+<b>🎮 أوامر البوت:</b>
+
+/start - بدء البوت والقائمة الرئيسية
+/balance - عرض رصيدك
+/help - عرض هذه الرسالة
+
+<b>📞 للدعم:</b>
+- استخدام زر "تواصل معنا"
+- أو إرسال رسالة مباشرة
+
+<b>⚠️ ملاحظات:</b>
+- لا تشارك معلوماتك مع أحد
+- تأكد من صحة العمليات قبل التأكيد
+"""
+
+CANCELLED_TEXT = "❌ <b>تم إلغاء العملية</b>\n\nاستخدم /start للعودة للقائمة الرئيسية."
+
+keyboards.register("screen:help", lambda: HELP_TEXT)
+keyboards.register("screen:cancelled", lambda: CANCELLED_TEXT)
+
+def help_screen() -> str:
+    """نص شاشة المساعدة"""
+    return keyboards.get("screen:help")
+
+def cancelled_screen() -> str:
+    """نص إلغاء العملية"""
+    return keyboards.get("screen:cancelled")
@@ -1,20 +1,38 @@
 import asyncio
+import datetime
+import hmac
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from typing import List, Any
+from fastapi import FastAPI, HTTPException, Request, Body
+from fastapi.responses import PlainTextResponse, JSONResponse
 import uvicorn
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.types import Update
 from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
 
 from core.bot import bot_manager, BotManager, logger
-from core.database import engine, Base, create_pool
+from core.database import engine, Base, create_pool, AsyncSessionLocal
 from core.redis_cache import cache
+from core.leader import leader
+from core.scheduler import scheduler
+from core.metrics import metrics
+from core.logging_setup import setup_logging, shutdown_logging
+from core.startup import startup, warm_db_pool, warm_redis_pool
+from core.ban_list import ban_list
+from core.charge_txids import charge_txids
+from core.outbox import outbox
+from core.health import health
+from core.update_queue import update_scheduler
+from core.sms_stream import sms_consumer, validate_sms, enqueue_sms
+from core.tx_events import tx_events
 from config import BOT_TOKEN, ADMIN_ID, DB_NAME
+from config.settings import WARMUP_ACTIVE_USERS_DAYS, WARMUP_ACTIVE_USERS_LIMIT, WEBHOOK_SECRET
 from utils.sms_parser import background_sms_checker
 
 # استيراد جميع الـ routers
@@ -27,6 +45,8 @@ from admin.dashboard import router as admin_dashboard_router
 from admin.users import router as admin_users_router
 from admin.transactions import router as admin_transactions_router
 from utils.sms_parser import sms_router
+from middlewares import setup_middlewares
+from keyboards.registry import keyboards as keyboard_registry
 
 # إعداد FastAPI للـ webhooks
 app = FastAPI(title="Telegram Bot API")
@@ -37,26 +57,51 @@ async def lifespan(app: FastAPI):
     # بداية التشغيل
     logger.info("🚀 Starting bot application...")
     
-    # تهيئة قاعدة البيانات
-    try:
+    # خطوات التهيئة المستقلة تعمل بالتوازي، والتسخين يعتمد عليها
+    async def init_database():
         async with engine.begin() as conn:
             # إنشاء جميع الجداول
             await conn.run_sync(Base.metadata.create_all)
         logger.info(f"✅ Database '{DB_NAME}' initialized")
-    except Exception as e:
-        logger.error(f"❌ Database initialization failed: {e}")
-        raise
     
-    # تهيئة Redis
-    try:
+    async def init_redis():
         await cache.redis.ping()
         logger.info("✅ Redis connected")
-    except Exception as e:
-        logger.error(f"❌ Redis connection failed: {e}")
-        raise
     
-    # تهيئة البوت
-    await bot_manager.init()
+    async def warm_caches():
+        """تسخين الكاش الساخن: الأكواد النشطة، الإعدادات، المستخدمين النشطين مؤخراً"""
+        from database.crud.syriatel_codes import SyriatelCodeCRUD
+        from database.crud.settings import SettingCRUD
+        from database.crud.users import UserCRUD
+        
+        async with AsyncSessionLocal() as session:
+            codes = await SyriatelCodeCRUD(session).get_active_codes()
+            settings_count = len(await SettingCRUD(session).get_all())
+            users = await UserCRUD(session).warm_recent_users(
+                days=WARMUP_ACTIVE_USERS_DAYS, limit=WARMUP_ACTIVE_USERS_LIMIT
+            )
+        
+        logger.info(f"🔥 Caches warmed: {len(codes)} codes, {settings_count} settings, {users} users")
+    
+    async def warm_bot_session():
+        # فتح اتصال TLS مع Telegram مسبقاً
+        me = await bot_manager.bot.get_me()
+        logger.info(f"✅ Bot session warmed (@{me.username})")
+    
+    async def build_keyboards():
+        # اللوحات والشاشات الثابتة تُبنى مرة واحدة وتُشارك
+        logger.info(f"✅ {keyboard_registry.build_all()} keyboards/screens prebuilt")
+    
+    startup.add_step("database", init_database)
+    startup.add_step("redis", init_redis)
+    startup.add_step("bot", bot_manager.init)
+    startup.add_step("keyboards", build_keyboards, critical=False)
+    startup.add_step("bot_session", warm_bot_session, depends_on=("bot",), critical=False)
+    startup.add_step("db_pool", warm_db_pool, depends_on=("database",), critical=False)
+    startup.add_step("redis_pool", warm_redis_pool, depends_on=("redis",), critical=False)
+    startup.add_step("caches", warm_caches, depends_on=("database", "redis"), critical=False)
+    
+    await startup.run()
     
     # إعداد الـ dispatcher
     dp = bot_manager.dp
@@ -72,6 +117,13 @@ async def lifespan(app: FastAPI):
     dp.include_router(admin_transactions_router)
     dp.include_router(sms_router)
     
+    # تسجيل الـ middlewares
+    setup_middlewares(dp, bot_manager.bot)
+    
+    # عمال تغذية الـ dispatcher من طوابير الأولوية (webhook)
+    update_scheduler.start(dp, bot_manager.bot)
+    await update_scheduler.restore()
+    
     # بدء المهام الخلفية
     from database.crud.syriatel_codes import SyriatelCodeCRUD
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -80,47 +132,81 @@ async def lifespan(app: FastAPI):
         """بدء المهام الخلفية"""
         # مهمة تصفير أكواد سيرياتيل اليومي
         async def reset_syriatel_codes_daily():
-            while True:
-                try:
-                    # الانتظار حتى منتصف الليل
-                    now = datetime.datetime.now()
-                    next_midnight = (now + datetime.timedelta(days=1)).replace(
-                        hour=0, minute=0, second=0, microsecond=0
-                    )
-                    sleep_seconds = (next_midnight - now).total_seconds()
-                    
-                    logger.info(f"⏰ Next syriatel codes reset in {sleep_seconds/3600:.1f} hours")
-                    await asyncio.sleep(sleep_seconds)
-                    
-                    # التصفير
-                    async with AsyncSession(engine) as session:
-                        syriatel_crud = SyriatelCodeCRUD(session)
-                        await syriatel_crud.reset_daily_codes()
-                    
-                    logger.info("✅ Daily syriatel codes reset completed")
-                    
-                except Exception as e:
-                    logger.error(f"Error in daily reset task: {e}")
-                    await asyncio.sleep(3600)  # انتظار ساعة عند الخطأ
+            async with AsyncSession(engine) as session:
+                syriatel_crud = SyriatelCodeCRUD(session)
+                await syriatel_crud.reset_daily_codes()
+            
+            logger.info("✅ Daily syriatel codes reset completed")
+        
+        # جدولة المهام الدورية (منتصف الليل بتوقيت SCHEDULER_TIMEZONE)
+        scheduler.add_job(
+            "reset_syriatel_codes_daily",
+            reset_syriatel_codes_daily,
+            cron="0 0 * * *",
+            timeout=300
+        )
+        
+        # سحب رسائل SMS من مصدر البوابة المحلي (إذا كان SMS_SOURCE_URL مضبوطاً)
+        leader.add_task("sms_poller", background_sms_checker)
+        
+        # إعادة بناء قائمة الحظر مرة لكل قائد (العمال يحدّثون مراياهم عبر رقم الإصدار)
+        async def rebuild_ban_list(token: int):
+            async with AsyncSessionLocal() as session:
+                count = await ban_list.rebuild(session, token)
+            logger.info(f"🚫 Ban list rebuilt ({count} banned users)")
+        
+        leader.add_task("ban_list", rebuild_ban_list)
+        
+        # أرقام عمليات الشحن المستخدمة: نفس النمط (إصدار + WATCH) على القائد فقط
+        async def rebuild_charge_txids(token: int):
+            async with AsyncSessionLocal() as session:
+                count = await charge_txids.rebuild(session, token)
+            logger.info(f"🔑 Charge transaction ids rebuilt ({count} ids)")
+        
+        leader.add_task("charge_txids", rebuild_charge_txids)
+        
+        # المجدول يعمل على القائد فقط (نسخة واحدة من بين جميع العمال)
+        leader.add_task("scheduler", scheduler.run)
         
-        # بدء المهام
-        asyncio.create_task(reset_syriatel_codes_daily())
-        # asyncio.create_task(background_sms_checker())  # تفعيل إذا كان هناك نظام SMS
+        # بدء انتخاب القائد
+        leader.start()
         
-        logger.info("✅ Background tasks started")
+        logger.info("✅ Background tasks registered (leader-only)")
     
     await start_background_tasks()
     
+    # مُرسل صندوق الصادر يعمل على كل عامل (SKIP LOCKED)
+    outbox.start()
+    
+    # عمال تدفق SMS (مجموعة مستهلكين مشتركة بين جميع العمال)
+    sms_consumer.start()
+    
+    # مستمع أحداث حالة المعاملات (LISTEN) على كل عامل
+    tx_events.start()
+    
+    # أول فحص للتبعيات ثم التحديث في الخلفية
+    await health.refresh()
+    health.start()
+    
+    # الجاهزية بعد انتهاء التهيئة والتسخين
+    startup.mark_ready()
     logger.info("✅ Bot is ready and running!")
     
     yield  # التطبيق يعمل هنا
     
     # إغلاق التشغيل
     logger.info("🛑 Shutting down bot application...")
+    await update_scheduler.stop()
+    await leader.stop()
+    await outbox.stop()
+    await sms_consumer.stop()
+    await tx_events.stop()
+    await health.stop()
     await bot_manager.close()
     await engine.dispose()
     await cache.redis.close()
     logger.info("✅ Bot shutdown completed")
+    shutdown_logging()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -135,34 +221,69 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "/health",
+            "/livez",
+            "/readyz",
+            "/startup",
             "/stats",
+            "/leader",
+            "/scheduler",
+            "/queue",
+            "/sms/stream",
+            "/tx-events",
+            "/metrics",
             "/admin/stats"
         ]
     }
 
+@app.get("/leader")
+async def leader_status():
+    """حالة انتخاب القائد للمهام الخلفية"""
+    return await leader.status()
+
+@app.get("/scheduler")
+async def scheduler_status():
+    """حالة المهام المجدولة ومدة تشغيلها"""
+    return scheduler.status()
+
+@app.get("/queue")
+async def queue_status():
+    """عمق طوابير التحديثات وزمن الانتظار لكل مسار"""
+    return update_scheduler.status()
+
+@app.get("/tx-events")
+async def tx_events_status():
+    """حالة مستمع أحداث المعاملات والمشتركين"""
+    return tx_events.status()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """تصدير المقاييس بصيغة Prometheus"""
+    return metrics.render()
+
+@app.get("/startup")
+async def startup_status():
+    """توقيت خطوات بدء التشغيل والزمن حتى أول استجابة سريعة"""
+    return startup.report()
+
+@app.get("/livez")
+async def liveness_check():
+    """فحص الحياة من الذاكرة فقط (بدون أي اتصال خارجي)"""
+    if not health.is_live():
+        raise HTTPException(status_code=503, detail="event loop stalled")
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """الجاهزية من آخر نتائج المراقب مع زمن كل تبعية"""
+    report = health.report()
+    if report["status"] != "ready":
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 @app.get("/health")
 async def health_check():
-    """فحص صحة النظام"""
-    try:
-        # فحص قاعدة البيانات
-        async with engine.connect() as conn:
-            await conn.execute("SELECT 1")
-        
-        # فحص Redis
-        await cache.redis.ping()
-        
-        # فحص البوت
-        await bot_manager.bot.get_me()
-        
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "redis": "connected",
-            "bot": "connected",
-            "timestamp": datetime.datetime.now().isoformat()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
+    """فحص صحة النظام (متوافق مع الإصدارات السابقة، يعتمد على /readyz)"""
+    return await readiness_check()
 
 @app.get("/stats")
 async def get_stats():
@@ -208,25 +329,52 @@ async def get_stats():
 
 # ==================== Webhook endpoints ====================
 
-@app.post("/webhook/sms")
+@app.post("/webhook/bot")
+async def bot_webhook_endpoint(request: Request):
+    """استقبال تحديثات Telegram ووضعها في مسار الأولوية المناسب"""
+    # التحقق من سر الـ webhook قبل قراءة الجسم (بدونه يمكن تزوير تحديثات من الأدمن)
+    received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not WEBHOOK_SECRET or not hmac.compare_digest(received.encode(), WEBHOOK_SECRET.encode()):
+        raise HTTPException(status_code=403, detail="invalid webhook secret")
+    
+    update = Update.model_validate(await request.json(), context={"bot": bot_manager.bot})
+    
+    if not update_scheduler.submit(update):
+        # المسار ممتلئ: Telegram يعيد الإرسال لاحقاً (والتكرار يُزال بالـ update_id)
+        raise HTTPException(status_code=503, detail="update queue full")
+    
+    return {"ok": True}
+
+@app.post("/webhook/sms", status_code=202)
 async def sms_webhook_endpoint(data: dict):
-    """نقطة نهاية لاستقبال رسائل SMS"""
-    try:
-        from utils.sms_parser import SMSParser
-        from sqlalchemy.ext.asyncio import AsyncSession
-        
-        async with AsyncSession(engine) as session:
-            parser = SMSParser(session)
-            result = await parser.process_sms_webhook(data)
-            
-            if result["success"]:
-                return {"status": "success", "data": result}
-            else:
-                return {"status": "error", "error": result.get("error")}
-                
-    except Exception as e:
-        logger.error(f"SMS webhook error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    """استقبال رسالة SMS وإلحاقها بالتدفق (التحليل والتحقق في العمال)"""
+    item = validate_sms(data)
+    if item is None:
+        raise HTTPException(status_code=400, detail="sender and message are required")
+    
+    ids = await enqueue_sms([item])
+    return {"status": "accepted", "id": ids[0]}
+
+@app.post("/webhook/sms/bulk", status_code=202)
+async def sms_bulk_webhook_endpoint(data: List[Any] = Body(...)):
+    """استقبال مصفوفة رسائل SMS دفعة واحدة"""
+    items = []
+    rejected = []
+    
+    for index, raw in enumerate(data):
+        item = validate_sms(raw)
+        if item is None:
+            rejected.append(index)
+        else:
+            items.append(item)
+    
+    ids = await enqueue_sms(items) if items else []
+    return {"status": "accepted", "accepted": len(ids), "rejected": rejected}
+
+@app.get("/sms/stream")
+async def sms_stream_status():
+    """طول التدفق والرسائل المعلقة والقائمة الميتة"""
+    return await sms_consumer.status()
 
 # ==================== تشغيل البوت ====================
 
@@ -240,10 +388,15 @@ async def on_startup():
     
     if webhook_url:
         from aiogram.methods import SetWebhook
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
+        
+        # /webhook/bot يرفض أي طلب بدون السر
+        if not WEBHOOK_SECRET:
+            raise RuntimeError("WEBHOOK_SECRET is required when WEBHOOK_URL is set")
         
         await bot(SetWebhook(
             url=f"{webhook_url}/webhook/bot",
+            secret_token=WEBHOOK_SECRET,
             drop_pending_updates=True
         ))
         logger.info(f"✅ Webhook set to: {webhook_url}/webhook/bot")
@@ -257,19 +410,8 @@ async def on_shutdown():
 
 async def main():
     """الدالة الرئيسية لتشغيل البوت"""
-    # إعدادات التسجيل
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler("bot.log", encoding="utf-8"),
-            logging.StreamHandler()
-        ]
-    )
-    
-    # تعطيل تسجيل aiogram المزعج
-    logging.getLogger("aiogram").setLevel(logging.WARNING)
-    logging.getLogger("aiohttp").setLevel(logging.WARNING)
+    # إعدادات التسجيل (مهيأة مسبقاً عند استيراد core.bot، الاستدعاء هنا آمن)
+    setup_logging()
     
     logger.info("=" * 50)
     logger.info("🤖 BOT STARTING")
@@ -283,7 +425,7 @@ async def main():
         dp.shutdown.register(on_shutdown)
         
         # حذف التحديثات القديمة والبدء
-        bot = await bot_manager.bot
+        bot = bot_manager.bot
         await bot.delete_webhook(drop_pending_updates=True)
         
         logger.info("✅ Starting bot in polling mode...")
@@ -301,7 +443,6 @@ async def main():
 
 if __name__ == "__main__":
     import sys
-    import datetime  # إضافة استيراد datetime
     
     # التحقق من وجود التوكن
     if not BOT_TOKEN:
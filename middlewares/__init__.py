@@ -0,0 +1,54 @@
+from aiogram import Bot, Dispatcher
+
+from .log_context import UpdateLoggingMiddleware, HandlerNameMiddleware
+from .callback_routing import CallbackRoutingMiddleware
+from .throttling import ThrottlingMiddleware
+from .ban_gate import BanGateMiddleware
+from .database import DbSessionMiddleware
+from .callback_ack import EarlyAckMiddleware, AnsweredCallbackRequestMiddleware
+from .edit_dedup import EditDedupRequestMiddleware
+from .update_dedup import UpdateDedupMiddleware
+
+
+def setup_middlewares(dp: Dispatcher, bot: Bot):
+    """تسجيل جميع الـ middlewares على الـ dispatcher"""
+    # التسجيل المنظم لكل تحديث
+    dp.update.outer_middleware(UpdateLoggingMiddleware())
+    
+    # التحديثات المكررة (إعادة إرسال webhook/polling) تُسقط قبل أي شيء
+    dp.update.outer_middleware(UpdateDedupMiddleware())
+    
+    # ثم المحظورون (فحص من الذاكرة) وحد الإغراق، قبل أي عمل على قاعدة البيانات
+    dp.update.outer_middleware(BanGateMiddleware())
+    dp.update.outer_middleware(ThrottlingMiddleware())
+    
+    # جلسة قاعدة البيانات للمعالجات
+    dp.update.outer_middleware(DbSessionMiddleware())
+    
+    dp.message.middleware(HandlerNameMiddleware())
+    dp.callback_query.middleware(HandlerNameMiddleware())
+    
+    # الرد المبكر على الـ callback للمعالجات البطيئة، ومنع الرد المكرر عبر جلسة البوت
+    dp.callback_query.middleware(EarlyAckMiddleware())
+    bot.session.middleware(AnsweredCallbackRequestMiddleware())
+    
+    # تخطي تعديلات الرسائل المطابقة للمحتوى المعروض
+    bot.session.middleware(EditDedupRequestMiddleware())
+    
+    # توجيه الـ callback بجدول هاش (يطبق الـ middlewares الداخلية أعلاه بنفسه)
+    dp.callback_query.outer_middleware(CallbackRoutingMiddleware(dp.callback_query.middleware))
+
+
+__all__ = [
+    'setup_middlewares',
+    'UpdateLoggingMiddleware',
+    'HandlerNameMiddleware',
+    'CallbackRoutingMiddleware',
+    'ThrottlingMiddleware',
+    'BanGateMiddleware',
+    'DbSessionMiddleware',
+    'EarlyAckMiddleware',
+    'AnsweredCallbackRequestMiddleware',
+    'EditDedupRequestMiddleware',
+    'UpdateDedupMiddleware'
+]
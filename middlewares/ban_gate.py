@@ -0,0 +1,31 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from config import ADMIN_ID
+from core.ban_list import ban_list
+from core.metrics import metrics
+
+banned_dropped = metrics.counter(
+    "banned_updates_dropped_total",
+    "Updates from banned users dropped before any handler ran"
+)
+
+
+class BanGateMiddleware(BaseMiddleware):
+    """إسقاط تحديثات المحظورين قبل قراءة الحالة أو فتح جلسة قاعدة البيانات (outer على update)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+
+        if user is not None and user.id != ADMIN_ID and await ban_list.is_banned(user.id):
+            banned_dropped.inc()
+            return None
+
+        return await handler(event, data)
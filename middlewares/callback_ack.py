@@ -0,0 +1,79 @@
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Awaitable, Optional, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.flags import get_flag
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import AnswerCallbackQuery, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import CallbackQuery
+
+from core.bot import logger
+from core.metrics import metrics
+
+# الـ callback الذي تم الرد عليه مبكراً في هذا التحديث: (معرف الاستعلام، معرف المستخدم)
+acked_callback: ContextVar[Optional[Tuple[str, int]]] = ContextVar("acked_callback", default=None)
+
+early_acks = metrics.counter(
+    "callback_early_ack_total",
+    "Callback queries answered before a long-running handler ran"
+)
+followups = metrics.counter(
+    "callback_followup_messages_total",
+    "Alerts sent as follow-up messages after an early ack"
+)
+
+
+class EarlyAckMiddleware(BaseMiddleware):
+    """الرد على الـ callback فوراً للمعالجات المعلّمة long_running (inner على callback_query)
+
+    قيمة العلامة إما True أو نص يُعرض كإشعار قصير.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        flag = get_flag(data, "long_running")
+        if not flag:
+            return await handler(event, data)
+
+        try:
+            await event.answer(flag if isinstance(flag, str) else None)
+            early_acks.inc()
+        except TelegramBadRequest as e:
+            # الاستعلام قديم أصلاً، نتابع المعالجة دون إشعار
+            logger.debug(f"Early ack failed: {e}")
+
+        token = acked_callback.set((event.id, event.from_user.id))
+        try:
+            return await handler(event, data)
+        finally:
+            acked_callback.reset(token)
+
+
+class AnsweredCallbackRequestMiddleware(BaseRequestMiddleware):
+    """منع الرد الثاني على callback تم الرد عليه مبكراً (middleware على جلسة البوت)
+
+    التنبيهات (show_alert) تتحول لرسالة متابعة للمستخدم، والإشعارات القصيرة تُتجاهل.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Any:
+        acked = acked_callback.get()
+
+        if acked is None or not isinstance(method, AnswerCallbackQuery) or method.callback_query_id != acked[0]:
+            return await make_request(bot, method)
+
+        if method.show_alert and method.text:
+            followups.inc()
+            await bot.send_message(acked[1], method.text)
+
+        return True
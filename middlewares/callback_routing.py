@@ -0,0 +1,68 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.middlewares.manager import MiddlewareManager
+from aiogram.types import TelegramObject, CallbackQuery
+
+from config import ADMIN_ID
+from core.bot import logger
+from core.callbacks import CallbackRegistry, callbacks
+from core.metrics import metrics
+
+dispatch_seconds = metrics.histogram(
+    "callback_dispatch_seconds",
+    "Callback route lookup and payload decoding time",
+    buckets=(0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005)
+)
+dispatch_total = metrics.counter(
+    "callback_dispatch_total",
+    "Callback queries by routing result"
+)
+
+
+class CallbackRoutingMiddleware(BaseMiddleware):
+    """توجيه الـ callback مباشرة من جدول الهاش بدل المرور على فلاتر جميع الـ routers (outer)"""
+
+    def __init__(self, inner: MiddlewareManager, registry: CallbackRegistry = callbacks):
+        # الـ middlewares الداخلية للـ callback_query تُطبق على المعالج كما في التوجيه العادي
+        self.inner = inner
+        self.registry = registry
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            resolved = self.registry.resolve(event.data)
+        except ValueError as e:
+            dispatch_total.inc(result="invalid")
+            logger.warning(f"Invalid callback data {event.data!r}: {e}")
+            await event.answer("⚠️ هذا الزر لم يعد صالحاً", show_alert=True)
+            return None
+        finally:
+            dispatch_seconds.observe(time.perf_counter() - start)
+
+        if resolved is None:
+            # بيانات غير مسجلة: نتركها للتوجيه العادي
+            dispatch_total.inc(result="fallback")
+            return await handler(event, data)
+
+        route, payload = resolved
+
+        if route.admin and event.from_user.id != ADMIN_ID:
+            dispatch_total.inc(result="forbidden")
+            await event.answer("⛔ صلاحيات غير كافية", show_alert=True)
+            return None
+
+        # legacy: أزرار بالصيغة القديمة ما زالت تُضغط (يُحذف الدعم حين يصل العداد للصفر)
+        dispatch_total.inc(result="legacy" if route.legacy else "routed")
+
+        data["handler"] = route.handler
+        data["payload"] = payload
+
+        wrapped = MiddlewareManager.wrap_middlewares(list(self.inner), route.handler.call)
+        return await wrapped(event, data)
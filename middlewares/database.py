@@ -0,0 +1,20 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from core.database import AsyncSessionLocal
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """جلسة قاعدة بيانات لكل تحديث تُمرر للمعالجات باسم session"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with AsyncSessionLocal() as session:
+            data["session"] = session
+            return await handler(event, data)
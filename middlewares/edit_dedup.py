@@ -0,0 +1,111 @@
+import hashlib
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import (
+    EditMessageText, EditMessageCaption, EditMessageReplyMarkup, EditMessageMedia, TelegramMethod
+)
+from aiogram.methods.base import TelegramType
+
+from config.settings import EDIT_HASH_TTL
+from core.bot import logger
+from core.metrics import metrics
+from core.redis_cache import cache
+
+# التعديلات التي نحسب لها بصمة المحتوى
+HASHED_EDITS = (EditMessageText, EditMessageCaption)
+# تعديلات أخرى تغير الرسالة فتُبطل البصمة المخزنة
+INVALIDATING_EDITS = (EditMessageReplyMarkup, EditMessageMedia)
+
+edits_skipped = metrics.counter(
+    "message_edits_skipped_total",
+    "Message edits skipped because the content hash matched"
+)
+edits_sent = metrics.counter(
+    "message_edits_sent_total",
+    "Message edits sent to Telegram"
+)
+edits_not_modified = metrics.counter(
+    "message_edits_not_modified_total",
+    "Edits rejected by Telegram as 'message is not modified'"
+)
+
+
+def edit_key(method: Any) -> Optional[str]:
+    """مفتاح البصمة لكل رسالة (chat_id, message_id) أو رسالة inline"""
+    if method.inline_message_id:
+        return f"edit:inline:{method.inline_message_id}"
+    if method.chat_id is not None and method.message_id is not None:
+        return f"edit:{method.chat_id}:{method.message_id}"
+    return None
+
+
+def edit_fingerprint(method: Any) -> str:
+    """بصمة قصيرة للنص/التعليق ونمط التنسيق والأزرار"""
+    content = method.text if isinstance(method, EditMessageText) else method.caption
+    parse_mode = method.parse_mode if isinstance(method.parse_mode, str) else "default"
+    markup = method.reply_markup.model_dump_json(exclude_none=True) if method.reply_markup else ""
+
+    raw = f"{content}\x00{parse_mode}\x00{markup}"
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+class EditDedupRequestMiddleware(BaseRequestMiddleware):
+    """تخطي تعديل الرسالة محلياً إذا طابق آخر محتوى أُرسل (middleware على جلسة البوت)"""
+
+    def __init__(self, ttl: int = EDIT_HASH_TTL):
+        self.ttl = ttl
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Any:
+        if isinstance(method, INVALIDATING_EDITS):
+            key = edit_key(method)
+            if key and cache.redis:
+                try:
+                    await cache.redis.delete(key)
+                except Exception as e:
+                    logger.debug(f"Edit hash invalidation failed: {e}")
+            return await make_request(bot, method)
+
+        if not isinstance(method, HASHED_EDITS) or not cache.redis:
+            return await make_request(bot, method)
+
+        key = edit_key(method)
+        if key is None:
+            return await make_request(bot, method)
+
+        method_name = type(method).__name__
+        fingerprint = edit_fingerprint(method)
+
+        try:
+            if await cache.redis.get(key) == fingerprint:
+                edits_skipped.inc(method=method_name)
+                return True
+        except Exception as e:
+            # بدون Redis نرسل التعديل كالمعتاد
+            logger.debug(f"Edit hash lookup failed: {e}")
+            return await make_request(bot, method)
+
+        try:
+            result = await make_request(bot, method)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in e.message:
+                raise
+            # المحتوى مطابق فعلاً: نحفظ البصمة ونعتبره نجاحاً
+            edits_not_modified.inc(method=method_name)
+            result = True
+
+        edits_sent.inc(method=method_name)
+
+        try:
+            await cache.redis.set(key, fingerprint, ex=self.ttl)
+        except Exception as e:
+            logger.debug(f"Edit hash store failed: {e}")
+
+        return result
@@ -0,0 +1,56 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from core.bot import logger
+from core.logging_setup import log_context
+from core.startup import startup
+
+
+class UpdateLoggingMiddleware(BaseMiddleware):
+    """ضبط سياق التسجيل لكل تحديث وقياس مدة معالجته (outer على update)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        context = {
+            "update_id": event.update_id,
+            "user_id": user.id if user else None,
+            "handler": None,
+            "duration": None
+        }
+
+        token = log_context.set(context)
+        start = time.perf_counter()
+
+        try:
+            return await handler(event, data)
+        finally:
+            context["duration"] = time.perf_counter() - start
+            startup.record_response(context["duration"])
+            logger.info(f"Update handled: {event.event_type}", extra={"sampled": True})
+            log_context.reset(token)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """تسجيل اسم المعالج المختار في سياق التحديث (inner)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        context = log_context.get()
+        handler_object = data.get("handler")
+
+        if context is not None and handler_object is not None:
+            context["handler"] = getattr(handler_object.callback, "__name__", None)
+
+        return await handler(event, data)
@@ -0,0 +1,143 @@
+import math
+from typing import Callable, Dict, Any, Awaitable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from config import ADMIN_ID
+from config.settings import THROTTLE_RATE, THROTTLE_BURST, THROTTLE_WARN_TTL
+from core.bot import logger
+from core.metrics import metrics
+from core.redis_cache import cache
+
+# دلو رموز ذري: إعادة التعبئة حسب الزمن ثم خصم التكلفة
+# KEYS[1] مفتاح الدلو؛ ARGV[1] السعة، ARGV[2] معدل التعبئة بالثانية، ARGV[3] التكلفة
+# يعيد {مسموح (0/1), زمن الانتظار بالميلي ثانية}
+TOKEN_BUCKET_SCRIPT = """
+redis.replicate_commands()
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, retry_after}
+"""
+
+# تكلفة كل فئة من الإجراءات (الأغلى ما يسبب عمل قاعدة بيانات أكثر)
+THROTTLE_COSTS = {
+    "start": 3,
+    "command": 2,
+    "text": 1,
+    "callback": 1
+}
+
+throttle_rejected = metrics.counter(
+    "throttle_rejected_total",
+    "Updates rejected by the per-user token bucket"
+)
+throttle_errors = metrics.counter(
+    "throttle_errors_total",
+    "Token bucket checks that failed open (Redis unavailable)"
+)
+
+
+def action_class(event: Update) -> Optional[str]:
+    """فئة التكلفة للتحديث؛ None للتحديثات غير الخاضعة للحد"""
+    if event.callback_query is not None:
+        return "callback"
+
+    message = event.message
+    if message is None:
+        return None
+
+    text = message.text or ""
+    if text.startswith("/start"):
+        return "start"
+    if text.startswith("/"):
+        return "command"
+    return "text"
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """حد إغراق لكل مستخدم عبر دلو رموز في Redis (outer على update)"""
+
+    def __init__(self, rate: float = THROTTLE_RATE, burst: int = THROTTLE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._script = None
+
+    async def _consume(self, user_id: int, cost: int):
+        if self._script is None:
+            self._script = cache.redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+        allowed, retry_after = await self._script(
+            keys=[f"throttle:{user_id}"],
+            args=[self.burst, self.rate, cost]
+        )
+        return bool(allowed), int(retry_after)
+
+    async def _warn_once(self, event: Update, user_id: int, retry_after: int):
+        """رد لطيف عند أول تجاوز فقط، ثم صمت حتى انتهاء المهلة"""
+        first = await cache.redis.set(f"throttle:warned:{user_id}", 1, nx=True, ex=THROTTLE_WARN_TTL)
+        if not first:
+            # إجابة فارغة للـ callback حتى لا يبقى مؤشر التحميل على الزر
+            if event.callback_query is not None:
+                await event.callback_query.answer()
+            return
+
+        text = f"⏳ طلبات كثيرة، يرجى الانتظار {max(1, math.ceil(retry_after / 1000))} ثانية."
+
+        if event.callback_query is not None:
+            await event.callback_query.answer(text)
+        elif event.message is not None:
+            await event.message.answer(text)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        action = action_class(event)
+
+        if user is None or action is None or user.id == ADMIN_ID or not cache.redis:
+            return await handler(event, data)
+
+        try:
+            allowed, retry_after = await self._consume(user.id, THROTTLE_COSTS[action])
+        except Exception as e:
+            # لا نمنع المستخدمين إذا تعطل Redis
+            throttle_errors.inc()
+            logger.debug(f"Throttle check failed: {e}")
+            return await handler(event, data)
+
+        if allowed:
+            return await handler(event, data)
+
+        throttle_rejected.inc(action=action)
+
+        try:
+            await self._warn_once(event, user.id, retry_after)
+        except Exception as e:
+            logger.debug(f"Could not send throttle warning: {e}")
+
+        return None
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Callable, Dict, Any, Awaitable, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from config.settings import UPDATE_DEDUP_TTL
+from core.bot import logger
+from core.metrics import metrics
+from core.redis_cache import cache
+
+# كل مفتاح bitmap يغطي 65536 تحديثاً (8KB)، والـ update_id يتزايد فتتقادم المفاتيح القديمة
+BUCKET_BITS = 65536
+
+dedup_updates = metrics.counter(
+    "update_dedup_total",
+    "Updates seen by the dedup gate (result=new|duplicate|unchecked)"
+)
+
+
+def bitmap_position(update_id: int) -> Tuple[str, int]:
+    """مفتاح الـ bitmap وموقع البت للتحديث"""
+    return f"updates:seen:{update_id // BUCKET_BITS}", update_id % BUCKET_BITS
+
+
+class UpdateDedupMiddleware(BaseMiddleware):
+    """إسقاط التحديثات المكررة (إعادة إرسال webhook أو إعادة تشغيل polling) قبل التوجيه"""
+
+    def __init__(self, ttl: int = UPDATE_DEDUP_TTL):
+        self.ttl = ttl
+
+    async def _mark_seen(self, update_id: int) -> bool:
+        """تعليم التحديث ذرياً؛ True إذا كان معالجاً من قبل"""
+        key, offset = bitmap_position(update_id)
+
+        async with cache.redis.pipeline(transaction=False) as pipe:
+            pipe.setbit(key, offset, 1)
+            # TTL منزلق: يتجدد مع كل تحديث في نفس المفتاح
+            pipe.expire(key, self.ttl)
+            previous, _ = await pipe.execute()
+
+        return bool(previous)
+
+    async def _forget(self, update_id: int):
+        """إلغاء التعليم إذا فشلت المعالجة حتى تُقبل إعادة المحاولة"""
+        key, offset = bitmap_position(update_id)
+        try:
+            await cache.redis.setbit(key, offset, 0)
+        except Exception as e:
+            logger.debug(f"Could not clear dedup bit for update {update_id}: {e}")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not cache.redis:
+            dedup_updates.inc(result="unchecked")
+            return await handler(event, data)
+
+        try:
+            duplicate = await self._mark_seen(event.update_id)
+        except Exception as e:
+            # لا نوقف التحديثات إذا تعطل Redis
+            dedup_updates.inc(result="unchecked")
+            logger.debug(f"Update dedup check failed: {e}")
+            return await handler(event, data)
+
+        if duplicate:
+            dedup_updates.inc(result="duplicate")
+            logger.info(f"♻️ Duplicate update {event.update_id} dropped")
+            return None
+
+        dedup_updates.inc(result="new")
+
+        try:
+            return await handler(event, data)
+        except (Exception, asyncio.CancelledError):
+            # يجب قبوله إذا أُعيد: polling يعيده، والملغى عند الإيقاف يُحفظ في updates:pending
+            await self._forget(event.update_id)
+            raise
@@ -0,0 +1,123 @@
+import os
+import tempfile
+
+# الإعدادات تُقرأ عند الاستيراد: المحرك لا يتصل بقاعدة البيانات في الاختبارات، والسجل في ملف مؤقت
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bot-tests.log"))
+
+import pytest
+
+from core.redis_cache import cache
+
+
+class FakePipeline:
+    """تجميع الأوامر وتنفيذها عند execute كما في redis-py"""
+
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        results = [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeRedis:
+    """بديل في الذاكرة للأوامر التي تستخدمها المكونات المختبرة فقط"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.hashes = {}
+        self.lists = {}
+        self.streams = {}
+        self.groups = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None, nx=False, **kwargs):
+        if nx and key in self.values:
+            return None
+        self.values[key] = str(value)
+        return True
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            for table in (self.values, self.sets, self.hashes, self.lists, self.streams):
+                if table.pop(key, None) is not None:
+                    removed += 1
+        return removed
+
+    async def rename(self, src, dst):
+        for table in (self.values, self.sets, self.streams):
+            if src in table:
+                table[dst] = table.pop(src)
+                return True
+        raise KeyError(src)
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def rpush(self, key, *values):
+        items = self.lists.setdefault(key, [])
+        items.extend(str(value) for value in values)
+        return len(items)
+
+    async def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return list(items[start:] if end == -1 else items[start:end + 1])
+
+    async def sadd(self, key, *members):
+        members_set = self.sets.setdefault(key, set())
+        before = len(members_set)
+        members_set.update(str(member) for member in members)
+        return len(members_set) - before
+
+    async def srem(self, key, *members):
+        members_set = self.sets.get(key, set())
+        before = len(members_set)
+        members_set.difference_update(str(member) for member in members)
+        return before - len(members_set)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    async def sismember(self, key, member):
+        return str(member) in self.sets.get(key, set())
+
+    async def xadd(self, stream, fields, **kwargs):
+        entries = self.streams.setdefault(stream, [])
+        entry_id = f"{len(entries) + 1}-0"
+        entries.append((entry_id, dict(fields)))
+        return entry_id
+
+    async def xinfo_groups(self, stream):
+        if stream not in self.streams:
+            raise RuntimeError("no such key")
+        return self.groups.get(stream, [])
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "redis", redis)
+    return redis
@@ -0,0 +1,90 @@
+import pytest
+
+from core.callbacks import CallbackRegistry
+from keyboards import callback_data
+from keyboards.callback_data import pack, TransactionRef, UserTransactionRef, BackTarget
+
+
+async def handler(callback, payload):
+    return payload
+
+
+@pytest.fixture
+def registry():
+    registry = CallbackRegistry()
+    registry.exact("confirm_reset_all_balances", admin=True)(handler)
+    registry.compact(callback_data.TX_APPROVE, TransactionRef, admin=True, legacy="approve_")(handler)
+    registry.compact(callback_data.TX_RESET_USER, TransactionRef, admin=True, legacy="reset_user_")(handler)
+    registry.compact(callback_data.TX_CONFIRM_RESET, UserTransactionRef, admin=True, legacy="confirm_reset_")(handler)
+    registry.compact(callback_data.BACK, BackTarget, legacy="back_")(handler)
+    return registry
+
+
+def test_compact_and_exact(registry):
+    route, payload = registry.resolve(pack(callback_data.TX_APPROVE, 42))
+    assert payload == TransactionRef(42) and not route.legacy
+
+    route, payload = registry.resolve("confirm_reset_all_balances")
+    assert payload is None and route.key == "confirm_reset_all_balances"
+
+    # الحقل الأخير يأخذ الباقي بما فيه الفاصل
+    assert registry.resolve(pack(callback_data.BACK, "a:b"))[1] == BackTarget("a:b")
+
+
+def test_legacy_maps_to_same_handler(registry):
+    compact_route, _ = registry.resolve(pack(callback_data.TX_APPROVE, 42))
+    route, payload = registry.resolve("approve_42")
+
+    assert route.legacy and route.admin
+    assert route.handler is compact_route.handler
+    assert payload == TransactionRef(42)
+
+
+def test_legacy_prefix_with_separator_and_several_args(registry):
+    assert registry.resolve("reset_user_7")[1] == TransactionRef(7)
+    assert registry.resolve("confirm_reset_5_9")[1] == UserTransactionRef(5, 9)
+
+
+def test_legacy_last_arg_with_separator(registry):
+    # الوجهة نفسها تحوي الفاصل: تُحل بالبادئة من اليسار
+    route, payload = registry.resolve("back_charge_main")
+    assert route.legacy and payload == BackTarget("charge_main")
+    assert registry.resolve("back_main")[1] == BackTarget("main")
+
+
+def test_unknown_and_invalid_data(registry):
+    assert registry.resolve("") is None
+    assert registry.resolve("rules") is None
+    assert registry.resolve("unknown_5") is None
+    assert registry.resolve("v1:zz:1") is None
+
+    with pytest.raises(ValueError):
+        registry.resolve("approve_abc")
+
+
+def test_legacy_requires_payload_and_prefix_separator():
+    registry = CallbackRegistry()
+    with pytest.raises(ValueError):
+        registry.compact("xx", legacy="old_")
+    with pytest.raises(ValueError):
+        registry.compact("xx", TransactionRef, legacy="old")
+
+
+def test_every_emitted_code_is_routed():
+    # استيراد الوحدات يسجل معالجاتها في السجل العام
+    import admin.transactions, admin.users, admin.dashboard, handlers.start, handlers.charge.syriatel  # noqa: F401
+    from core.callbacks import callbacks
+
+    codes = {
+        value for name, value in vars(callback_data).items()
+        if name.isupper() and isinstance(value, str) and name not in ("CALLBACK_VERSION", "SEPARATOR")
+    }
+    routed = {route.key.split(":", 1)[1] for route in callbacks.routes().values() if route.key.startswith("v1:")}
+
+    assert codes - routed == set()
+
+    # أزرار العودة المرسلة قبل الرموز المضغوطة ما زالت تصل لنفس المعالج (back_main مسار ثابت)
+    from handlers.start import handle_back, back_to_main
+    route, payload = callbacks.resolve("back_withdraw_main")
+    assert route.handler.callback is handle_back and payload == BackTarget("withdraw_main")
+    assert callbacks.resolve("back_main")[0].handler.callback is back_to_main
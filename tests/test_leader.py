@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+import core.leader
+from core.leader import LeaderElector, LeadershipLost
+from core.sms_sources import MemorySMSSource, SMSPoller
+from core.sms_stream import SMS_STREAM
+
+SMS_TEXT = "تم استلام مبلغ 5000 ليرة من 0944556677. رقم العملية: 600000000001. الرصيد الجديد: 125000"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def elector(monkeypatch):
+    # إعادة التشغيل فورية في الاختبارات
+    monkeypatch.setattr(core.leader, "TASK_RESTART_MAX", 0)
+    return LeaderElector("test")
+
+
+def test_crashed_task_is_restarted_with_same_token(elector):
+    calls = []
+
+    async def task(token):
+        calls.append(token)
+        if len(calls) < 3:
+            raise RuntimeError("boom")
+
+    run(elector._supervise("job", task, 7))
+    assert calls == [7, 7, 7]
+
+
+def test_leadership_lost_stops_without_restart(elector):
+    calls = []
+
+    async def task(token):
+        calls.append(token)
+        raise LeadershipLost("stale")
+
+    run(elector._supervise("job", task, 7))
+    assert calls == [7]
+
+
+def test_token_check(fake_redis, elector):
+    fake_redis.hashes[elector.lease_key] = {"token": "8"}
+
+    assert run(elector.is_token_current(8))
+    assert not run(elector.is_token_current(7))
+    run(elector.ensure_current(None))
+    with pytest.raises(LeadershipLost):
+        run(elector.ensure_current(7))
+
+    # بدون عقد (انتهى) لا يوجد رمز صالح
+    del fake_redis.hashes[elector.lease_key]
+    assert not run(elector.is_token_current(8))
+
+
+def test_stale_leader_does_not_move_cursor(fake_redis):
+    source = MemorySMSSource()
+    source.push("0933112233", SMS_TEXT)
+    poller = SMSPoller(source, batch_size=10, min_interval=1, max_interval=30, max_lag=100)
+    fake_redis.hashes[core.leader.leader.lease_key] = {"token": "8"}
+
+    with pytest.raises(LeadershipLost):
+        run(poller.poll_once(token=7))
+    assert poller.cursor_key not in fake_redis.values
+    assert SMS_STREAM not in fake_redis.streams
+
+    assert run(poller.poll_once(token=8)) == 1
+    assert fake_redis.values[poller.cursor_key] == "1"
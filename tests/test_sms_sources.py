@@ -0,0 +1,144 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from core.sms_sources import SMSSource, MemorySMSSource, SQLiteSMSSource, SMSPoller, source_from_url
+from core.sms_stream import SMS_STREAM, SMS_GROUP
+
+SMS_TEXT = "تم استلام مبلغ 5000 ليرة من 0944556677. رقم العملية: 600000000001. الرصيد الجديد: 125000"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_poller(source, **kwargs) -> SMSPoller:
+    options = {"batch_size": 2, "min_interval": 1, "max_interval": 30, "max_lag": 100}
+    options.update(kwargs)
+    return SMSPoller(source, **options)
+
+
+def test_source_is_abstract():
+    with pytest.raises(TypeError):
+        SMSSource()
+
+
+def test_source_from_url():
+    assert source_from_url("") is None
+    assert isinstance(source_from_url("memory://"), MemorySMSSource)
+    assert isinstance(source_from_url("sqlite:///tmp/sms.db"), SQLiteSMSSource)
+    with pytest.raises(ValueError):
+        source_from_url("ftp://gateway")
+
+
+def test_poll_advances_cursor_in_batches(fake_redis):
+    source = MemorySMSSource()
+    for _ in range(3):
+        source.push("0933112233", SMS_TEXT)
+    poller = make_poller(source)
+
+    assert run(poller.poll_once()) == 2
+    assert fake_redis.values[poller.cursor_key] == "2"
+
+    assert run(poller.poll_once()) == 1
+    assert fake_redis.values[poller.cursor_key] == "3"
+
+    # لا جديد: المؤشر لا يتغير ولا يُلحق شيء بالتدفق
+    assert run(poller.poll_once()) == 0
+    assert fake_redis.values[poller.cursor_key] == "3"
+    assert len(fake_redis.streams[SMS_STREAM]) == 3
+
+
+def test_poll_resumes_from_persisted_cursor(fake_redis):
+    source = MemorySMSSource()
+    for _ in range(3):
+        source.push("0933112233", SMS_TEXT)
+    poller = make_poller(source, batch_size=10)
+    fake_redis.values[poller.cursor_key] = "2"
+
+    assert run(poller.poll_once()) == 1
+    assert fake_redis.values[poller.cursor_key] == "3"
+    assert len(fake_redis.streams[SMS_STREAM]) == 1
+
+
+def test_invalid_records_are_skipped_but_cursor_advances(fake_redis):
+    source = MemorySMSSource()
+    source.push("0933112233", "")
+    source.push("", SMS_TEXT)
+    poller = make_poller(source, batch_size=10)
+
+    assert run(poller.poll_once()) == 2
+    assert fake_redis.values[poller.cursor_key] == "2"
+    assert SMS_STREAM not in fake_redis.streams
+
+
+def test_backpressure_skips_poll(fake_redis):
+    source = MemorySMSSource()
+    source.push("0933112233", SMS_TEXT)
+    poller = make_poller(source, max_lag=10)
+
+    fake_redis.streams[SMS_STREAM] = []
+    fake_redis.groups[SMS_STREAM] = [{"name": SMS_GROUP, "pending": 4, "lag": 6}]
+
+    assert run(poller.poll_once()) is None
+    assert poller.cursor_key not in fake_redis.values
+    assert fake_redis.streams[SMS_STREAM] == []
+
+    # بعد أن يلحق العمال بالتدفق يُستأنف السحب
+    fake_redis.groups[SMS_STREAM] = [{"name": SMS_GROUP, "pending": 4, "lag": 5}]
+    assert run(poller.poll_once()) == 1
+
+
+def test_missing_stream_is_not_backpressure(fake_redis):
+    source = MemorySMSSource()
+    source.push("0933112233", SMS_TEXT)
+    poller = make_poller(source)
+
+    assert run(poller.poll_once()) == 1
+
+
+def test_sqlite_source_cursor(fake_redis, tmp_path):
+    path = tmp_path / "sms.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sms (id INTEGER PRIMARY KEY, sender TEXT, message TEXT, timestamp TEXT)")
+    conn.executemany(
+        "INSERT INTO sms (id, sender, message, timestamp) VALUES (?, ?, ?, ?)",
+        [(5, "0933112233", SMS_TEXT, "2026-01-01 10:00:00"),
+         (9, "0933112233", SMS_TEXT, "2026-01-01 10:01:00"),
+         (12, "0933112233", SMS_TEXT, None)]
+    )
+    conn.commit()
+    conn.close()
+
+    poller = make_poller(source_from_url(f"sqlite:///{path}"))
+
+    assert run(poller.poll_once()) == 2
+    assert fake_redis.values[poller.cursor_key] == "9"
+
+    assert run(poller.poll_once()) == 1
+    assert fake_redis.values[poller.cursor_key] == "12"
+
+    assert run(poller.poll_once()) == 0
+    fields = fake_redis.streams[SMS_STREAM][0][1]
+    assert fields["sender"] == "0933112233" and fields["timestamp"] == "2026-01-01 10:00:00"
+
+
+def test_next_interval():
+    poller = make_poller(MemorySMSSource(), batch_size=10, min_interval=1, max_interval=8)
+
+    # دفعة كاملة: ما زال هناك المزيد
+    assert poller._next_interval(10) == 0
+    # دفعة جزئية: الفاصل الأدنى
+    assert poller._next_interval(3) == 1
+
+    # لا جديد أو ضغط عكسي: مضاعفة حتى الحد الأقصى
+    intervals = []
+    for count in (0, 0, None, 0, 0):
+        poller.interval = poller._next_interval(count)
+        intervals.append(poller.interval)
+    assert intervals == [2, 4, 8, 8, 8]
+
+    # بعد فاصل صفري (دفعة كاملة) يبدأ الإبطاء من الفاصل الأدنى
+    poller.interval = 0
+    assert poller._next_interval(0) == 2
@@ -0,0 +1,52 @@
+import asyncio
+import datetime
+
+from aiogram.types import Update
+
+from core.update_queue import UpdateScheduler, PENDING_KEY
+
+
+def make_update(update_id: int) -> Update:
+    return Update.model_validate({"update_id": update_id, "message": {
+        "message_id": update_id, "date": int(datetime.datetime.now().timestamp()),
+        "chat": {"id": 5, "type": "private"},
+        "from": {"id": 5, "is_bot": False, "first_name": "u"}, "text": "hi"
+    }})
+
+
+class SlowDispatcher:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.handled = []
+
+    async def feed_update(self, bot, update):
+        await asyncio.sleep(self.delay)
+        self.handled.append(update.update_id)
+
+
+def test_unprocessed_updates_survive_restart(fake_redis):
+    async def scenario():
+        first = UpdateScheduler(workers=1)
+        dp = SlowDispatcher(0.3)
+        first.start(dp, None)
+        for update_id in range(1, 5):
+            assert first.submit(make_update(update_id))
+
+        await asyncio.sleep(0.05)
+        await first.stop(drain_timeout=0.3)
+        # بعد بدء الإيقاف يُرفض الجديد (503) ليعيد Telegram إرساله
+        assert not first.submit(make_update(9))
+
+        second = UpdateScheduler(workers=1)
+        replay = SlowDispatcher(0)
+        second.start(replay, None)
+        restored = await second.restore()
+        await second.stop(drain_timeout=1)
+        return dp.handled, replay.handled, restored
+
+    handled, replayed, restored = asyncio.run(scenario())
+
+    # الملغى أثناء المعالجة يُحفظ أولاً ثم ما بقي في المسارات
+    assert handled == [1]
+    assert replayed == [2, 3, 4] and restored == 3
+    assert PENDING_KEY not in fake_redis.lists
@@ -0,0 +1,89 @@
+import re
+from typing import Optional, NamedTuple, Tuple, Pattern
+
+
+class SyriatelSMS(NamedTuple):
+    """نتيجة تحليل رسالة سيرياتيل كاش"""
+    transaction_id: str
+    amount: int
+    from_number: Optional[str]
+    balance: Optional[int]
+    pattern: str
+
+
+class SMSPattern(NamedTuple):
+    name: str
+    anchor: str  # كلمة مميزة (بأحرف صغيرة) يجب أن تظهر قبل تجربة التعبير
+    regex: Pattern
+
+
+_NUMBER = r'\d+(?:,\d+)*'
+
+# تُترجم مرة واحدة عند الاستيراد، بمجموعات مسماة بدل عدّ المجموعات
+PATTERNS: Tuple[SMSPattern, ...] = (
+    # "تم استلام مبلغ X ليرة من رقم. رقم العملية: Y. الرصيد الجديد: Z"
+    SMSPattern("received_ar", "تم استلام مبلغ", re.compile(
+        rf'تم استلام مبلغ (?P<amount>{_NUMBER}) ليرة من (?P<sender>\d+).*?'
+        rf'رقم العملية[:\s]*(?P<txid>\d+).*?الرصيد الجديد[:\s]*(?P<balance>{_NUMBER})',
+        re.DOTALL
+    )),
+    # "تم تحويل مبلغ X ليرة إلى حسابك. رقم العملية: Y"
+    SMSPattern("transfer_ar", "تم تحويل مبلغ", re.compile(
+        rf'تم تحويل مبلغ (?P<amount>{_NUMBER}) ليرة إلى حسابك.*?رقم العملية[:\s]*(?P<txid>\d+)',
+        re.DOTALL
+    )),
+    # "Syriatel Cash: You received X SP from X. Transaction ID: Y. New balance: Z"
+    SMSPattern("received_en", "received", re.compile(
+        rf'received (?P<amount>{_NUMBER}) SP from (?P<sender>\d+).*?'
+        rf'Transaction ID[:\s]*(?P<txid>\d+).*?New balance[:\s]*(?P<balance>{_NUMBER})',
+        re.IGNORECASE | re.DOTALL
+    )),
+    # "عملية إيداع: X ليرة. رقم العملية: Y"
+    SMSPattern("deposit_op_ar", "عملية إيداع", re.compile(
+        rf'عملية إيداع[:\s]*(?P<amount>{_NUMBER}) ليرة.*?رقم العملية[:\s]*(?P<txid>\d+)',
+        re.DOTALL
+    )),
+    # "تم إيداع X ليرة. رقم العملية: Y. الرصيد: Z"
+    SMSPattern("deposit_ar", "تم إيداع", re.compile(
+        rf'تم إيداع (?P<amount>{_NUMBER}) ليرة.*?رقم العملية[:\s]*(?P<txid>\d+).*?الرصيد[:\s]*(?P<balance>{_NUMBER})',
+        re.DOTALL
+    )),
+)
+
+# كل الأنماط تحتوي رقم العملية: رفض سريع لرسائل OTP والإعلانات
+TRANSACTION_MARKERS = ("رقم العملية", "transaction id")
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    return int(value.replace(",", "")) if value else None
+
+
+def match_syriatel_sms(text: str, sender: Optional[str] = None) -> Optional[SyriatelSMS]:
+    """تحليل رسالة سيرياتيل كاش؛ None إذا لم تكن رسالة دفع معروفة"""
+    lowered = text.lower()
+
+    if not any(marker in lowered for marker in TRANSACTION_MARKERS):
+        return None
+
+    for pattern in PATTERNS:
+        if pattern.anchor not in lowered:
+            continue
+
+        match = pattern.regex.search(text)
+        if match is None:
+            continue
+
+        groups = match.groupdict()
+        amount = _to_int(groups["amount"])
+        if not amount:
+            continue
+
+        return SyriatelSMS(
+            transaction_id=groups["txid"],
+            amount=amount,
+            from_number=groups.get("sender") or sender,
+            balance=_to_int(groups.get("balance")),
+            pattern=pattern.name
+        )
+
+    return None
@@ -1,14 +1,45 @@
- import re
+import re
 import json
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, List
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.crud.transactions import TransactionCRUD
 from database.crud.syriatel_codes import SyriatelCodeCRUD
 from core.bot import logger
+from core.unmatched_sms import unmatched_sms
+from core.sms_dedup import sms_gate, content_hash, SMSItem
+from core.sms_sources import sms_poller
+from core.approval_sla import observe_transitions
+from database.crud.processed_sms import ProcessedSMSCRUD
 from config import CHANNEL_ADMIN_LOGS
+from utils.sms_matcher import match_syriatel_sms, SyriatelSMS
+
+
+def auto_approval_user_text(amount: int, new_balance: int) -> str:
+    """نص إشعار المستخدم بالتحقق التلقائي"""
+    return (
+        f"✅ <b>تم التحقق تلقائياً من شحنتك!</b>\n\n"
+        f"💰 <b>المبلغ:</b> {amount:,} ليرة\n"
+        f"💰 <b>رصيدك الجديد:</b> {new_balance:,} ليرة\n"
+        f"🤖 <b>النظام:</b> التحقق التلقائي\n"
+        f"🕒 <b>الوقت:</b> {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
+        f"شكراً لاستخدامك خدماتنا! 🎉"
+    )
+
+
+def auto_approval_log_text(tx_id: int, user_id: int, amount: int, from_number: str) -> str:
+    """نص سجل قناة الإدمن للتحقق التلقائي"""
+    return (
+        f"🤖 <b>تحقق تلقائي ناجح</b>\n\n"
+        f"📋 <b>رقم المعاملة:</b> {tx_id}\n"
+        f"👤 <b>المستخدم:</b> {user_id}\n"
+        f"💰 <b>المبلغ:</b> {amount:,} ليرة\n"
+        f"📱 <b>من رقم:</b> {from_number}\n"
+        f"🕒 <b>الوقت:</b> {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    )
+
 
 class SMSParser:
     """محلل رسائل SMS للتحقق التلقائي"""
@@ -30,66 +61,18 @@ class SMSParser:
             "message": str
         }
         """
-        # تنظيف النص
-        sms_text = sms_text.strip()
-        
-        # أنماط رسائل سيرياتيل كاش
-        patterns = [
-            # النمط 1: "تم استلام مبلغ X ليرة من رقم. رقم العملية: Y. الرصيد الجديد: Z"
-            r'تم استلام مبلغ (\d+(?:,\d+)*) ليرة من (\d+).*?رقم العملية[:\s]*(\d+).*?الرصيد الجديد[:\s]*(\d+(?:,\d+)*)',
-            
-            # النمط 2: "تم تحويل مبلغ X ليرة إلى حسابك. رقم العملية: Y"
-            r'تم تحويل مبلغ (\d+(?:,\d+)*) ليرة إلى حسابك.*?رقم العملية[:\s]*(\d+)',
-            
-            # النمط 3: "Syriatel Cash: You received X SP from X. Transaction ID: Y. New balance: Z"
-            r'received (\d+(?:,\d+)*) SP from (\d+).*?Transaction ID[:\s]*(\d+).*?New balance[:\s]*(\d+(?:,\d+)*)',
-            
-            # النمط 4: "عملية إيداع: X ليرة. رقم العملية: Y"
-            r'عملية إيداع[:\s]*(\d+(?:,\d+)*) ليرة.*?رقم العملية[:\s]*(\d+)',
-            
-            # النمط 5: "تم إيداع X ليرة. رقم العملية: Y. الرصيد: Z"
-            r'تم إيداع (\d+(?:,\d+)*) ليرة.*?رقم العملية[:\s]*(\d+).*?الرصيد[:\s]*(\d+(?:,\d+)*)',
-        ]
+        parsed = match_syriatel_sms(sms_text.strip(), sender)
         
-        for pattern in patterns:
-            match = re.search(pattern, sms_text, re.IGNORECASE | re.DOTALL)
-            if match:
-                try:
-                    # استخراج البيانات حسب النمط
-                    if len(match.groups()) == 4:
-                        # النمط 1 أو 3
-                        amount_str = match.group(1).replace(',', '')
-                        from_number = match.group(2)
-                        transaction_id = match.group(3)
-                        balance_str = match.group(4).replace(',', '') if match.group(4) else None
-                    elif len(match.groups()) == 3:
-                        # النمط 5
-                        amount_str = match.group(1).replace(',', '')
-                        transaction_id = match.group(2)
-                        balance_str = match.group(3).replace(',', '')
-                        from_number = sender
-                    else:
-                        # النمط 2 أو 4
-                        amount_str = match.group(1).replace(',', '')
-                        transaction_id = match.group(2)
-                        from_number = sender
-                        balance_str = None
-                    
-                    amount = int(amount_str)
-                    balance = int(balance_str) if balance_str else None
-                    
-                    return {
-                        "success": True,
-                        "transaction_id": transaction_id.strip(),
-                        "amount": amount,
-                        "from_number": from_number.strip(),
-                        "balance": balance,
-                        "message": "تم تحليل الرسالة بنجاح"
-                    }
-                    
-                except (ValueError, IndexError) as e:
-                    logger.error(f"Error parsing SMS with pattern: {e}")
-                    continue
+        if parsed is not None:
+            return {
+                "success": True,
+                "transaction_id": parsed.transaction_id,
+                "amount": parsed.amount,
+                "from_number": parsed.from_number,
+                "balance": parsed.balance,
+                "pattern": parsed.pattern,
+                "message": "تم تحليل الرسالة بنجاح"
+            }
         
         # إذا لم يتطابق مع أي نمط
         return {
@@ -98,6 +81,7 @@ class SMSParser:
             "amount": 0,
             "from_number": None,
             "balance": None,
+            "pattern": None,
             "message": "لم يتم التعرف على تنسيق الرسالة"
         }
     
@@ -107,140 +91,92 @@ class SMSParser:
         العائد: (موجود, معرف_المعاملة)
         """
         try:
-            # البحث عن معاملة معلقة بنفس رقم العملية
-            from sqlalchemy import select
-            from database.models import Transaction
-            
-            stmt = select(Transaction).where(
-                Transaction.transaction_id == transaction_id,
-                Transaction.type == "charge",
-                Transaction.status == "pending"
-            ).order_by(Transaction.created_at.desc()).limit(1)
-            
-            result = await self.session.execute(stmt)
-            transaction = result.scalar_one_or_none()
-            
-            if not transaction:
-                # البحث عن أي معاملة بنفس الرقم (حتى المكتملة)
-                stmt = select(Transaction).where(
-                    Transaction.transaction_id == transaction_id,
-                    Transaction.type == "charge"
-                ).order_by(Transaction.created_at.desc()).limit(1)
-                
-                result = await self.session.execute(stmt)
-                transaction = result.scalar_one_or_none()
-                
-                if transaction:
-                    return False, None  # موجودة ولكنها مكتملة أو مرفوضة
+            pending = await self.tx_crud.get_pending_charges_by_txids([transaction_id])
+            transaction = pending.get(transaction_id)
             
+            # لا معاملة معلقة (غير موجودة أو عولجت سابقاً) أو المبلغ مختلف
             if transaction and transaction.amount == amount:
                 return True, transaction.id
-            else:
-                return False, None
+            return False, None
                 
         except Exception as e:
             logger.error(f"Error verifying transaction: {e}")
             return False, None
     
+    async def record_processed(self, items: List[SMSItem]) -> List[SMSItem]:
+        """الطبقة الثانية لإزالة التكرار: القيد الفريد في processed_sms (بدون commit)؛ يعيد الجديد فقط"""
+        unique: Dict[str, SMSItem] = {}
+        for sms, message in items:
+            unique.setdefault(sms.transaction_id, (sms, message))
+        
+        fresh = await ProcessedSMSCRUD(self.session).record(
+            [(sms.transaction_id, content_hash(message)) for sms, message in unique.values()]
+        )
+        sms_gate.record_database(len(fresh), len(items) - len(fresh))
+        
+        return [item for txid, item in unique.items() if txid in fresh]
+    
+    async def reconcile_batch(self, messages: List[SyriatelSMS]) -> List[Tuple[SyriatelSMS, Optional[int]]]:
+        """مطابقة دفعة رسائل مع طلبات الشحن المعلقة باستعلام واحد؛ المبلغ يُقارن هنا"""
+        pending = await self.tx_crud.get_pending_charges_by_txids([sms.transaction_id for sms in messages])
+        
+        matches = []
+        for sms in messages:
+            transaction = pending.get(sms.transaction_id)
+            matches.append((sms, transaction.id if transaction and transaction.amount == sms.amount else None))
+        
+        return matches
+    
+    async def auto_approve_batch(self, matches: List[Tuple[SyriatelSMS, int]]) -> List[int]:
+        """الموافقة على دفعة معاملات مطابقة في معاملة قاعدة بيانات واحدة، والإشعارات عبر صندوق الصادر"""
+        senders = {tx_id: sms.from_number for sms, tx_id in matches}
+        if not senders:
+            return []
+        
+        from database.crud.users import UserCRUD
+        from database.crud.outbox import OutboxCRUD
+        from core.outbox import outbox
+        
+        # قلب الحالة وإضافة الرصيد في رحلة واحدة: لا توجد لحظة "موافق عليها دون رصيد"
+        approved = await self.tx_crud.approve_and_credit_charges(list(senders), notes="تم التحقق تلقائياً via SMS")
+        
+        outbox_crud = OutboxCRUD(self.session)
+        for row in approved:
+            outbox_crud.add(
+                "send_message",
+                {"chat_id": row.user_id, "text": auto_approval_user_text(row.amount, row.balance)},
+                idempotency_key=f"sms_approval:{row.id}:user"
+            )
+            outbox_crud.add(
+                "send_message",
+                {
+                    "chat_id": CHANNEL_ADMIN_LOGS,
+                    "text": auto_approval_log_text(row.id, row.user_id, row.amount, senders[row.id])
+                },
+                idempotency_key=f"sms_approval:{row.id}:log"
+            )
+        
+        await self.session.commit()
+        # حذف مباشر بعد الـ commit؛ حدث NOTIFY (core.tx_events) إضافي ويضيع أثناء إعادة اتصال المستمع
+        await UserCRUD(self.session).invalidate_cache(list({row.user_id for row in approved}))
+        observe_transitions(approved)
+        outbox.notify()
+        
+        logger.info(f"Auto-approved {len(approved)} transactions from SMS batch")
+        return [row.id for row in approved]
+    
     async def auto_approve_transaction(self, transaction_id: int, sms_data: Dict[str, Any]) -> bool:
         """الموافقة التلقائية على المعاملة"""
         try:
-            # تحديث حالة المعاملة
-            success = await self.tx_crud.update_transaction_status(
-                transaction_id,
-                "approved",
-                verified_auto=True,
-                notes=f"تم التحقق تلقائياً via SMS. الراسل: {sms_data['from_number']}"
-            )
-            
-            if not success:
-                return False
-            
-            # جلب المعاملة للمستخدم
-            from sqlalchemy import select
-            from database.models import Transaction, User
-            
-            stmt = select(Transaction, User.balance).join(
-                User, Transaction.user_id == User.user_id
-            ).where(Transaction.id == transaction_id)
-            
-            result = await self.session.execute(stmt)
-            row = result.first()
-            
-            if not row:
-                return False
-            
-            transaction, user_balance = row
-            
-            # إضافة الرصيد للمستخدم
-            from database.crud.users import UserCRUD
-            user_crud = UserCRUD(self.session)
-            old_balance, new_balance = await user_crud.update_balance(
-                transaction.user_id,
-                transaction.amount,
-                operation="add"
-            )
-            
-            # إرسال إشعار للمستخدم
-            await self._notify_user_auto_approval(
-                transaction.user_id,
-                transaction.amount,
-                new_balance
-            )
-            
-            # تسجيل في قناة الإدمن
-            await self._log_auto_approval(
-                transaction.id,
-                transaction.user_id,
-                transaction.amount,
-                sms_data['from_number']
-            )
-            
-            logger.info(f"Auto-approved transaction {transaction_id} for user {transaction.user_id}")
-            return True
+            sms = SyriatelSMS(**{field: sms_data.get(field) for field in SyriatelSMS._fields})
+            approved = await self.auto_approve_batch([(sms, transaction_id)])
+            return bool(approved)
             
         except Exception as e:
+            await self.session.rollback()
             logger.error(f"Error auto-approving transaction: {e}")
             return False
     
-    async def _notify_user_auto_approval(self, user_id: int, amount: int, new_balance: int):
-        """إرسال إشعار للمستخدم بالتحقق التلقائي"""
-        try:
-            from core.bot import bot_manager
-            bot = await bot_manager.bot
-            
-            await bot.send_message(
-                user_id,
-                f"✅ <b>تم التحقق تلقائياً من شحنتك!</b>\n\n"
-                f"💰 <b>المبلغ:</b> {amount:,} ليرة\n"
-                f"💰 <b>رصيدك الجديد:</b> {new_balance:,} ليرة\n"
-                f"🤖 <b>النظام:</b> التحقق التلقائي\n"
-                f"🕒 <b>الوقت:</b> {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
-                f"شكراً لاستخدامك خدماتنا! 🎉",
-                parse_mode="HTML"
-            )
-        except Exception as e:
-            logger.warning(f"Could not notify user {user_id}: {e}")
-    
-    async def _log_auto_approval(self, tx_id: int, user_id: int, amount: int, from_number: str):
-        """تسجيل الموافقة التلقائية في قناة الإدمن"""
-        try:
-            from core.bot import bot_manager
-            bot = await bot_manager.bot
-            
-            await bot.send_message(
-                CHANNEL_ADMIN_LOGS,
-                f"🤖 <b>تحقق تلقائي ناجح</b>\n\n"
-                f"📋 <b>رقم المعاملة:</b> {tx_id}\n"
-                f"👤 <b>المستخدم:</b> {user_id}\n"
-                f"💰 <b>المبلغ:</b> {amount:,} ليرة\n"
-                f"📱 <b>من رقم:</b> {from_number}\n"
-                f"🕒 <b>الوقت:</b> {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-                parse_mode="HTML"
-            )
-        except Exception as e:
-            logger.error(f"Could not log auto-approval: {e}")
-    
     async def process_sms_webhook(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         معالجة طلب Webhook من تطبيق SMS
@@ -250,6 +186,7 @@ class SMSParser:
             "timestamp": "2024-01-15 14:30:00"
         }
         """
+        item = None
         try:
             sender = data.get("sender", "")
             message = data.get("message", "")
@@ -274,6 +211,16 @@ class SMSParser:
                     "parsed_data": result
                 }
             
+            sms = SyriatelSMS(**{field: result[field] for field in SyriatelSMS._fields})
+            
+            # رسالة معاد إرسالها من البوابة: رفض قبل أي استعلام، ثم القيد الفريد كطبقة ثانية
+            if not (await sms_gate.admit([(sms, message)]))[0]:
+                return {"success": False, "error": "رسالة مكررة", "parsed_data": result, "duplicate": True}
+            
+            item = (sms, message)
+            if not await self.record_processed([item]):
+                return {"success": False, "error": "رسالة مكررة", "parsed_data": result, "duplicate": True}
+            
             # التحقق من وجود معاملة مطابقة
             transaction_id = result["transaction_id"]
             amount = result["amount"]
@@ -281,6 +228,11 @@ class SMSParser:
             exists, tx_id = await self.verify_transaction(transaction_id, amount)
             
             if not exists:
+                await self.session.commit()
+                
+                # قد يرسل المستخدم رقم العملية لاحقاً؛ تُحفظ الرسالة ليُوافق على طلبه فوراً
+                await unmatched_sms.remember([sms])
+                
                 return {
                     "success": False,
                     "error": "لا توجد معاملة معلقة مطابقة",
@@ -299,6 +251,7 @@ class SMSParser:
                     "parsed_data": result
                 }
             else:
+                await sms_gate.release([item])
                 return {
                     "success": False,
                     "error": "فشل الموافقة التلقائية",
@@ -308,6 +261,9 @@ class SMSParser:
             
         except Exception as e:
             logger.error(f"Error processing SMS webhook: {e}")
+            if item is not None:
+                await self.session.rollback()
+                await sms_gate.release([item])
             return {
                 "success": False,
                 "error": f"خطأ داخلي: {str(e)}"
@@ -368,21 +324,10 @@ async def sms_webhook_handler(message: Message, session: AsyncSession):
 
 # ==================== وظيفة الخلفية للتحقق الدوري ====================
 
-async def background_sms_checker(session: AsyncSession):
-    """التحقق الدوري عن رسائل SMS الجديدة"""
-    import time
+async def background_sms_checker(token: int):
+    """سحب رسائل SMS من مصدر البوابة وتغذية تدفق التحقق (مهمة على القائد فقط برمز الحماية)"""
+    if sms_poller is None:
+        logger.info("SMS source not configured (SMS_SOURCE_URL), background checker disabled")
+        return
     
-    while True:
-        try:
-            # هنا يمكن جلب رسائل SMS من مصدر خارجي
-            # مثل قاعدة بيانات مشتركة مع تطبيق الهاتف
-            # أو من API خارجي
-            
-            logger.info("Background SMS checker running...")
-            
-            # انتظر 30 ثانية قبل التحقق التالي
-            await asyncio.sleep(30)
-            
-        except Exception as e:
-            logger.error(f"Error in background SMS checker: {e}")
-            await asyncio.sleep(60)  # انتظار أطول عند الخطأ
\ No newline at end of file
+    await sms_poller.run(token)
\ No newline at end of file